@@ -0,0 +1,262 @@
+import json
+import logging
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from agent.core import RULE_ENGINES
+from agent.lazy import lazy_import, resolve
+from events.bulk import _open
+from memory.rule_expr import DEFAULT_ALIASES, to_columns
+
+np = lazy_import("numpy")
+
+RULE_MEMORIES = {
+    "classic": "memory.classic_rules:ClassicRuleMemory",
+    "fuzzy": "memory.fuzzy_rules:FuzzyRuleMemory",
+    "ml": "memory.ml_rules:MLRuleMemory",
+}
+
+# Audit sources written by rule decisions (workflow steps and LLM log entries are not decisions)
+DECISION_SOURCES = ("classic", "fuzzy", "ml", "default")
+
+_worker = None
+
+
+class Backtester:
+    """
+    Rules-only replay of historical events: what a fixed rule snapshot would
+    have decided, without handle_event or the LLM.
+
+    `snapshot` is a dict (or JSON file path) with classic_rules, fuzzy_rules
+    and ml_rules configs in the shape the LLM returns them; each is ingested
+    into a fresh rule memory. Events are evaluated in batches of
+    `batch_size` with the engines' decide_action_batch, and combined in
+    hybrid_decide_action priority order: the first of classic, fuzzy, ml with
+    an action other than 'monitor' wins, otherwise 'monitor'. The state a
+    rule sees is the event itself: per-server working state and rolling
+    timeseries features are not reconstructed.
+
+    With workers > 0, decoding and evaluation run in a process pool (each
+    worker loads the snapshot once) and only counts come back, so throughput
+    scales with cores. run_jsonl/run_audit return decision counts, deciding
+    engines, changes against the recorded decisions and events/second.
+    """
+
+    def __init__(self, snapshot=None, rule_engines=None, batch_size=50000, workers=0):
+        if isinstance(snapshot, str):
+            with open(snapshot, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        self.snapshot = snapshot or {}
+        enabled = set(rule_engines or ("classic", "fuzzy", "ml"))
+        self.rule_engines = tuple(name for name, _, _, _ in RULE_ENGINES if name in enabled)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.logger = logging.getLogger("Backtester")
+        self.engines = []
+        for name in self.rule_engines:
+            memory = resolve(RULE_MEMORIES[name])()
+            config = self.snapshot.get(f"{name}_rules")
+            if config:
+                memory.ingest(config)
+            self.engines.append((name, memory))
+        # Only the columns some rule reads are built from each batch
+        self.attributes = set()
+        for _, memory in self.engines:
+            self.attributes |= memory.attributes()
+        self.attributes |= {DEFAULT_ALIASES[a] for a in self.attributes if a in DEFAULT_ALIASES}
+
+    @classmethod
+    def from_agent(cls, agent, **kwargs):
+        """Backtest the rule tables an AgentCore holds right now."""
+        return cls(rule_snapshot(agent), **kwargs)
+
+    def decide_batch(self, events):
+        """(actions, sources) arrays for a list of event dicts, in hybrid_decide_action priority."""
+        columns, n = to_columns(events, self.attributes)
+        actions = np.full(n, "monitor", dtype=object)
+        sources = np.full(n, "default", dtype=object)
+        undecided = np.ones(n, dtype=bool)
+        for name, memory in self.engines:
+            if not undecided.any():
+                break
+            try:
+                engine_actions, _ = memory.decide_action_batch(columns)
+            except Exception as e:
+                self.logger.warning(f"{name} rules failed on a batch of {n}: {e}")
+                continue
+            hit = undecided & np.not_equal(engine_actions, None) & np.not_equal(engine_actions, "monitor")
+            actions[hit] = engine_actions[hit]
+            sources[hit] = name
+            undecided &= ~hit
+        return actions, sources
+
+    def evaluate(self, events, recorded=None):
+        """Counts for one batch: decisions, deciding engines and (recorded, replayed) transitions."""
+        actions, sources = self.decide_batch(events)
+        result = _empty_result()
+        result["events"] = len(actions)
+        result["decisions"].update(actions.tolist())
+        result["sources"].update(sources.tolist())
+        if recorded is not None:
+            pairs = [(old, new) for old, new in zip(recorded, actions.tolist()) if old is not None]
+            result["recorded"] = len(pairs)
+            result["transitions"].update(pair for pair in pairs if pair[0] != pair[1])
+        return result
+
+    def run_jsonl(self, source):
+        """
+        Replay an NDJSON/JSONL file, file object or "-" (stdin). A line is
+        either an audit row ({"decision": ..., "event": {...} or JSON text})
+        or a bare event, whose own "decision" field, if any, is the recorded
+        decision.
+        """
+        fh, owned = _open(source)
+        try:
+            return self._run(_chunks(fh, self.batch_size), "jsonl")
+        finally:
+            if owned:
+                fh.close()
+
+    def run_audit(self, db_path, source=DECISION_SOURCES, **filters):
+        """
+        Replay the events of an audit DB's decision rows (oldest first), with
+        the logged decision as the recorded one. `filters` are those of
+        AuditMemory.query (start, end, server_id, decision, component, tier).
+        """
+        from memory.audit import AuditMemory
+        clauses, params = AuditMemory._filters(source=source, **filters)
+        clauses.append("event IS NOT NULL")
+        sql = f"SELECT decision, event FROM audit WHERE {' AND '.join(clauses)} ORDER BY ts, rowid"
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(sql, params)
+            chunks = iter(lambda: cursor.fetchmany(self.batch_size), [])
+            return self._run(chunks, "audit")
+        finally:
+            conn.close()
+
+    def _run(self, chunks, kind):
+        start = time.perf_counter()
+        total = _empty_result()
+        for result in self._results(chunks, kind):
+            _merge(total, result)
+            elapsed = time.perf_counter() - start
+            self.logger.info(f"Backtested {total['events']} events ({total['events'] / elapsed:.0f}/s)")
+        return _report(total, time.perf_counter() - start)
+
+    def _results(self, chunks, kind):
+        if self.workers <= 0:
+            for items in chunks:
+                yield self.evaluate(*_decode(items, kind))
+            return
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(self.snapshot, self.rule_engines, self.batch_size),
+        ) as pool:
+            in_flight = []
+            for items in chunks:
+                in_flight.append(pool.submit(_evaluate_chunk, items, kind))
+                if len(in_flight) >= 2 * self.workers:
+                    yield in_flight.pop(0).result()
+            for future in in_flight:
+                yield future.result()
+
+
+def rule_snapshot(agent):
+    """The rule tables an AgentCore has loaded, as a Backtester snapshot."""
+    snapshot = {}
+    if agent.modules.is_loaded("classic_rules"):
+        snapshot["classic_rules"] = {"rules": agent.classic_rules.table or []}
+    if agent.modules.is_loaded("fuzzy_rules"):
+        fuzzy = agent.fuzzy_rules
+        snapshot["fuzzy_rules"] = {
+            "rules": fuzzy.table or [],
+            "variables": {attr: {term: list(trap) for term, trap in terms.items()} for attr, terms in fuzzy.variables.items()},
+        }
+    if agent.modules.is_loaded("ml_rules") and agent.ml_rules.table:
+        snapshot["ml_rules"] = {"models": agent.ml_rules.table}
+    return snapshot
+
+
+def _chunks(fh, size):
+    while True:
+        lines = list(islice(fh, size))
+        if not lines:
+            return
+        yield lines
+
+
+def _decode(items, kind):
+    """(events, recorded decisions) from JSONL lines or audit (decision, event JSON) rows."""
+    texts = [item[1] for item in items] if kind == "audit" else [line for line in items if line.strip()]
+    try:
+        # One decoder call per chunk instead of one per record
+        values = json.loads("[" + ",".join(texts) + "]")
+    except ValueError:
+        values = [_loads(text, kind) for text in texts]
+    events, recorded = [], []
+    if kind == "audit":
+        for (decision, _), event in zip(items, values):
+            if isinstance(event, dict):
+                events.append(event)
+                recorded.append(decision)
+        return events, recorded
+    for row in values:
+        if not isinstance(row, dict):
+            continue
+        event = row.get("event", row)
+        if isinstance(event, str):
+            event = _loads(event, kind)
+        if isinstance(event, dict):
+            events.append(event)
+            recorded.append(row.get("decision"))
+    return events, recorded
+
+
+def _loads(text, kind):
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        logging.getLogger("Backtester").warning(f"Skipping undecodable {kind} record: {e}")
+        return None
+
+
+def _init_worker(snapshot, rule_engines, batch_size):
+    global _worker
+    _worker = Backtester(snapshot, rule_engines=rule_engines, batch_size=batch_size)
+
+
+def _evaluate_chunk(items, kind):
+    return _worker.evaluate(*_decode(items, kind))
+
+
+def _empty_result():
+    return {"events": 0, "recorded": 0, "decisions": Counter(), "sources": Counter(), "transitions": Counter()}
+
+
+def _merge(total, result):
+    total["events"] += result["events"]
+    total["recorded"] += result["recorded"]
+    for key in ("decisions", "sources", "transitions"):
+        total[key].update(result[key])
+
+
+def _report(total, seconds):
+    changed = sum(total["transitions"].values())
+    return {
+        "events": total["events"],
+        "seconds": round(seconds, 3),
+        "events_per_s": round(total["events"] / seconds) if seconds else 0,
+        "decisions": dict(total["decisions"].most_common()),
+        "sources": dict(total["sources"].most_common()),
+        "recorded": total["recorded"],
+        "changed": changed,
+        "change_rate": changed / total["recorded"] if total["recorded"] else 0.0,
+        "changes": [
+            {"recorded": old, "replayed": new, "count": count}
+            for (old, new), count in total["transitions"].most_common()
+        ],
+    }
@@ -0,0 +1,398 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one agent per directory is up to the operator
+    fcntl = None
+
+from agent.lazy import resolve
+from agent.metrics import now_ns
+
+# Bumped whenever a component's on-disk layout changes; older checkpoints are ignored
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+LOCK_FILE = ".lock"
+
+_GENERATION_FILE = re.compile(r"^[a-z_]+\.\d+(\.|$)")
+
+
+def _fuzzy_state(memory):
+    variables = {attr: {term: list(trap) for term, trap in terms.items()} for attr, terms in memory.variables.items()}
+    return {"rules": memory.table, "variables": variables}
+
+
+def _ml_state(memory):
+    return {"table": memory.table, "registry": memory.registry}
+
+
+def _apply_ml(memory, state):
+    memory.registry = state["registry"]
+    memory.table = state["table"]
+
+
+def _procedural_state(memory):
+    # Callable step code cannot be pickled reliably; snippet strings can
+    code = {step: snippet for step, snippet in memory.code.items() if isinstance(snippet, str)}
+    return {"skills": memory.skills, "graphs": memory.graphs, "code": code, "version": memory.version}
+
+
+def _apply_procedural(memory, state):
+    memory.skills = state["skills"]
+    memory.graphs = state["graphs"]
+    memory.code.update(state["code"])
+    memory.version = state["version"]
+
+
+def _setter(attr):
+    def apply(memory, state):
+        setattr(memory, attr, state)
+    return apply
+
+
+# Components stored as one pickle each: name -> (state(memory), apply(memory, state))
+PICKLED = {
+    "classic_rules": (lambda m: m.table, lambda m, s: m.ingest(s)),
+    "fuzzy_rules": (_fuzzy_state, lambda m, s: m.ingest(s)),
+    "ml_rules": (_ml_state, _apply_ml),
+    "knowledge_graph": (lambda m: m.graph, _setter("graph")),
+    "procedural": (_procedural_state, _apply_procedural),
+    "working_mem": (lambda m: m.export_states(), lambda m, s: m.import_states(s)),
+    "policy": (lambda m: m.rules, _setter("rules")),
+    "meta": (lambda m: m.entries, _setter("entries")),
+    "external": (lambda m: m.integrations, _setter("integrations")),
+}
+
+
+class CheckpointManager:
+    """
+    Snapshots of an AgentCore's memory modules in directory `path`, so a
+    restarted worker picks up where the last one stopped instead of
+    rebuilding everything through the LLM.
+
+    Each component has its own file, named with the checkpoint generation
+    that wrote it. manifest.json (FORMAT_VERSION, one entry per component,
+    plus persona, the event types the LLM has answered for, and rule/prompt
+    freshness) is replaced atomically last, so a crash mid-checkpoint leaves
+    the previous one intact. Formats: a pickle per rule table, graph or
+    state; the faiss native index for the vector store; .npy arrays for
+    timeseries; an append-only JSONL for raw_text; a SQLite backup for an
+    in-memory audit trail (an on-disk audit DB already is one).
+
+    checkpoint() writes only loaded components that changed since their last
+    write; start() runs it every `interval` seconds on a daemon thread. A
+    directory belongs to one manager at a time (an exclusive lock held until
+    stop()): a second one raises RuntimeError instead of pruning the first
+    one's files. AgentPool gives each worker its own subdirectory.
+
+    restore() applies the agent-level state at once, and swaps the module
+    factories so each module loads its snapshot on first access; the vector
+    store and timeseries arrays are memory-mapped rather than read.
+    """
+
+    def __init__(self, agent, path, interval=60.0):
+        self.agent = agent
+        self.path = path
+        self.interval = interval
+        self.metrics = agent.metrics
+        self.logger = logging.getLogger("CheckpointManager")
+        os.makedirs(path, exist_ok=True)
+        self._lock_fh = self._acquire(path)
+        self.manifest = self._read_manifest()
+        self.generation = self.manifest.get("generation", 0)
+        if self.manifest.get("format") != FORMAT_VERSION:
+            if self.manifest:
+                self.logger.warning(f"Ignoring checkpoint format {self.manifest.get('format')} in {path}")
+            self.manifest = {}
+        self._tokens = {name: entry.get("token") for name, entry in self.manifest.get("components", {}).items()}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _acquire(path):
+        fh = open(os.path.join(path, LOCK_FILE), "a")
+        if fcntl is None:
+            return fh
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            raise RuntimeError(f"Checkpoint directory {path} is in use by another agent") from None
+        return fh
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            self.logger.warning(f"Unreadable checkpoint manifest in {self.path}: {e}")
+            return {}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    # Restore
+
+    def restore(self):
+        """Apply the agent-level state now and make each module restore itself on first use."""
+        if not self.manifest:
+            return False
+        self._restore_agent(self.manifest.get("agent") or {})
+        modules = self.agent.modules
+        for name in self.manifest.get("components", {}):
+            if modules.is_loaded(name):
+                # Injected instances (e.g. an in-memory audit) are filled in place
+                self._restore_into(name, modules.get(name))
+            elif name in modules.factories:
+                target, args, kwargs = modules.factories[name]
+                modules.register(name, self._restoring_factory(name, target, args, kwargs))
+        self.logger.info(
+            f"Restoring checkpoint {self.generation} from {self.path} "
+            f"({', '.join(self.manifest.get('components', {})) or 'agent state only'})"
+        )
+        return True
+
+    def _restore_agent(self, state):
+        agent = self.agent
+        wall, now = time.time(), time.monotonic()
+        if state.get("persona"):
+            agent.persona.update(state["persona"])
+        agent._llm_seen_types.update(state.get("llm_seen_types") or [])
+        if state.get("rules_updated") is not None:
+            agent._rules_updated_at = now - (wall - state["rules_updated"])
+        clock = agent.prompts.clock()
+        for event_type, component, received in state.get("prompt_received") or []:
+            agent.prompts.received[(event_type, component)] = clock - (wall - received)
+
+    def _restoring_factory(self, name, target, args, kwargs):
+        def build():
+            start = now_ns()
+            entry = self.manifest["components"][name]
+            try:
+                if name == "vector_store":
+                    from memory.vector_store import VectorStoreMemory
+                    instance = VectorStoreMemory.load(self._file(entry["file"]), mmap=True)
+                elif name == "timeseries":
+                    from memory.timeseries import TimeSeriesMemory
+                    instance = TimeSeriesMemory.load(self._file(entry["file"]), mmap=True)
+                else:
+                    instance = resolve(target)(*args, **kwargs)
+                    self._restore_into(name, instance)
+            except Exception as e:
+                self.metrics.inc("checkpoint_restore_errors_total", labels=(("component", name),))
+                self.logger.warning(f"Could not restore {name}, starting it empty: {e}")
+                self._tokens.pop(name, None)
+                return resolve(target)(*args, **kwargs)
+            self.metrics.observe("checkpoint_restore", now_ns() - start)
+            return instance
+        return build
+
+    def _restore_into(self, name, instance):
+        entry = self.manifest["components"][name]
+        path = self._file(entry["file"])
+        if name in PICKLED:
+            with open(path, "rb") as f:
+                PICKLED[name][1](instance, pickle.load(f))
+        elif name == "raw_text":
+            with open(path, "r", encoding="utf-8") as f:
+                instance.logs = [json.loads(line) for line, _ in zip(f, range(entry["count"]))]
+        elif name == "audit" and getattr(instance, "db_path", None) == ":memory:":
+            source = sqlite3.connect(path)
+            try:
+                with instance._lock:
+                    source.backup(instance.conn)
+            finally:
+                source.close()
+            self._tokens[name] = None
+
+    # Checkpoint
+
+    def checkpoint(self):
+        """Write every loaded component that changed, then the manifest. Returns the names written."""
+        with self._lock:
+            start = now_ns()
+            generation = self.generation + 1
+            components = dict(self.manifest.get("components", {}))
+            if self.agent.modules.is_loaded("audit") and getattr(self.agent.audit, "db_path", None) != ":memory:":
+                # An on-disk audit DB is durable by itself
+                components.pop("audit", None)
+            written = []
+            for name in self._candidates():
+                try:
+                    entry = self._save(name, self.agent.modules.get(name), generation, components.get(name))
+                except Exception as e:
+                    # Usually a module mutated mid-snapshot; the previous file stays valid
+                    self.metrics.inc("checkpoint_errors_total", labels=(("component", name),))
+                    self.logger.warning(f"Checkpoint of {name} failed: {e}")
+                    continue
+                if entry is not None:
+                    components[name] = entry
+                    written.append(name)
+            agent_state = self._agent_state()
+            if not written and agent_state == self.manifest.get("agent"):
+                return written
+            manifest = {
+                "format": FORMAT_VERSION,
+                "generation": generation,
+                "saved_at": time.time(),
+                "components": components,
+                "agent": agent_state,
+            }
+            tmp = self._file(MANIFEST + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._file(MANIFEST))
+            self.manifest = manifest
+            self.generation = generation
+            self._prune()
+            self.metrics.observe("checkpoint", now_ns() - start)
+            self.metrics.set_gauge("checkpoint_generation", generation)
+            for name in written:
+                self.metrics.inc("checkpoint_writes_total", labels=(("component", name),))
+            self.logger.debug(f"Checkpoint {generation}: wrote {written or 'agent state'}")
+            return written
+
+    def _candidates(self):
+        modules = self.agent.modules
+        names = list(PICKLED) + ["vector_store", "timeseries", "raw_text", "audit"]
+        return [name for name in names if modules.is_loaded(name)]
+
+    def _save(self, name, instance, generation, previous):
+        """Write one component if it changed; returns its new manifest entry or None."""
+        if name in PICKLED:
+            data = pickle.dumps(PICKLED[name][0](instance), protocol=pickle.HIGHEST_PROTOCOL)
+            token = hashlib.blake2b(data, digest_size=16).hexdigest()
+            if token == self._tokens.get(name):
+                return None
+            entry = {"file": f"{name}.{generation}.pkl", "format": "pickle", "bytes": len(data)}
+            with open(self._file(entry["file"]), "wb") as f:
+                f.write(data)
+        elif name == "vector_store":
+            token = [instance.next_id, instance.ntotal]
+            if token == self._tokens.get(name):
+                return None
+            entry = {"file": f"{name}.{generation}.faiss", "format": "faiss"}
+            instance.save(self._file(entry["file"]))
+        elif name == "timeseries":
+            token = instance.samples
+            if token == self._tokens.get(name):
+                return None
+            entry = {"file": f"{name}.{generation}", "format": "npy"}
+            instance.save(self._file(entry["file"]))
+        elif name == "raw_text":
+            return self._append_raw_text(instance, previous)
+        elif name == "audit":
+            if getattr(instance, "db_path", None) != ":memory:":
+                return None
+            instance.flush()
+            token = instance.conn.total_changes
+            if token == self._tokens.get(name):
+                return None
+            entry = {"file": f"{name}.{generation}.db", "format": "sqlite"}
+            target = sqlite3.connect(self._file(entry["file"]))
+            try:
+                with instance._lock:
+                    instance.conn.backup(target)
+            finally:
+                target.close()
+        else:
+            return None
+        self._tokens[name] = token
+        entry["token"] = token
+        entry["saved_at"] = time.time()
+        return entry
+
+    def _append_raw_text(self, memory, previous):
+        # Append-only: only entries logged since the last checkpoint are written
+        count = len(memory.logs)
+        entry = dict(previous or {"file": "raw_text.jsonl", "format": "jsonl", "count": 0, "bytes": 0})
+        if count == entry["count"]:
+            return None
+        path = self._file(entry["file"])
+        if count < entry["count"] or not os.path.exists(path):
+            entry["count"], entry["bytes"] = 0, 0
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            # Drop anything a crashed checkpoint appended past the committed size
+            f.truncate(entry["bytes"])
+            f.seek(entry["bytes"])
+            for msg in memory.logs[entry["count"]:count]:
+                f.write((json.dumps(msg, default=str) + "\n").encode("utf-8"))
+            entry["bytes"] = f.tell()
+        entry["count"] = count
+        entry["token"] = count
+        entry["saved_at"] = time.time()
+        return entry
+
+    def _agent_state(self):
+        agent = self.agent
+        wall, now = time.time(), time.monotonic()
+        clock = agent.prompts.clock()
+        updated = agent._rules_updated_at
+        return {
+            "persona": agent.persona.to_dict(),
+            "llm_seen_types": sorted(agent._llm_seen_types, key=str),
+            # Monotonic times do not survive a restart: store them as wall-clock seconds
+            "rules_updated": None if updated is None else round(wall - (now - updated)),
+            "prompt_received": sorted(
+                [event_type, component, round(wall - (clock - received))]
+                for (event_type, component), received in agent.prompts.received.items()
+            ),
+        }
+
+    def _prune(self):
+        """Remove component files no longer referenced by the manifest."""
+        keep = [entry["file"] for entry in self.manifest["components"].values()]
+        for name in os.listdir(self.path):
+            if not _GENERATION_FILE.match(name) or any(name == f or name.startswith(f + ".") for f in keep):
+                continue
+            path = self._file(name)
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError as e:
+                self.logger.debug(f"Could not remove stale checkpoint file {name}: {e}")
+
+    # Background
+
+    def start(self):
+        """Checkpoint every `interval` seconds until stop() (also run at exit)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="Checkpoint", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception as e:
+                self.logger.error(f"Checkpoint failed: {e}")
+
+    def stop(self, final=True):
+        """Stop the background thread; with final=True, write one last checkpoint."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        if final:
+            self.checkpoint()
+        if self._lock_fh is not None:
+            self._lock_fh.close()
+            self._lock_fh = None
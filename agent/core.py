@@ -1,119 +1,586 @@
 import logging
-import openai
-import httpx
 import os
+import time
 from dotenv import load_dotenv
 import re
 import json
 
-from memory.raw_text import RawTextMemory
-from memory.knowledge_graph import KnowledgeGraphMemory
-from memory.vector_store import VectorStoreMemory
-from memory.classic_rules import ClassicRuleMemory
-from memory.fuzzy_rules import FuzzyRuleMemory
-from memory.ml_rules import MLRuleMemory
-from memory.procedural import ProceduralMemory
-from memory.working_mem import WorkingMemory
-from memory.policy import PolicyMemory
-from memory.meta import MetaMemory
-from memory.audit import AuditMemory
-
 from agent.persona import Persona
-from agent.skills import Skills
+from agent.llm_cache import LLMResponseCache
+from agent.metrics import Metrics, now_ns
+from agent.lazy import ModuleRegistry
+from agent.stream_json import IncrementalObjectParser
+from agent.prompt import PromptBuilder
 
 from events.redfish import RedfishEventProcessor
-from tools.external import ExternalTool
+from events.coalesce import EventCoalescer
+
+# Memory modules and tools, imported and built on first attribute access
+# (agent.classic_rules etc.), so workers only pay for what they use.
+DEFAULT_MODULES = {
+    "raw_text": "memory.raw_text:RawTextMemory",
+    "knowledge_graph": "memory.knowledge_graph:KnowledgeGraphMemory",
+    "vector_store": "memory.vector_store:VectorStoreMemory",
+    "classic_rules": "memory.classic_rules:ClassicRuleMemory",
+    "fuzzy_rules": "memory.fuzzy_rules:FuzzyRuleMemory",
+    "ml_rules": "memory.ml_rules:MLRuleMemory",
+    "procedural": "memory.procedural:ProceduralMemory",
+    "working_mem": "memory.working_mem:WorkingMemory",
+    "policy": "memory.policy:PolicyMemory",
+    "meta": "memory.meta:MetaMemory",
+    "timeseries": "memory.timeseries:TimeSeriesMemory",
+    "external": "tools.external:ExternalTool",
+}
+
+# Rule engines in priority order: (name, attribute, latency stage, metric labels)
+RULE_ENGINES = tuple(
+    (name, f"{name}_rules", f"decide_{name}", (("engine", name),)) for name in ("classic", "fuzzy", "ml")
+)
 
 class AgentCore:
-    def __init__(self, llm_server_url=None, api_key=None, http_client=None):
+    def __init__(self, llm_server_url=None, api_key=None, http_client=None, llm_cache=None,
+                 async_http_client=None, llm_concurrency=8, llm_batch_size=1, audit=None,
+                 tiered=False, rules_ttl=300.0, coalesce_window=None, metrics=None, rule_engines=None,
+                 llm_stream=False, stream_early_stop=True, prompt_builder=None, llm_endpoints=None,
+                 checkpoint_dir=None, checkpoint_interval=None):
         load_dotenv()
         self.llm_server_url = llm_server_url or os.getenv("LLM_SERVER_URL", "https://genai-api-dev.dell.com/v1")
         self.api_key = api_key or os.getenv("API_KEY", "no-key")
-        self.openai_client = openai.OpenAI(
-            base_url=self.llm_server_url,
-            api_key=self.api_key,
-            http_client=http_client or httpx.Client()
-        )
+        # Several endpoints (LLM_SERVER_URLS=url1,url2,...) switch to the balanced, hedged client pool
+        self.llm_endpoints = llm_endpoints or [u.strip() for u in os.getenv("LLM_SERVER_URLS", "").split(",") if u.strip()]
+        self._llm_pool = None
+        # LLM clients (and the openai/httpx imports) are built on first use
+        self._http_client = http_client
+        self._openai_client = None
+        self._async_http_client = async_http_client
+        # Streaming mode: route components while the completion is still generating
+        self.llm_stream = llm_stream
+        self.stream_early_stop = stream_early_stop
+        self._async_openai_client = None
+        self.llm_concurrency = llm_concurrency
+        self._llm_slots = None  # (event loop, asyncio.Semaphore), see _llm_semaphore
+        self.llm_batch_size = llm_batch_size
+        # Tiered mode: decide from loaded rules first, call the LLM only when needed
+        self.tiered = tiered
+        self.rules_ttl = rules_ttl
+        self._llm_seen_types = set()
+        # Rule engines consulted by _hybrid_decide, e.g. ("classic",) for a rules-only worker
+        enabled = set(rule_engines or ("classic", "fuzzy", "ml"))
+        self.rule_engines = tuple(engine for engine in RULE_ENGINES if engine[0] in enabled)
+        self._disabled_rules = {engine[1] for engine in RULE_ENGINES if engine[0] not in enabled}
+        self._rules_updated_at = None
+        self.decision_counts = {"rules": 0, "llm": 0}
+        # Alert storm coalescing between parse and handle_event (off when None)
+        self.coalescer = EventCoalescer(window=coalesce_window) if coalesce_window else None
         logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
         self.logger = logging.getLogger("AgentCore")
+        # Stage latency histograms and counters (see agent/metrics.py)
+        self.metrics = metrics or Metrics()
+        # LLM response cache (set LLM_CACHE_PATH to persist across restarts)
+        self.llm_cache = llm_cache or LLMResponseCache(
+            ttl=float(os.getenv("LLM_CACHE_TTL", "600")),
+            db_path=os.getenv("LLM_CACHE_PATH") or None
+        )
 
-        # Memory modules
-        self.raw_text = RawTextMemory()
-        self.knowledge_graph = KnowledgeGraphMemory()
-        self.vector_store = VectorStoreMemory()
-        self.classic_rules = ClassicRuleMemory()
-        self.fuzzy_rules = FuzzyRuleMemory()
-        self.ml_rules = MLRuleMemory()
-        self.procedural = ProceduralMemory()
-        self.working_mem = WorkingMemory()
-        self.policy = PolicyMemory()
-        self.meta = MetaMemory()
-        self.audit = AuditMemory()
-        # Tools
-        self.external = ExternalTool()
+        # Memory modules and tools (lazy, see DEFAULT_MODULES)
+        self.modules = ModuleRegistry(DEFAULT_MODULES)
+        if audit is not None:
+            self.modules.set("audit", audit)
+        else:
+            self.modules.register(
+                "audit", "memory.audit:AuditMemory",
+                db_path=os.getenv("AUDIT_DB_PATH", "audit.db"), write_behind=True
+            )
         # Persona/Skills
         self.persona = Persona()
-        self.skills = Skills()
+        # Cached prompt prefix, per-type component selection and token budget
+        self.prompts = prompt_builder or PromptBuilder(self.persona)
+        self.modules.register("skills", self._build_skills)
+        # Parallel executor for procedural workflows (agent.workflows.run / fan_out)
+        self.modules.register("workflows", self._build_workflow_engine)
         # Event Processors
         self.event_processors = {
             "redfish": RedfishEventProcessor()
         }
+        # Snapshots of the memory modules (CHECKPOINT_DIR): restored lazily at startup, rewritten in the background
+        self.checkpoints = None
+        checkpoint_dir = checkpoint_dir or os.getenv("CHECKPOINT_DIR")
+        if checkpoint_dir:
+            from agent.checkpoint import CheckpointManager
+            if checkpoint_interval is None:
+                checkpoint_interval = float(os.getenv("CHECKPOINT_INTERVAL", "60"))
+            self.checkpoints = CheckpointManager(self, checkpoint_dir, interval=checkpoint_interval)
+            self.checkpoints.restore()
+            if checkpoint_interval > 0:
+                self.checkpoints.start()
+
+    def __getattr__(self, name):
+        # Only reached for attributes not yet set: build registered modules on first access
+        modules = self.__dict__.get("modules")
+        if modules is None or name not in modules:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        instance = modules.get(name)
+        setattr(self, name, instance)
+        return instance
+
+    def _build_skills(self):
+        from agent.skills import Skills
+        return Skills(self.procedural)
+
+    def _build_workflow_engine(self):
+        from agent.workflow import WorkflowEngine
+        return WorkflowEngine(self.procedural, audit=self.audit, metrics=self.metrics)
+
+    @property
+    def llm_pool(self):
+        if self._llm_pool is None and self.llm_endpoints:
+            from agent.llm_client import LLMClientPool
+            self._llm_pool = LLMClientPool(self.llm_endpoints, self.api_key)
+        return self._llm_pool
+
+    def llm_endpoint_stats(self):
+        """Per-endpoint load, latency percentiles and breaker state (pool mode only)."""
+        return self.llm_pool.stats() if self.llm_pool is not None else {}
+
+    @property
+    def openai_client(self):
+        if self._openai_client is None and self.llm_pool is not None:
+            self._openai_client = self.llm_pool
+        if self._openai_client is None:
+            import httpx
+            import openai
+            self._openai_client = openai.OpenAI(
+                base_url=self.llm_server_url,
+                api_key=self.api_key,
+                http_client=self._http_client or httpx.Client()
+            )
+        return self._openai_client
 
     def process_event(self, event_type, payload):
         processor = self.event_processors.get(event_type)
         if not processor:
             raise ValueError(f"No processor for event type: {event_type}")
-        normalized_events = processor.parse(payload)
-        for event in normalized_events:
+        for event in self._coalesce(self.metrics.timed("parse", processor.iter_parse(payload))):
             action, explanation = self.handle_event(event)
             print(f"Processed: {event}")
             print(f"Action: {action}, Explanation: {explanation}")
 
+    def _coalesce(self, events):
+        if self.coalescer is None:
+            yield from events
+            return
+        for event in events:
+            yield from self.coalescer.push(event)
+        # Windows that closed since the last event are decided now, not at the next push
+        yield from self.coalescer.expire()
+
+    def flush_expired(self):
+        """Handle the aggregated events of coalescing windows that have closed (call when the stream idles)."""
+        if self.coalescer is None:
+            return []
+        return [self.handle_event(event) for event in self.coalescer.expire()]
+
+    def flush_coalesced(self):
+        """Handle the aggregated events of every open coalescing group (e.g. at shutdown)."""
+        if self.coalescer is None:
+            return []
+        return [self.handle_event(event) for event in self.coalescer.flush()]
+
+    def ingest_stream(self, source, event_type="redfish", workers=0):
+        """
+        Bulk ingest: stream an NDJSON/JSONL file (or "-" for stdin) of raw
+        payloads through handle_event without materializing it. Returns a
+        {action: count} summary.
+        """
+        from events.bulk import iter_events
+        processor = self.event_processors.get(event_type)
+        if not processor:
+            raise ValueError(f"No processor for event type: {event_type}")
+        counts = {}
+        for event in self._coalesce(self.metrics.timed("parse", iter_events(source, processor, workers=workers))):
+            action, _ = self.handle_event(event)
+            counts[action] = counts.get(action, 0) + 1
+        self.logger.info(f"Bulk ingest done: {sum(counts.values())} events, {counts}")
+        return counts
+
+    async def process_event_async(self, event_type, payload, concurrency=None, batch_size=None):
+        """
+        Async variant of process_event: LLM calls for all events in the payload
+        are fanned out (bounded by the agent-wide llm_concurrency limit, or by
+        `concurrency` when given, optionally packed `batch_size` events per
+        prompt), then results are routed and decided in event order.
+        """
+        processor = self.event_processors.get(event_type)
+        if not processor:
+            raise ValueError(f"No processor for event type: {event_type}")
+        return await self.process_events_async(
+            self.metrics.timed("parse", processor.iter_parse(payload)), concurrency, batch_size
+        )
+
+    async def process_events_async(self, events, concurrency=None, batch_size=None):
+        """process_event_async for already-normalized events, e.g. a micro-batch of several payloads."""
+        import asyncio
+        results = []  # (action, explanation) per event, in input order; None until the LLM answers
+        normalized_events = []
+        pending = []  # (position in results, tentative rule decision, start ns) per event sent to the LLM
+        for event in self._coalesce(events):
+            # Same accounting as handle_event; an LLM event's latency runs until its decision
+            start = now_ns()
+            self.metrics.inc("events_total")
+            self.timeseries.record(event)
+            # Events the fast path decides are done here and never reach the LLM
+            fast, tentative = self._try_fast_path(event)
+            if fast is not None:
+                self.metrics.observe("handle_event", now_ns() - start)
+                print(f"Processed: {event}")
+                print(f"Action: {fast[0]}, Explanation: {fast[1]}")
+                results.append(fast)
+            else:
+                pending.append((len(results), tentative, start))
+                results.append(None)
+                normalized_events.append(event)
+        batch_size = batch_size or self.llm_batch_size
+        # One agent-wide limit unless the caller asks for its own
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else self._llm_semaphore()
+        if batch_size > 1:
+            batches = [normalized_events[i:i + batch_size] for i in range(0, len(normalized_events), batch_size)]
+            batch_results = await asyncio.gather(
+                *(self.query_llm_batch_async(batch, semaphore) for batch in batches)
+            )
+            component_results = [cfg for batch in batch_results for cfg in batch]
+        else:
+            component_results = await asyncio.gather(
+                *(self.query_llm_async(event, semaphore) for event in normalized_events)
+            )
+        for event, component_configs, (pos, tentative, start) in zip(normalized_events, component_results, pending):
+            action, explanation = self._apply_llm_result(event, component_configs, tentative=tentative)
+            self.metrics.observe("handle_event", now_ns() - start)
+            print(f"Processed: {event}")
+            print(f"Action: {action}, Explanation: {explanation}")
+            results[pos] = (action, explanation)
+        return results
+
     def handle_event(self, event):
+        start = now_ns()
+        self.metrics.inc("events_total")
+        self.timeseries.record(event)
+        fast, tentative = self._try_fast_path(event)
+        if fast is not None:
+            self.metrics.observe("handle_event", now_ns() - start)
+            return fast
         # Use LLM to create/update memory modules & get rules
-        component_configs = self.query_llm(event)
-        for component, config in component_configs.items():
-            self._route_to_memory(component, config, event)
-        # Hybrid/hierarchical logic
-        action, explanation = self.hybrid_decide_action(event)
-        self.audit.log_decision(action, explanation, event)
+        if self.llm_stream:
+            component_configs = self.query_llm_stream(event)
+            result = self._apply_llm_result(event, component_configs, routed=True, tentative=tentative)
+        else:
+            component_configs = self.query_llm(event)
+            result = self._apply_llm_result(event, component_configs, tentative=tentative)
+        self.metrics.observe("handle_event", now_ns() - start)
+        return result
+
+    def _try_fast_path(self, event):
+        """
+        Tiered mode: decide from the loaded rule tables alone when the event
+        type has been through the LLM before, the rules are younger than
+        rules_ttl and the engines agree on a non-monitor action. Returns
+        ((action, explanation), None), or (None, tentative) when the LLM is
+        needed; tentative is the rule decision already made (or None), for
+        _apply_llm_result to reuse if the LLM answer changes nothing it read.
+        """
+        if not self.tiered or event.get("type") not in self._llm_seen_types:
+            return None, None
+        if self._rules_updated_at is None or time.monotonic() - self._rules_updated_at > self.rules_ttl:
+            return None, None
+        evaluations = []
+        decision = self._hybrid_decide(event, evaluations)
+        action, explanation, source, agreed = decision
+        if action == "monitor" or not agreed:
+            return None, (decision, evaluations)
+        self._record_evaluations(evaluations)
+        self.decision_counts["rules"] += 1
+        self._log_decision(action, explanation, event, source, "rules")
+        return (action, explanation), None
+
+    def _apply_llm_result(self, event, component_configs, routed=False, tentative=None):
+        if not routed:
+            start = now_ns()
+            self._route_components(component_configs, event)
+            self.metrics.observe("route", now_ns() - start)
+        if component_configs:
+            self._llm_seen_types.add(event.get("type"))
+            self.prompts.mark_received(event.get("type"), component_configs)
+            if any(c in component_configs for c in ("classic_rules", "fuzzy_rules", "ml_rules")):
+                self._rules_updated_at = time.monotonic()
+        # Hybrid/hierarchical logic; the fast path's decision stands if no rule table or state changed
+        if tentative is not None and not any(c in component_configs for c in self.decision_components):
+            (action, explanation, source, _), evaluations = tentative
+            self._record_evaluations(evaluations)
+        else:
+            action, explanation, source, _ = self._hybrid_decide(event)
+        self.decision_counts["llm"] += 1
+        self._log_decision(action, explanation, event, source, "llm")
         return action, explanation
 
+    def _log_decision(self, action, explanation, event, source, tier):
+        start = now_ns()
+        self.audit.log_decision(action, explanation, event, source=source, tier=tier)
+        self.metrics.observe("audit", now_ns() - start)
+
+    def decision_metrics(self):
+        total = self.decision_counts["rules"] + self.decision_counts["llm"]
+        return dict(self.decision_counts, skip_rate=self.decision_counts["rules"] / total if total else 0.0)
+
+    def _build_prompt(self, event):
+        prompt = self.prompts.build(event)
+        self.metrics.inc("llm_prompt_tokens_total", prompt.tokens)
+        return prompt
+
+    def _build_batch_prompt(self, events):
+        prompt = self.prompts.build_batch(events)
+        self.metrics.inc("llm_prompt_tokens_total", prompt.tokens)
+        return prompt
+
+    def _chat_request(self, prompt, max_tokens=1500):
+        return dict(
+            model="llama-3-3-70b-instruct",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=max_tokens
+        )
+
+    def _parse_llm_content(self, content):
+        start = now_ns()
+        try:
+            return self._extract_json(content)
+        finally:
+            self.metrics.observe("json_extract", now_ns() - start)
+
+    def _extract_json(self, content):
+        if not content or not content.strip():
+            raise ValueError("Empty response from LLM")
+        json_match = re.search(r'\{.*\}', content, re.DOTALL)
+        if json_match:
+            content = json_match.group(0)
+        parsed_content = json.loads(content)
+        if not isinstance(parsed_content, dict):
+            raise ValueError("Response is not a JSON object")
+        return parsed_content
+
     def query_llm(self, event):
-        persona_context = json.dumps(self.persona.to_dict(), indent=2)
-        prompt = f"""
-Persona context for this agent (use to guide all logic and recommendations):
-{persona_context}
+        persona_dict = self.persona.to_dict()
+        components = self.prompts.components_for(event)
+        cached = self.llm_cache.get(event, persona_dict, components)
+        if cached is not None:
+            self.metrics.inc("llm_cache_hits_total")
+            self.logger.info(f"LLM cache hit for {event.get('server_id')}/{event.get('type')}")
+            return cached
+        prompt = self._build_prompt(event)
+        self.metrics.inc("llm_requests_total")
+        try:
+            # Built outside the timed region: the llm stage is the request alone
+            client = self.openai_client
+            start = now_ns()
+            response = client.chat.completions.create(
+                **self._chat_request(prompt.text, max_tokens=prompt.max_tokens)
+            )
+            self.metrics.observe("llm", now_ns() - start)
+            parsed_content = self._parse_llm_content(response.choices[0].message.content)
+            self.logger.info(f"LLM response: {json.dumps(parsed_content, indent=2)}")
+            self.llm_cache.put(event, parsed_content, persona_dict, components)
+            return parsed_content
+        except Exception as e:
+            self.metrics.inc("llm_failures_total")
+            self.logger.error(f"LLM query failed: {e}")
+            return {}
 
-Return only a valid JSON object for the server event below. No explanations, comments, or code fences. Each component’s configuration must be a dictionary, not a string or other type. The event is:
-{json.dumps(event, indent=2)}
+    @property
+    def decision_components(self):
+        """Components _hybrid_decide depends on: working state plus the enabled rule tables."""
+        return ("working_mem",) + tuple(attr for _, attr, _, _ in self.rule_engines)
 
-The JSON object must have these keys (dicts or lists): 
-- raw_text, knowledge_graph, vector_store, classic_rules, fuzzy_rules, ml_rules, procedural, working_mem, meta, audit, external, persona, policy.
-"""
+    def query_llm_stream(self, event):
+        """
+        Streaming variant of query_llm. The completion is parsed incrementally
+        and each top-level component is routed to memory as soon as its value
+        closes; with stream_early_stop the stream is cut once every decision
+        component has arrived. Returns the components received (already routed).
+        """
+        persona_dict = self.persona.to_dict()
+        requested = self.prompts.components_for(event)
+        cached = self.llm_cache.get(event, persona_dict, requested)
+        if cached is not None:
+            self.metrics.inc("llm_cache_hits_total")
+            self.logger.info(f"LLM cache hit for {event.get('server_id')}/{event.get('type')}")
+            start = now_ns()
+            self._route_components(cached, event)
+            self.metrics.observe("route", now_ns() - start)
+            return cached
+        prompt = self._build_prompt(event)
+        needed = set(self.decision_components).intersection(prompt.components)
+        parser = IncrementalObjectParser()
+        components = {}
+        chunks = []
+        route_ns = 0
+        failed = stopped_early = False
+        self.metrics.inc("llm_requests_total")
+        start = now_ns()
+        stream = None
         try:
-            response = self.openai_client.chat.completions.create(
-                model="llama-3-3-70b-instruct",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=1500
+            client = self.openai_client
+            start = now_ns()
+            stream = client.chat.completions.create(
+                stream=True, **self._chat_request(prompt.text, max_tokens=prompt.max_tokens)
             )
-            content = response.choices[0].message.content
-            if not content.strip():
-                raise ValueError("Empty response from LLM")
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                content = json_match.group(0)
-            parsed_content = json.loads(content)
-            if not isinstance(parsed_content, dict):
-                raise ValueError("Response is not a JSON object")
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                chunks.append(delta)
+                for component, config in parser.feed(delta):
+                    if not components:
+                        self.metrics.observe("llm_first_component", now_ns() - start)
+                    components[component] = config
+                    needed.discard(component)
+                    route_start = now_ns()
+                    self._route_to_memory(component, config, event)
+                    route_ns += now_ns() - route_start
+                if parser.done:
+                    break
+                if self.stream_early_stop and not needed:
+                    stopped_early = True
+                    break
+        except Exception as e:
+            failed = True
+            self.metrics.inc("llm_failures_total")
+            self.logger.error(f"LLM stream failed: {e}")
+        finally:
+            if stream is not None:
+                # Closing the response also stops generation on an early exit
+                stream.close()
+        self.metrics.observe("llm", now_ns() - start)
+        if stopped_early:
+            self.metrics.inc("llm_stream_early_stops_total")
+        if not components and chunks and not failed:
+            # Nothing parsed incrementally: fall back to whole-text extraction
+            try:
+                components = self._parse_llm_content("".join(chunks))
+            except ValueError as e:
+                self.metrics.inc("llm_failures_total")
+                self.logger.error(f"LLM stream returned no JSON object: {e}")
+                return {}
+            route_start = now_ns()
+            self._route_components(components, event)
+            route_ns += now_ns() - route_start
+        self.metrics.observe("route", route_ns)
+        if components and not failed:
+            self.logger.info(f"LLM streamed {len(components)} components: {', '.join(components)}")
+            self.llm_cache.put(event, components, persona_dict, requested)
+        return components
+
+    def _route_components(self, component_configs, event):
+        for component, config in component_configs.items():
+            self._route_to_memory(component, config, event)
+
+    @property
+    def async_openai_client(self):
+        if self._async_openai_client is None and self.llm_pool is not None:
+            self._async_openai_client = self.llm_pool.aio
+        if self._async_openai_client is None:
+            import httpx
+            import openai
+            self._async_openai_client = openai.AsyncOpenAI(
+                base_url=self.llm_server_url,
+                api_key=self.api_key,
+                http_client=self._async_http_client or httpx.AsyncClient()
+            )
+        return self._async_openai_client
+
+    def _llm_semaphore(self):
+        """The agent-wide llm_concurrency limit shared by every async call on the running loop."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if self._llm_slots is None or self._llm_slots[0] is not loop:
+            self._llm_slots = (loop, asyncio.Semaphore(self.llm_concurrency))
+        return self._llm_slots[1]
+
+    async def query_llm_async(self, event, semaphore=None):
+        persona_dict = self.persona.to_dict()
+        components = self.prompts.components_for(event)
+        cached = self.llm_cache.get(event, persona_dict, components)
+        if cached is not None:
+            self.metrics.inc("llm_cache_hits_total")
+            self.logger.info(f"LLM cache hit for {event.get('server_id')}/{event.get('type')}")
+            return cached
+        return await self._query_llm_async(event, persona_dict, components, semaphore)
+
+    async def _query_llm_async(self, event, persona_dict, components, semaphore):
+        # A known cache miss: the caller already looked it up
+        prompt = self._build_prompt(event)
+        self.metrics.inc("llm_requests_total")
+        try:
+            client = self.async_openai_client
+            async with semaphore or self._llm_semaphore():
+                start = now_ns()
+                response = await client.chat.completions.create(
+                    **self._chat_request(prompt.text, max_tokens=prompt.max_tokens)
+                )
+                self.metrics.observe("llm", now_ns() - start)
+            parsed_content = self._parse_llm_content(response.choices[0].message.content)
             self.logger.info(f"LLM response: {json.dumps(parsed_content, indent=2)}")
+            self.llm_cache.put(event, parsed_content, persona_dict, components)
             return parsed_content
         except Exception as e:
+            self.metrics.inc("llm_failures_total")
             self.logger.error(f"LLM query failed: {e}")
             return {}
 
+    async def query_llm_batch_async(self, events, semaphore=None):
+        """
+        Ask for several events in one prompt. Returns one component dict per
+        event, in order; cache hits are not sent and missing entries come back {}.
+        """
+        persona_dict = self.persona.to_dict()
+        requested = [self.prompts.components_for(event) for event in events]
+        results = [self.llm_cache.get(event, persona_dict, c) for event, c in zip(events, requested)]
+        pending = [i for i, cached in enumerate(results) if cached is None]
+        if len(pending) < len(events):
+            self.metrics.inc("llm_cache_hits_total", len(events) - len(pending))
+        if not pending:
+            return results
+        if len(pending) == 1:
+            i = pending[0]
+            results[i] = await self._query_llm_async(events[i], persona_dict, requested[i], semaphore)
+            return results
+        batch = [events[i] for i in pending]
+        prompt = self._build_batch_prompt(batch)
+        self.metrics.inc("llm_requests_total")
+        try:
+            client = self.async_openai_client
+            async with semaphore or self._llm_semaphore():
+                start = now_ns()
+                response = await client.chat.completions.create(
+                    **self._chat_request(prompt.text, max_tokens=prompt.max_tokens)
+                )
+                self.metrics.observe("llm", now_ns() - start)
+            parsed_content = self._parse_llm_content(response.choices[0].message.content)
+            self.logger.info(f"LLM batch response for {len(batch)} events")
+        except Exception as e:
+            self.metrics.inc("llm_failures_total")
+            self.logger.error(f"LLM batch query failed: {e}")
+            parsed_content = {}
+        for pos, i in enumerate(pending):
+            configs = parsed_content.get(str(pos))
+            if isinstance(configs, dict):
+                self.llm_cache.put(events[i], configs, persona_dict, requested[i])
+                results[i] = configs
+            else:
+                results[i] = {}
+        return results
+
     def _route_to_memory(self, component, config, event):
+        if component in self._disabled_rules:
+            # Tables for engines this agent does not run are not loaded at all
+            return
         try:
             # Route to the correct module; each module handles ingest and structure.
             if component == "raw_text":
@@ -143,37 +610,56 @@ The JSON object must have these keys (dicts or lists):
             elif component == "persona":
                 self.persona.update(config)
         except Exception as e:
+            self.metrics.inc("routing_errors_total", labels=(("component", component),))
             self.logger.warning(f"Error routing {component}: {e}")
 
+    def _record_evaluations(self, evaluations):
+        for stage, elapsed, labels, matched in evaluations:
+            self.metrics.observe(stage, elapsed)
+            self.metrics.inc("rule_engine_evaluations_total", labels=labels)
+            if matched:
+                self.metrics.inc("rule_engine_matches_total", labels=labels)
+
     def hybrid_decide_action(self, event):
+        action, explanation, _, _ = self._hybrid_decide(event)
+        return action, explanation
+
+    def _hybrid_decide(self, event, evaluations=None):
+        """
+        Like hybrid_decide_action, plus the rule source that decided ('classic',
+        'fuzzy', 'ml' or 'default') and whether all matching engines agreed.
+        With an `evaluations` list, per-engine metrics are collected there
+        instead of recorded (see _record_evaluations).
+        """
+        record = evaluations is None
+        evaluations = [] if record else evaluations
         explanations = []
         matches = []
         state = self.working_mem.get_state(event)
-        # Classic rules
-        classic_action, classic_expl = self.classic_rules.decide_action(state)
-        explanations.append(classic_expl)
-        if classic_action != "monitor":
-            matches.append(("classic", classic_action, classic_expl))
-        # Fuzzy rules
-        fuzzy_action, fuzzy_expl = self.fuzzy_rules.decide_action(state)
-        explanations.append(fuzzy_expl)
-        if fuzzy_action and fuzzy_action != "monitor":
-            matches.append(("fuzzy", fuzzy_action, fuzzy_expl))
-        # ML rules
-        ml_action, ml_expl = self.ml_rules.decide_action(state)
-        explanations.append(ml_expl)
-        if ml_action and ml_action != "monitor":
-            matches.append(("ml", ml_action, ml_expl))
+        # Rolling telemetry features (e.g. temperature_slope_5m) for the rule engines
+        state.update(self.timeseries.features(event))
+        # Classic, fuzzy, then ML rules
+        for engine, attr, stage, labels in self.rule_engines:
+            start = now_ns()
+            engine_action, engine_expl = getattr(self, attr).decide_action(state)
+            matched = bool(engine_action and engine_action != "monitor")
+            evaluations.append((stage, now_ns() - start, labels, matched))
+            explanations.append(engine_expl)
+            if matched:
+                matches.append((engine, engine_action, engine_expl))
+        if record:
+            self._record_evaluations(evaluations)
         # Priority
         for rule_type in ["classic", "fuzzy", "ml"]:
             for mtype, action, expl in matches:
                 if mtype == rule_type:
                     explanations.append(f"[Decision] Chose action '{action}' from {mtype} rules")
-                    return action, " | ".join(explanations)
+                    agreed = all(other == action for _, other, _ in matches)
+                    return action, " | ".join(explanations), mtype, agreed
         # Default
         persona = self.persona
         explanation = (
-            f"Default action 'monitor' selected for event {event.get('type','?')} with state {state}. "
+            f"Default action 'monitor' selected for event {event.get('type','?')} with state {dict(state)}. "
             f"No rule match. (Persona: {persona.name}, style: {persona.style}) | " + " | ".join(explanations)
         )
-        return "monitor", explanation
+        return "monitor", explanation, "default", True
@@ -0,0 +1,88 @@
+import importlib
+import importlib.util
+import logging
+import sys
+import threading
+import time
+
+# lazy_import/resolve are shared by every layer (agent, memory, events); this
+# module imports nothing else from the project, so any package may depend on it.
+
+
+def lazy_import(name):
+    """
+    Return module `name`, deferring its execution until the first attribute
+    access. Already-imported modules are returned as-is.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def resolve(target):
+    """A callable target as-is, or the attribute a "package.module:attr" string names (imported now)."""
+    if callable(target):
+        return target
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class ModuleRegistry:
+    """
+    Named components built on first use. A target is a callable or a
+    "package.module:Class" string, so the module is not even imported until
+    get() is called. Instances can also be set directly (injection).
+    """
+
+    def __init__(self, targets=None):
+        self.logger = logging.getLogger("ModuleRegistry")
+        self.factories = {}
+        self.instances = {}
+        self.load_times = {}  # name -> seconds spent importing + constructing
+        self._lock = threading.RLock()
+        for name, target in (targets or {}).items():
+            self.register(name, target)
+
+    def register(self, name, target, *args, **kwargs):
+        with self._lock:
+            self.factories[name] = (target, args, kwargs)
+            self.instances.pop(name, None)
+
+    def set(self, name, instance):
+        with self._lock:
+            self.instances[name] = instance
+
+    def get(self, name):
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name in self.instances:
+                return self.instances[name]
+            if name not in self.factories:
+                raise KeyError(name)
+            target, args, kwargs = self.factories[name]
+            start = time.perf_counter()
+            instance = resolve(target)(*args, **kwargs)
+            self.load_times[name] = time.perf_counter() - start
+            self.logger.debug(f"Loaded {name} in {self.load_times[name] * 1e3:.1f} ms")
+            self.instances[name] = instance
+            return instance
+
+    def is_loaded(self, name):
+        return name in self.instances
+
+    def loaded(self):
+        return list(self.instances)
+
+    def __contains__(self, name):
+        return name in self.factories or name in self.instances
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Fields that identify "the same" event for LLM purposes
+SIGNATURE_FIELDS = ("server_id", "type", "severity", "message", "component", "status")
+
+# Numeric readings are bucketed so 88C and 89C share a cache entry
+DEFAULT_BUCKETS = {
+    "value": 5,
+    "temperature": 5,
+    "cpu_temp": 5,
+    "fan_rpm": 500,
+}
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def event_signature(event, persona=None, buckets=None, components=None):
+    """
+    Build a canonical signature for an event: identity fields, with numbers in
+    the message templated out and numeric readings bucketed. Timestamps and
+    event ids are ignored on purpose. `components` (the memory components
+    the prompt asked for) is part of the signature: an answer to a
+    working_mem-only prompt must not stand in for one that asked for rules.
+    """
+    buckets = DEFAULT_BUCKETS if buckets is None else buckets
+    sig = {}
+    for field in SIGNATURE_FIELDS:
+        val = event.get(field)
+        if val is None:
+            continue
+        if field == "message" and isinstance(val, str):
+            val = _NUMBER_RE.sub("#", val)
+        sig[field] = val
+    for field, width in buckets.items():
+        val = event.get(field)
+        if isinstance(val, bool) or not isinstance(val, (int, float)):
+            if val is not None:
+                sig[field] = str(val)
+            continue
+        sig[field] = int(val // width) * width if width else val
+    if persona is not None:
+        sig["persona"] = persona
+    if components is not None:
+        sig["components"] = sorted(components)
+    return sig
+
+
+def signature_key(signature):
+    blob = json.dumps(signature, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LRU/TTL cache for parsed LLM responses, keyed on event_signature().
+    Optionally backed by a SQLite file so entries survive restarts.
+    """
+
+    def __init__(self, max_entries=1024, ttl=600.0, db_path=None, buckets=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.buckets = DEFAULT_BUCKETS if buckets is None else buckets
+        self.logger = logging.getLogger("LLMResponseCache")
+        self._entries = OrderedDict()  # key -> (created, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.conn = None
+        if db_path:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT, created REAL)"
+            )
+            self.conn.commit()
+
+    def key_for(self, event, persona=None, components=None):
+        return signature_key(event_signature(event, persona, self.buckets, components))
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, event, persona=None, components=None):
+        key = self.key_for(event, persona, components)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            if self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT response, created FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and not self._expired(row[1], now):
+                    response = json.loads(row[0])
+                    self._store(key, row[1], response)
+                    self.hits += 1
+                    return response
+            self.misses += 1
+            return None
+
+    def put(self, event, response, persona=None, components=None):
+        key = self.key_for(event, persona, components)
+        now = time.time()
+        with self._lock:
+            self._store(key, now, response)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(response), now),
+                )
+                self.conn.commit()
+
+    def _store(self, key, created, response):
+        self._entries[key] = (created, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM llm_cache")
+                self.conn.commit()
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (created, _) in self._entries.items() if self._expired(created, now)]:
+                del self._entries[key]
+            if self.conn is not None and self.ttl is not None:
+                self.conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,))
+                self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,362 @@
+import asyncio
+import concurrent.futures
+import importlib.util
+import logging
+import random
+import threading
+import time
+
+from agent.metrics import LatencyHistogram, now_ns
+
+
+class LLMUnavailableError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half_open after the backoff, which doubles each time a probe fails (up to
+    `max_reset_timeout`). Half-open lets one probe through: success closes it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=5.0, max_reset_timeout=120.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self.probing = False
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+            self.reset_timeout = self.base_timeout
+
+    def release(self):
+        """Give back a half-open probe that ended without an answer (cancelled), recording nothing."""
+        with self._lock:
+            if self.state == "half_open":
+                self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open":
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == "closed" and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = self.clock()
+        self.probing = False
+
+
+class Endpoint:
+    """One inference node: lazily built sync/async clients plus its load and latency stats."""
+
+    def __init__(self, url, pool):
+        self.url = url
+        self.pool = pool
+        self.breaker = CircuitBreaker(pool.failure_threshold, pool.reset_timeout, pool.max_reset_timeout)
+        self.latency = LatencyHistogram()
+        self.ewma = None  # seconds
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            import openai
+            self._client = openai.OpenAI(
+                base_url=self.url, api_key=self.pool.api_key, max_retries=0, timeout=self.pool.timeout,
+                http_client=httpx.Client(**self.pool.http_options()),
+            )
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            import httpx
+            import openai
+            self._async_client = openai.AsyncOpenAI(
+                base_url=self.url, api_key=self.pool.api_key, max_retries=0, timeout=self.pool.timeout,
+                http_client=httpx.AsyncClient(**self.pool.http_options()),
+            )
+        return self._async_client
+
+    def p(self, q):
+        return self.latency.percentile(q) / 1e9
+
+    def stats(self):
+        snap = self.latency.snapshot()
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "hedges_won": self.hedges_won,
+            "p50_ms": snap["p50_us"] / 1e3,
+            "p95_ms": self.p(0.95) * 1e3,
+            "p99_ms": snap["p99_us"] / 1e3,
+            "ewma_ms": (self.ewma or 0.0) * 1e3,
+        }
+
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+
+class _AsyncView:
+    """Async face of the pool: .chat.completions.create(...) is awaitable, like openai.AsyncOpenAI."""
+
+    def __init__(self, pool):
+        self.chat = _Chat(pool.acreate)
+
+
+class LLMClientPool:
+    """
+    OpenAI-compatible client over several inference endpoints. Each request
+    goes to the healthy endpoint with the fewest outstanding requests (ties:
+    lower EWMA latency). If it has not answered within that endpoint's p95
+    latency, a hedged duplicate goes to the next best endpoint and the first
+    success wins. Failures fail over to another endpoint, and repeatedly
+    failing endpoints are taken out by a circuit breaker.
+
+    Drop-in for openai.OpenAI(...).chat.completions.create; `pool.aio` is the
+    asyncio equivalent. Streaming requests are balanced but not hedged. A
+    losing async hedge is cancelled; a losing blocking one is dropped if
+    still queued, otherwise left to finish in its worker thread.
+    """
+
+    def __init__(self, endpoints, api_key, timeout=30.0, connect_timeout=3.0, max_connections=64,
+                 max_keepalive=32, http2=None, hedge_quantile=0.95, hedge_min_samples=20,
+                 initial_hedge_delay=2.0, failure_threshold=5, reset_timeout=5.0, max_reset_timeout=120.0,
+                 max_workers=64):
+        if not endpoints:
+            raise ValueError("LLMClientPool needs at least one endpoint")
+        self.logger = logging.getLogger("LLMClientPool")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        # HTTP/2 needs the optional h2 package (pip install httpx[http2])
+        self.http2 = importlib.util.find_spec("h2") is not None if http2 is None else http2
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.initial_hedge_delay = initial_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.endpoints = [Endpoint(url.rstrip("/"), self) for url in endpoints]
+        self.hedges = 0
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="LLMPool")
+        self.chat = _Chat(self.create)
+        self.aio = _AsyncView(self)
+
+    def http_options(self):
+        import httpx
+        return dict(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+
+    def pick(self, exclude=()):
+        """Least-outstanding healthy endpoint not in `exclude`."""
+        candidates = [e for e in self.endpoints if e not in exclude]
+        random.shuffle(candidates)
+        candidates.sort(key=lambda e: (e.outstanding, e.ewma if e.ewma is not None else 0.0))
+        for endpoint in candidates:
+            if endpoint.breaker.allow():
+                return endpoint
+        return None
+
+    def hedge_delay(self, endpoint):
+        if endpoint.latency.count < self.hedge_min_samples:
+            return self.initial_hedge_delay
+        return endpoint.p(self.hedge_quantile)
+
+    def _start(self, endpoint):
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+        return now_ns()
+
+    def _finish(self, endpoint, start, error=None):
+        elapsed = now_ns() - start
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.latency.record(elapsed)
+                seconds = elapsed / 1e9
+                endpoint.ewma = seconds if endpoint.ewma is None else 0.8 * endpoint.ewma + 0.2 * seconds
+            else:
+                endpoint.failures += 1
+        if error is None:
+            endpoint.breaker.record_success()
+        else:
+            endpoint.breaker.record_failure()
+            self.logger.warning(f"LLM endpoint {endpoint.url} failed: {error}")
+
+    def _call(self, endpoint, request, settled=None):
+        if settled is not None and settled.is_set():
+            # A hedge that only got a worker after the race was won: skip it
+            endpoint.breaker.release()
+            raise concurrent.futures.CancelledError()
+        start = self._start(endpoint)
+        try:
+            response = endpoint.client.chat.completions.create(**request)
+        except Exception as e:
+            self._finish(endpoint, start, e)
+            raise
+        self._finish(endpoint, start)
+        if settled is not None:
+            settled.set()
+        return response
+
+    async def _acall(self, endpoint, request):
+        start = self._start(endpoint)
+        try:
+            response = await endpoint.async_client.chat.completions.create(**request)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not a failure, but not a latency sample either
+            with self._lock:
+                endpoint.outstanding -= 1
+            endpoint.breaker.release()
+            raise
+        except Exception as e:
+            self._finish(endpoint, start, e)
+            raise
+        self._finish(endpoint, start)
+        return response
+
+    def create(self, **request):
+        """Chat completion with balancing, hedging and failover (blocking)."""
+        tried = []
+        last_error = None
+        while True:
+            primary = self.pick(exclude=tried)
+            if primary is None:
+                raise LLMUnavailableError(f"No healthy LLM endpoint ({last_error})")
+            tried.append(primary)
+            if request.get("stream"):
+                try:
+                    return self._call(primary, request)
+                except Exception as e:
+                    last_error = e
+                    continue
+            settled = threading.Event()
+            futures = {self._executor.submit(self._call, primary, request, settled): primary}
+            done, _ = concurrent.futures.wait(futures, timeout=self.hedge_delay(primary))
+            if not done:
+                secondary = self.pick(exclude=tried)
+                if secondary is not None:
+                    tried.append(secondary)
+                    self.hedges += 1
+                    futures[self._executor.submit(self._call, secondary, request, settled)] = secondary
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        # A loser still queued never runs; one already running finishes in the background
+                        for other in pending:
+                            if other.cancel():
+                                futures[other].breaker.release()
+                        if futures[future] is not primary:
+                            futures[future].hedges_won += 1
+                        return future.result()
+                    last_error = future.exception()
+            # Every attempt failed: fail over to an endpoint not tried yet
+
+    async def acreate(self, **request):
+        """Async chat completion with balancing, hedging and failover; the losing hedge is cancelled."""
+        tried = []
+        last_error = None
+        while True:
+            primary = self.pick(exclude=tried)
+            if primary is None:
+                raise LLMUnavailableError(f"No healthy LLM endpoint ({last_error})")
+            tried.append(primary)
+            if request.get("stream"):
+                try:
+                    return await self._acall(primary, request)
+                except Exception as e:
+                    last_error = e
+                    continue
+            tasks = {asyncio.ensure_future(self._acall(primary, request)): primary}
+            try:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary))
+                if not done:
+                    secondary = self.pick(exclude=tried)
+                    if secondary is not None:
+                        tried.append(secondary)
+                        self.hedges += 1
+                        tasks[asyncio.ensure_future(self._acall(secondary, request))] = secondary
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    winner = None
+                    for task in done:
+                        # Retrieve every exception, even when another task won
+                        if task.exception() is None:
+                            winner = winner or task
+                        else:
+                            last_error = task.exception()
+                    if winner is not None:
+                        if tasks[winner] is not primary:
+                            tasks[winner].hedges_won += 1
+                        return winner.result()
+            finally:
+                # Losing hedges, or everything if the caller was cancelled
+                for task in tasks:
+                    task.cancel()
+            # Every attempt failed: fail over to an endpoint not tried yet
+
+    def stats(self):
+        return {"hedges": self.hedges, "endpoints": [e.stats() for e in self.endpoints]}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for endpoint in self.endpoints:
+            if endpoint._client is not None:
+                endpoint._client.close()
@@ -0,0 +1,287 @@
+import collections
+import logging
+import sys
+import threading
+import time
+
+now_ns = time.perf_counter_ns
+
+# Log-linear buckets: 8 sub-buckets per power of two (~12.5% relative error)
+SUB_BUCKET_BITS = 3
+_SUB = 1 << SUB_BUCKET_BITS
+_BUCKETS = 64 * _SUB
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram over nanosecond values: fixed log-linear buckets, so
+    record() is a couple of integer ops and memory is constant.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value_ns):
+        if value_ns >= _SUB * 2:
+            shift = value_ns.bit_length() - SUB_BUCKET_BITS - 1
+            self.counts[(shift << SUB_BUCKET_BITS) + (value_ns >> shift)] += 1
+        else:
+            self.counts[value_ns if value_ns > 0 else 0] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+
+    @staticmethod
+    def _upper(index):
+        if index < _SUB * 2:
+            return index
+        shift, top = divmod(index, _SUB)
+        shift -= 1
+        return ((top + _SUB + 1) << shift) - 1
+
+    def percentile(self, q):
+        """Upper bound (ns) of the bucket holding the q-th quantile (0 <= q <= 1)."""
+        if not self.count:
+            return 0
+        target = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(0.5) / 1e3,
+            "p90_us": self.percentile(0.9) / 1e3,
+            "p99_us": self.percentile(0.99) / 1e3,
+            "max_us": self.max / 1e3,
+        }
+
+
+class Metrics:
+    """
+    Stage latency histograms and labelled counters for the agent pipeline.
+    Hot-path calls are plain dict/list updates (no locks); under threads the
+    counts are best-effort. Sinks receive the registry on export().
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = collections.defaultdict(LatencyHistogram)
+        self.counters = {}  # (name, labels tuple) -> value
+        self.gauges = {}  # (name, labels tuple) -> last value set
+        self.sinks = []
+        self.profiler = None
+
+    def observe(self, stage, elapsed_ns):
+        if self.enabled:
+            self.histograms[stage].record(elapsed_ns)
+
+    def inc(self, name, value=1, labels=()):
+        """Bump a counter; `labels` is a tuple of (key, value) pairs, ideally a prebuilt constant."""
+        if self.enabled:
+            key = (name, labels)
+            counters = self.counters
+            counters[key] = counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, labels=()):
+        if self.enabled:
+            self.gauges[(name, labels)] = value
+
+    def timed(self, stage, iterable):
+        """Wrap an iterator, timing each next() as `stage` (used for lazy parsing)."""
+        it = iter(iterable)
+        while True:
+            start = now_ns()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.observe(stage, now_ns() - start)
+            yield item
+
+    def counter(self, name, labels=()):
+        return self.counters.get((name, labels), 0)
+
+    def match_rates(self):
+        """Per rule engine: fraction of evaluations that produced a non-monitor action."""
+        rates = {}
+        for (name, labels), evaluated in self.counters.items():
+            if name == "rule_engine_evaluations_total":
+                engine = dict(labels)["engine"]
+                rates[engine] = self.counter("rule_engine_matches_total", labels) / evaluated if evaluated else 0.0
+        return rates
+
+    def snapshot(self):
+        return {
+            "stages": {stage: h.snapshot() for stage, h in self.histograms.items()},
+            "counters": {
+                name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else ""): value
+                for (name, labels), value in self.counters.items()
+            },
+            "gauges": {
+                name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else ""): value
+                for (name, labels), value in self.gauges.items()
+            },
+            "match_rates": self.match_rates(),
+        }
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+        self.gauges.clear()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def export(self):
+        for sink in self.sinks:
+            sink.export(self)
+
+    def enable_profiler(self, interval=0.005):
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(interval)
+            self.profiler.start()
+        return self.profiler
+
+    def disable_profiler(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler = None
+
+
+class MetricsSink:
+    """Base sink: receives the Metrics registry on Metrics.export()."""
+
+    def export(self, metrics):
+        raise NotImplementedError
+
+
+class LoggingSink(MetricsSink):
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("Metrics")
+
+    def export(self, metrics):
+        self.logger.info(f"Metrics: {metrics.snapshot()}")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+
+class PrometheusExporter(MetricsSink):
+    """
+    Renders metrics in the Prometheus text exposition format and can serve
+    them on /metrics from a background HTTP server.
+    """
+
+    def __init__(self, prefix="aidel"):
+        self.prefix = prefix
+        self.metrics = None
+        self.server = None
+
+    def export(self, metrics):
+        self.metrics = metrics
+
+    def render(self, metrics=None):
+        metrics = metrics or self.metrics
+        lines = []
+        name = f"{self.prefix}_stage_latency_seconds"
+        lines.append(f"# TYPE {name} summary")
+        for stage, hist in sorted(metrics.histograms.items()):
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f"{name}{_labels([('stage', stage), ('quantile', q)])} {hist.percentile(q) / 1e9:.9f}")
+            lines.append(f"{name}_sum{_labels([('stage', stage)])} {hist.total / 1e9:.9f}")
+            lines.append(f"{name}_count{_labels([('stage', stage)])} {hist.count}")
+        by_name = collections.defaultdict(list)
+        for (counter, labels), value in metrics.counters.items():
+            by_name[counter].append((labels, value))
+        for counter, series in sorted(by_name.items()):
+            full = f"{self.prefix}_{counter}"
+            lines.append(f"# TYPE {full} counter")
+            for labels, value in series:
+                lines.append(f"{full}{_labels(labels)} {value}")
+        by_name = collections.defaultdict(list)
+        for (gauge, labels), value in metrics.gauges.items():
+            by_name[gauge].append((labels, value))
+        for gauge, series in sorted(by_name.items()):
+            full = f"{self.prefix}_{gauge}"
+            lines.append(f"# TYPE {full} gauge")
+            for labels, value in series:
+                lines.append(f"{full}{_labels(labels)} {value}")
+        rate_name = f"{self.prefix}_rule_engine_match_rate"
+        lines.append(f"# TYPE {rate_name} gauge")
+        for engine, rate in sorted(metrics.match_rates().items()):
+            lines.append(f"{rate_name}{_labels([('engine', engine)])} {rate:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, metrics, port=9108, host="0.0.0.0"):
+        """Serve /metrics for `metrics` on a daemon thread; returns the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.metrics = metrics
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="MetricsHTTP", daemon=True).start()
+        return self.server
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler: a daemon thread samples every other
+    thread's current frame every `interval` seconds and counts hot spots.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    code = frame.f_code
+                    self.samples[f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def top(self, n=20):
+        return self.samples.most_common(n)
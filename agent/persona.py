@@ -11,9 +11,24 @@ class Persona:
             "tone": "empathetic"
         }
 
+        # Bumped whenever update() changes something (prompt prefixes are cached per version)
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version
+
     def update(self, cfg):
+        changed = False
         for k, v in cfg.items():
-            setattr(self, k, v)
+            # Private fields and names of properties/methods (e.g. version) are not persona fields
+            if k.startswith("_") or hasattr(type(self), k):
+                continue
+            if getattr(self, k, None) != v:
+                setattr(self, k, v)
+                changed = True
+        if changed:
+            self._version += 1
 
     def to_dict(self):
-        return self.__dict__
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
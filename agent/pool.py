@@ -0,0 +1,246 @@
+import bisect
+import collections
+import hashlib
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+from memory.audit import AuditMemory, RemoteAuditMemory
+
+# Seconds a blocked submit() waits between worker liveness checks
+LIVENESS_INTERVAL = 1.0
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(str(key).encode("utf-8")).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """Stable server_id -> worker mapping; adding a node only moves ~1/n of the keys."""
+
+    def __init__(self, nodes, replicas=64):
+        self.replicas = replicas
+        self._ring = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = _hash(f"{node}#{i}")
+            bisect.insort(self._ring, h)
+            self._nodes[h] = node
+
+    def node_for(self, key):
+        i = bisect.bisect(self._ring, _hash(key)) % len(self._ring)
+        return self._nodes[self._ring[i]]
+
+
+def _worker_kwargs(index, agent_kwargs):
+    """AgentCore kwargs for worker `index`: each worker checkpoints into its own subdirectory."""
+    kwargs = dict(agent_kwargs or {})
+    checkpoint_dir = kwargs.get("checkpoint_dir") or os.getenv("CHECKPOINT_DIR")
+    if checkpoint_dir:
+        kwargs["checkpoint_dir"] = os.path.join(checkpoint_dir, f"worker-{index}")
+    return kwargs
+
+
+def _worker_main(index, in_queue, audit_queue, result_queue, processed, agent_kwargs):
+    # Imported here so spawned workers only pay for what they use
+    from agent.core import AgentCore
+    logger = logging.getLogger(f"AgentWorker-{index}")
+    agent = AgentCore(audit=RemoteAuditMemory(audit_queue), **agent_kwargs)
+    while True:
+        event = in_queue.get()
+        if event is None:
+            break
+        try:
+            action, explanation = agent.handle_event(event)
+            if result_queue is not None:
+                result_queue.put((event, action, explanation))
+        except Exception as e:
+            logger.error(f"Worker {index} failed on event: {e}")
+        with processed.get_lock():
+            processed[index] += 1
+
+
+class AgentPool:
+    """
+    Pool of worker processes, each running its own AgentCore. Events are
+    consistently hashed by server_id, so a server's working memory, rule
+    tables and time series stay local to one worker (and so do checkpoints:
+    worker i uses <checkpoint_dir>/worker-i). Every worker ships audit
+    rows to a single writer thread here that owns the audit database.
+
+    submit() blocks when the target worker's queue is full (backpressure);
+    close() drains all queued events before stopping. A worker found dead
+    by submit() is restarted on a fresh queue (up to `max_restarts` times
+    each, then submit raises RuntimeError); events it had taken are lost.
+    """
+
+    def __init__(self, workers=None, queue_size=1000, audit=None, agent_kwargs=None,
+                 collect_results=False, start_method="spawn", max_restarts=5):
+        self.logger = logging.getLogger("AgentPool")
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.agent_kwargs = agent_kwargs
+        self.max_restarts = max_restarts
+        self.restarts = [0] * self.workers
+        self._ctx = ctx = mp.get_context(start_method)
+        self.audit = audit or AuditMemory(db_path=os.getenv("AUDIT_DB_PATH", "audit.db"))
+        self.audit_queue = ctx.Queue()
+        # Results are pulled off the pipe by a thread so workers never block on exit
+        self._result_queue = ctx.Queue() if collect_results else None
+        self.results = collections.deque()
+        self.processed = ctx.Array("q", self.workers)
+        self.submitted = [0] * self.workers
+        self.queues = [ctx.Queue(maxsize=queue_size) for _ in range(self.workers)]
+        self.ring = ConsistentHashRing(range(self.workers))
+        self.processes = [self._spawn(i) for i in range(self.workers)]
+        self.audit_rows = 0
+        self._audit_thread = threading.Thread(target=self._audit_writer, name="PoolAuditWriter", daemon=True)
+        self._audit_thread.start()
+        self._result_thread = None
+        if collect_results:
+            self._result_thread = threading.Thread(target=self._result_collector, name="PoolResults", daemon=True)
+            self._result_thread.start()
+        self._closed = False
+
+    def _spawn(self, index):
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.queues[index], self.audit_queue, self._result_queue, self.processed,
+                  _worker_kwargs(index, self.agent_kwargs)),
+            name=f"AgentWorker-{index}",
+            daemon=True,
+        )
+        proc.start()
+        return proc
+
+    def _ensure_alive(self, index):
+        proc = self.processes[index]
+        if proc.is_alive():
+            return
+        if self.restarts[index] >= self.max_restarts:
+            raise RuntimeError(
+                f"{proc.name} died (exit code {proc.exitcode}) and was already restarted {self.restarts[index]} times"
+            )
+        # A process killed inside get() can leave the old queue locked: move what is left to a new one
+        old, new = self.queues[index], self._ctx.Queue(maxsize=self.queue_size)
+        moved = 0
+        while True:
+            try:
+                event = old.get_nowait()
+            except queue.Empty:
+                break
+            if event is not None:
+                new.put(event)
+                moved += 1
+        lost = self.submitted[index] - self.processed[index] - moved
+        self.submitted[index] = self.processed[index] + moved
+        self.logger.warning(f"{proc.name} died (exit code {proc.exitcode}); restarting, {lost} events lost")
+        self.queues[index] = new
+        self.restarts[index] += 1
+        self.processes[index] = self._spawn(index)
+
+    def worker_for(self, event):
+        return self.ring.node_for(event.get("server_id"))
+
+    def submit(self, event, timeout=None):
+        """Queue a normalized event on its server's worker; raises queue.Full after `timeout`."""
+        if self._closed:
+            raise RuntimeError("AgentPool is closed")
+        index = self.worker_for(event)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Wait in slices so a worker that dies while its queue is full is noticed
+            self._ensure_alive(index)
+            wait = LIVENESS_INTERVAL if deadline is None else min(LIVENESS_INTERVAL, max(0.0, deadline - time.monotonic()))
+            try:
+                self.queues[index].put(event, timeout=wait)
+                break
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+        self.submitted[index] += 1
+        return index
+
+    def submit_payload(self, processor, payload, timeout=None):
+        count = 0
+        for event in processor.iter_parse(payload):
+            self.submit(event, timeout=timeout)
+            count += 1
+        return count
+
+    def _audit_writer(self, batch_size=500):
+        while True:
+            row = self.audit_queue.get()
+            if row is None:
+                return
+            batch = [row]
+            stop = False
+            while len(batch) < batch_size:
+                try:
+                    row = self.audit_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            try:
+                self.audit.write_rows(batch)
+                self.audit_rows += len(batch)
+            except Exception as e:
+                self.logger.error(f"Pool audit write failed ({len(batch)} rows): {e}")
+            if stop:
+                return
+
+    def _result_collector(self):
+        while True:
+            item = self._result_queue.get()
+            if item is None:
+                return
+            self.results.append(item)
+
+    def metrics(self):
+        processed = list(self.processed)
+        return {
+            "workers": self.workers,
+            "alive": sum(p.is_alive() for p in self.processes),
+            "restarts": list(self.restarts),
+            "submitted": list(self.submitted),
+            "processed": processed,
+            "backlog": [s - p for s, p in zip(self.submitted, processed)],
+            "audit_rows": self.audit_rows,
+        }
+
+    def close(self, timeout=None):
+        """Graceful drain: workers finish their queues, then the audit writer flushes."""
+        if self._closed:
+            return
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for q, proc in zip(self.queues, self.processes):
+            if proc.is_alive():
+                q.put(None)
+        for proc in self.processes:
+            proc.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                self.logger.warning(f"{proc.name} did not drain in time; terminating")
+                proc.terminate()
+        self.audit_queue.put(None)
+        self._audit_thread.join()
+        if self._result_thread is not None:
+            self._result_queue.put(None)
+            self._result_thread.join()
+        self.audit.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,17 +1,15 @@
+from memory.procedural import DEFAULT_SKILLS
+
+
 class Skills:
-    def __init__(self):
-        self.skills = {
-            "restart_server": [
-                "Check server status", "Notify user", "Restart", "Log outcome"
-            ],
-            "handle_overheating": [
-                "Check CPU temperature via Redfish",
-                "Increase fan speed",
-                "Notify admin if temperature > 80C",
-                "Throttle CPU or shutdown if temp > 90C",
-                "Log remediation"
-            ]
-        }
+    """Read-only view of the workflows known to ProceduralMemory (or the defaults without one)."""
+
+    def __init__(self, procedural=None):
+        self.procedural = procedural
+
+    @property
+    def skills(self):
+        return self.procedural.skills if self.procedural is not None else DEFAULT_SKILLS
 
     def list_skills(self):
         return list(self.skills.keys())
@@ -0,0 +1,186 @@
+import json
+import logging
+import re
+
+# Next character that can change nesting or string state
+_STRUCTURAL = re.compile(r'[{}\[\]",]')
+_STRING_END = re.compile(r'["\\]')
+_WS = " \t\r\n"
+
+
+class IncrementalObjectParser:
+    """
+    Parses the first top-level JSON object of a text stream (LLM output, with
+    any prose or code fences around it ignored) and hands back each member as
+    soon as its value is complete, without waiting for the closing brace.
+
+        parser = IncrementalObjectParser()
+        for chunk in chunks:
+            for key, value in parser.feed(chunk):
+                ...
+
+    Each character is scanned once; consumed text is dropped as members
+    complete. A member whose value is not valid JSON is skipped and recorded
+    in `errors`.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("IncrementalObjectParser")
+        self.text = ""
+        self.pos = 0
+        self.state = "seek"  # seek -> key -> colon -> value -> after -> ... -> done
+        self.key = None
+        self.value_start = 0
+        self.depth = 0
+        self.in_string = False
+        self.members = {}
+        self.errors = []
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+    @property
+    def started(self):
+        return self.state != "seek"
+
+    def feed(self, chunk):
+        """Add text; returns the [(key, value)] members completed by it."""
+        if self.state == "done" or not chunk:
+            return []
+        self.text += chunk
+        out = []
+        while self._step(out):
+            pass
+        return out
+
+    def _skip_ws(self):
+        text, pos = self.text, self.pos
+        while pos < len(text) and text[pos] in _WS:
+            pos += 1
+        self.pos = pos
+        return pos < len(text)
+
+    def _step(self, out):
+        state = self.state
+        if state == "seek":
+            start = self.text.find("{", self.pos)
+            if start < 0:
+                self.text, self.pos = "", 0
+                return False
+            self.text, self.pos = self.text[start + 1:], 0
+            self.state = "key"
+            return True
+        if state in ("key", "after"):
+            if not self._skip_ws():
+                return False
+            ch = self.text[self.pos]
+            if ch == "}":
+                self.state = "done"
+                return False
+            if ch == ",":
+                self.pos += 1
+                self.state = "key"
+                return True
+            if ch != '"':
+                # Not a member key: give up on this object
+                self.errors.append(f"unexpected {ch!r} before member key")
+                self.state = "done"
+                return False
+            end, _ = self._string_end(self.pos + 1)
+            if end < 0:
+                return False
+            self.key = json.loads(self.text[self.pos:end + 1])
+            self.pos = end + 1
+            self.state = "colon"
+            return True
+        if state == "colon":
+            if not self._skip_ws():
+                return False
+            if self.text[self.pos] != ":":
+                self.errors.append(f"missing ':' after {self.key!r}")
+                self.state = "done"
+                return False
+            self.pos += 1
+            self.state = "value_start"
+            return True
+        if state == "value_start":
+            if not self._skip_ws():
+                return False
+            self.value_start = self.pos
+            self.depth = 0
+            self.in_string = False
+            self.state = "value"
+            return True
+        if state == "value":
+            return self._scan_value(out)
+        return False
+
+    def _string_end(self, pos):
+        """
+        (index of the quote closing a string scanned from pos, resume position);
+        the index is -1 while the closing quote has not arrived yet.
+        """
+        text = self.text
+        while True:
+            m = _STRING_END.search(text, pos)
+            if m is None:
+                return -1, len(text)
+            if m.group() == '"':
+                return m.start(), m.start()
+            if m.start() + 1 >= len(text):
+                return -1, m.start()
+            pos = m.start() + 2
+
+    def _scan_value(self, out):
+        text = self.text
+        pos = self.pos
+        while True:
+            if self.in_string:
+                end, resume = self._string_end(pos)
+                if end < 0:
+                    self.pos = resume
+                    return False
+                pos = end + 1
+                self.in_string = False
+                if self.depth == 0:
+                    return self._emit(pos, out)
+                continue
+            m = _STRUCTURAL.search(text, pos)
+            if m is None:
+                self.pos = len(text)
+                return False
+            ch, at = m.group(), m.start()
+            if ch == '"':
+                self.in_string = True
+                pos = at + 1
+            elif ch in "{[":
+                self.depth += 1
+                pos = at + 1
+            elif ch in "}]":
+                if self.depth == 0:
+                    # Closing brace of the outer object ends a scalar value
+                    return self._emit(at, out)
+                self.depth -= 1
+                pos = at + 1
+                if self.depth == 0:
+                    return self._emit(pos, out)
+            else:  # ","
+                if self.depth == 0:
+                    return self._emit(at, out)
+                pos = at + 1
+
+    def _emit(self, end, out):
+        raw = self.text[self.value_start:end]
+        try:
+            value = json.loads(raw)
+        except ValueError as e:
+            self.errors.append(f"{self.key}: {e}")
+            self.logger.debug(f"Skipping member {self.key!r}: {e}")
+        else:
+            self.members[self.key] = value
+            out.append((self.key, value))
+        # Drop consumed text so the buffer stays one member long
+        self.text, self.pos = self.text[end:], 0
+        self.state = "after"
+        return True
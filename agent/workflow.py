@@ -0,0 +1,194 @@
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+
+from agent.metrics import now_ns
+
+# Step outcomes; a step only runs when all its predecessors finished "ok" or "noop"
+OK, NOOP, FAILED, TIMEOUT, SKIPPED = "ok", "noop", "failed", "timeout", "skipped"
+_PASSED = (OK, NOOP)
+_STATUS_LABELS = {status: (("status", status),) for status in (OK, NOOP, FAILED, TIMEOUT, SKIPPED)}
+
+
+class CompiledWorkflow:
+    __slots__ = ("name", "version", "generations", "steps", "predecessors")
+
+    def __init__(self, name, version, generations, steps, predecessors):
+        self.name = name
+        self.version = version
+        self.generations = generations    # [[step, ...], ...] in topological order
+        self.steps = steps                # step -> code object, callable, or None (no code: noop)
+        self.predecessors = predecessors  # step -> (step, ...)
+
+
+class WorkflowEngine:
+    """
+    Runs ProceduralMemory workflows. Each workflow is compiled once per
+    procedural version (step snippets to code objects, DAG to topological
+    generations); the steps of a generation run concurrently, synchronous
+    ones on a shared thread pool, coroutine functions on the event loop.
+    A step that fails or exceeds step_timeout causes its descendants to be
+    skipped while independent branches carry on. Every step outcome and
+    duration, and a per-run summary, goes to the audit trail (source
+    "workflow").
+
+    fan_out() runs one workflow for many servers with at most `concurrency`
+    runs in flight. A timed-out thread-pool step cannot be interrupted: it is
+    reported as a timeout and its thread finishes in the background.
+    """
+
+    def __init__(self, procedural, audit=None, metrics=None, max_workers=32, step_timeout=30.0, concurrency=64):
+        self.procedural = procedural
+        self.audit = audit
+        self.metrics = metrics
+        self.max_workers = max_workers
+        self.step_timeout = step_timeout
+        self.concurrency = concurrency
+        self.logger = logging.getLogger("WorkflowEngine")
+        self._compiled = {}
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="WorkflowStep"
+            )
+        return self._executor
+
+    def compile(self, name):
+        version = self.procedural.version
+        workflow = self._compiled.get(name)
+        if workflow is not None and workflow.version == version:
+            return workflow
+        import networkx as nx
+        graph = self.procedural.workflow_graph(name)
+        try:
+            generations = [list(generation) for generation in nx.topological_generations(graph)]
+        except nx.NetworkXUnfeasible:
+            raise ValueError(f"Workflow {name} has a dependency cycle")
+        steps = {}
+        for step in graph.nodes:
+            source = self.procedural.code.get(step)
+            if isinstance(source, str):
+                source = compile(source, f"<workflow {name}: {step}>", "exec")
+            steps[step] = source
+        predecessors = {step: tuple(graph.predecessors(step)) for step in graph.nodes}
+        workflow = CompiledWorkflow(name, version, generations, steps, predecessors)
+        self._compiled[name] = workflow
+        self.logger.debug(f"Compiled workflow {name}: {len(steps)} steps in {len(generations)} generations")
+        return workflow
+
+    def run(self, name, context=None, step_timeout=None):
+        """Blocking run of workflow `name` for one event/context; returns the run summary."""
+        return asyncio.run(self.run_async(name, context, step_timeout))
+
+    def fan_out(self, name, contexts, concurrency=None, step_timeout=None):
+        """Blocking fan_out_async."""
+        return asyncio.run(self.fan_out_async(name, contexts, concurrency, step_timeout))
+
+    async def run_async(self, name, context=None, step_timeout=None):
+        slots = asyncio.Semaphore(self.max_workers)
+        return await self._run(self.compile(name), context, step_timeout, slots)
+
+    async def fan_out_async(self, name, contexts, concurrency=None, step_timeout=None):
+        """Run workflow `name` once per context, at most `concurrency` runs at a time; summaries in input order."""
+        workflow = self.compile(name)
+        runs = asyncio.Semaphore(concurrency or self.concurrency)
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def run_one(context):
+            async with runs:
+                return await self._run(workflow, context, step_timeout, slots)
+
+        return await asyncio.gather(*(run_one(context) for context in contexts))
+
+    async def _run(self, workflow, context, step_timeout, slots):
+        context = dict(context or {})
+        timeout = step_timeout or self.step_timeout
+        start = now_ns()
+        results = {}
+        for generation in workflow.generations:
+            runnable = []
+            for step in generation:
+                blocked = [p for p in workflow.predecessors[step] if results[p]["status"] not in _PASSED]
+                if blocked:
+                    results[step] = self._finish(
+                        workflow, step, context, SKIPPED, 0, error=f"{blocked[0]} {results[blocked[0]]['status']}"
+                    )
+                else:
+                    runnable.append(step)
+            outcomes = await asyncio.gather(
+                *(self._run_step(workflow, step, context, timeout, slots) for step in runnable)
+            )
+            results.update(zip(runnable, outcomes))
+        elapsed = now_ns() - start
+        status = OK if all(r["status"] in _PASSED for r in results.values()) else FAILED
+        summary = {
+            "workflow": workflow.name,
+            "server_id": context.get("server_id"),
+            "status": status,
+            "duration_ms": elapsed / 1e6,
+            "steps": results,
+        }
+        if self.metrics is not None:
+            self.metrics.observe("workflow", elapsed)
+        if self.audit is not None:
+            self.audit.log_decision(
+                f"workflow_{status}", f"{workflow.name}: {status} in {elapsed / 1e6:.1f} ms",
+                context, source="workflow"
+            )
+        return summary
+
+    async def _run_step(self, workflow, step, context, timeout, slots):
+        target = workflow.steps[step]
+        if target is None:
+            return self._finish(workflow, step, context, NOOP, 0)
+        output = error = None
+        async with slots:
+            # Timed from here, so waiting for a pool thread does not count against the step
+            start = now_ns()
+            try:
+                if inspect.iscoroutinefunction(target):
+                    output = await asyncio.wait_for(target(context), timeout)
+                else:
+                    loop = asyncio.get_running_loop()
+                    output = await asyncio.wait_for(
+                        loop.run_in_executor(self.executor, _call_step, target, context), timeout
+                    )
+                status = OK
+            except asyncio.TimeoutError:
+                status, error = TIMEOUT, f"exceeded {timeout}s"
+            except Exception as e:
+                status, error = FAILED, f"{type(e).__name__}: {e}"
+            elapsed = now_ns() - start
+        return self._finish(workflow, step, context, status, elapsed, output, error)
+
+    def _finish(self, workflow, step, context, status, elapsed, output=None, error=None):
+        result = {"status": status, "duration_ms": elapsed / 1e6, "output": output, "error": error}
+        if self.metrics is not None:
+            self.metrics.inc("workflow_steps_total", labels=_STATUS_LABELS[status])
+            if status != SKIPPED:
+                self.metrics.observe("workflow_step", elapsed)
+        if status not in _PASSED:
+            self.logger.warning(f"Workflow {workflow.name} step {step!r} {status} for {context.get('server_id')}: {error}")
+        if self.audit is not None:
+            reason = f"{workflow.name}/{step}: {status} in {elapsed / 1e6:.1f} ms"
+            if error:
+                reason += f" ({error})"
+            self.audit.log_decision(f"step_{status}", reason, context, source="workflow")
+        return result
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def _call_step(target, context):
+    """Run one step in a pool thread: snippets see `context` and may set `result`."""
+    if callable(target):
+        return target(context)
+    namespace = {"context": context, "result": None}
+    exec(target, namespace)
+    return namespace["result"]
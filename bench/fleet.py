@@ -0,0 +1,76 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+
+class FleetGenerator:
+    """
+    Synthetic Redfish traffic for `servers` chassis with `sensors` temperature
+    and fan sensors each. Readings follow a bounded random walk; a seeded RNG
+    keeps runs reproducible.
+    """
+
+    def __init__(self, servers=100, sensors=4, seed=0):
+        self.servers = servers
+        self.sensors = sensors
+        self.rng = random.Random(seed)
+        self.temps = [[self.rng.uniform(45, 75) for _ in range(sensors)] for _ in range(servers)]
+        self.fans = [[self.rng.uniform(2500, 6000) for _ in range(sensors)] for _ in range(servers)]
+
+    @staticmethod
+    def server_id(i):
+        return f"System.Embedded.{i}"
+
+    def telemetry(self, rounds=1):
+        """One Telemetry payload per server per round."""
+        for _ in range(rounds):
+            for i in range(self.servers):
+                temps, fans = self.temps[i], self.fans[i]
+                for s in range(self.sensors):
+                    temps[s] = min(105.0, max(30.0, temps[s] + self.rng.gauss(0, 1.5)))
+                    fans[s] = min(12000.0, max(500.0, fans[s] + self.rng.gauss(0, 150)))
+                yield {
+                    "ChassisId": self.server_id(i),
+                    "Telemetry": {
+                        "Temperatures": [
+                            {"Name": f"CPU{s} Temp", "ReadingCelsius": round(temps[s], 1),
+                             "Status": {"Health": "Warning" if temps[s] > 85 else "OK"}}
+                            for s in range(self.sensors)
+                        ],
+                        "Fans": [
+                            {"Name": f"Fan{s}", "ReadingRPM": int(fans[s]),
+                             "Status": {"Health": "Warning" if fans[s] < 1000 else "OK"}}
+                            for s in range(self.sensors)
+                        ],
+                    },
+                }
+
+    def alerts(self, count, hot_servers=5, repeat=True, start=None):
+        """
+        Event payloads. With repeat=True a few servers fire the same thermal
+        alert over and over (an alert storm); otherwise every alert is distinct.
+        """
+        start = start or datetime(2025, 7, 10, 14, 0, tzinfo=timezone.utc)
+        for n in range(count):
+            if repeat:
+                i = self.rng.randrange(min(hot_servers, self.servers))
+                sensor = i % self.sensors
+                reading = 88
+            else:
+                i = n % self.servers
+                sensor = n % self.sensors
+                reading = 60 + n % 45
+            ts = start + timedelta(milliseconds=100 * n)
+            yield {
+                "@odata.type": "#Event.v1_2_0.Event",
+                "Id": self.server_id(i),
+                "Name": "PowerEdge Event",
+                "Events": [{
+                    "EventId": f"E{n}",
+                    "EventType": "Alert",
+                    "EventTimestamp": ts.isoformat().replace("+00:00", "Z"),
+                    "Severity": "Critical" if reading > 85 else "Warning",
+                    "Message": f"Temperature threshold exceeded on CPU{sensor}: {reading}",
+                    "MessageArgs": [f"CPU{sensor}", str(reading)],
+                    "OriginOfCondition": {"@odata.id": "/redfish/v1/Chassis/System.Embedded.1/Thermal"},
+                }],
+            }
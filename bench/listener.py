@@ -0,0 +1,101 @@
+"""
+Push ingestion benchmark: a MockBMC POSTs synthetic alerts to a
+RedfishListener in front of an AgentCore on the stub LLM, and reports BMC-side
+ack latency next to end-to-end processing time. Acks should stay in the
+low milliseconds however slow the LLM is.
+
+    python -m bench.listener --payloads 2000 --llm-latency 0.2 --batch-size 64
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import threading
+import time
+
+from bench.fleet import FleetGenerator
+from bench.mock_bmc import MockBMC
+from bench.stub_llm import StubLLMServer
+
+
+def _start_listener(listener):
+    """Run the listener's event loop on a daemon thread; returns the loop once it is accepting."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(listener.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="Listener", daemon=True).start()
+    ready.wait()
+    return loop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RedfishListener push ingestion benchmark")
+    parser.add_argument("--payloads", type=int, default=1000)
+    parser.add_argument("--servers", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--linger", type=float, default=0.05)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--rate", type=float, help="per-source limit, payloads/second")
+    parser.add_argument("--senders", type=int, default=16, help="concurrent BMC sender threads")
+    parser.add_argument("--tiered", action="store_true")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    from agent.core import AgentCore
+    from agent.llm_cache import LLMResponseCache
+    from events.listener import RedfishListener
+    from memory.audit import AuditMemory
+
+    payloads = list(FleetGenerator(args.servers, seed=1).alerts(args.payloads, repeat=False))
+    with StubLLMServer(latency=args.llm_latency) as stub:
+        agent = AgentCore(
+            llm_server_url=stub.url, api_key="bench", llm_cache=LLMResponseCache(),
+            audit=AuditMemory(db_path=":memory:", write_behind=True), tiered=args.tiered,
+        )
+        listener = RedfishListener(
+            agent, host="127.0.0.1", port=0, queue_size=args.queue_size,
+            batch_size=args.batch_size, linger=args.linger, rate=args.rate,
+        )
+        loop = _start_listener(listener)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            replay = MockBMC(payloads).replay(f"http://127.0.0.1:{listener.port}/events", concurrency=args.senders)
+            while listener.processed < replay["acked"]:
+                time.sleep(0.01)
+        total = time.perf_counter() - start
+        asyncio.run_coroutine_threadsafe(listener.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    stages = agent.metrics.snapshot()["stages"]
+    results = {
+        "replay": replay,
+        "processed": listener.processed,
+        "process_s": total,
+        "payloads_per_s": listener.processed / total if total else 0.0,
+        "queue_wait": stages.get("listener_queue_wait"),
+        "batch": stages.get("listener_batch"),
+        "llm_requests": stub.requests,
+    }
+    print(
+        f"acked {replay['acked']}/{len(payloads)} (retried {replay['retried']}, dropped {replay['dropped']})"
+        f"  ack p50 {replay.get('ack_p50_ms', 0):.1f} ms p99 {replay.get('ack_p99_ms', 0):.1f} ms"
+        f"  | processed in {total:.2f}s ({results['payloads_per_s']:.0f} payloads/s, {stub.requests} LLM calls)"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SSE_PATH = "/redfish/v1/EventService/SSE"
+
+
+class MockBMC:
+    """
+    Replays Redfish payloads the way a BMC event service does, for testing
+    events.listener.RedfishListener offline.
+
+    replay() POSTs every payload to a subscription destination from
+    `concurrency` sender threads. It retries on 429/503 (honouring
+    Retry-After) and on connection errors, up to max_retries, and then drops
+    the payload. It returns ack latency stats.
+
+    start() also serves the payloads as a Server-Sent Event stream on
+    SSE_PATH (ids 0..n-1, resuming after Last-Event-ID); the stream closes
+    after the last payload.
+    """
+
+    def __init__(self, payloads, host="127.0.0.1", port=0, sse_interval=0.0):
+        self.payloads = list(payloads)
+        self.sse_interval = sse_interval
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def sse_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{SSE_PATH}"
+
+    def replay(self, url, concurrency=8, max_retries=5, max_retry_after=2.0, timeout=5.0):
+        import httpx
+        local = threading.local()
+        lock = threading.Lock()
+        stats = {"sent": 0, "acked": 0, "retried": 0, "dropped": 0, "statuses": {}}
+        latencies = []
+
+        def send(payload):
+            if not hasattr(local, "client"):
+                local.client = httpx.Client(timeout=timeout)
+            body = json.dumps(payload)
+            for attempt in range(max_retries + 1):
+                start = time.perf_counter()
+                try:
+                    response = local.client.post(url, content=body, headers={"Content-Type": "application/json"})
+                    status, retry_after = response.status_code, response.headers.get("Retry-After")
+                except httpx.HTTPError:
+                    status, retry_after = "error", None
+                elapsed = time.perf_counter() - start
+                with lock:
+                    stats["sent"] += 1
+                    stats["statuses"][str(status)] = stats["statuses"].get(str(status), 0) + 1
+                    if status in (200, 201, 202, 204):
+                        stats["acked"] += 1
+                        latencies.append(elapsed)
+                        return
+                    if attempt == max_retries:
+                        stats["dropped"] += 1
+                        return
+                    stats["retried"] += 1
+                time.sleep(min(float(retry_after or 0.1), max_retry_after))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(send, self.payloads))
+        stats["elapsed_s"] = time.perf_counter() - start
+        if latencies:
+            latencies.sort()
+            stats["ack_p50_ms"] = statistics.median(latencies) * 1e3
+            stats["ack_p99_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3
+            stats["ack_max_ms"] = latencies[-1] * 1e3
+        return stats
+
+    def _handler(self):
+        bmc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != SSE_PATH:
+                    self.send_error(404)
+                    return
+                last_id = self.headers.get("Last-Event-ID")
+                first = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                try:
+                    for i in range(first, len(bmc.payloads)):
+                        self.wfile.write(f"id: {i}\ndata: {json.dumps(bmc.payloads[i])}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        if bmc.sse_interval:
+                            time.sleep(bmc.sse_interval)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="MockBMC", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,198 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CHASSIS = "System.Embedded.1"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class MockRedfishFleet:
+    """
+    Many simulated BMCs behind one local port, for testing
+    events.poller.RedfishPoller offline. BMC i lives under /bmc/i, so its base
+    URL is fleet.url(i). Each BMC serves the Redfish service root, the Chassis
+    collection and a Thermal resource with `sensors` temperatures and fans.
+
+    Readings change every `update_interval` seconds. The ETag follows them,
+    so If-None-Match gets a 304 in between. A `select_fraction` of BMCs
+    advertise and honour $select. A `slow_fraction` answer after
+    `slow_latency` seconds, and a `fail_fraction` answer 503. Which BMCs are
+    slow or failing is seeded, so runs are reproducible. GET /stats returns
+    the request counters. serve_in_process() runs a fleet in a child process,
+    so its server threads do not compete with the poller for the GIL.
+    """
+
+    def __init__(self, hosts=100, sensors=4, update_interval=30.0, latency=0.0, slow_fraction=0.0,
+                 slow_latency=2.0, fail_fraction=0.0, select_fraction=0.5, host="127.0.0.1", port=0, seed=0):
+        self.hosts = hosts
+        self.sensors = sensors
+        self.update_interval = update_interval
+        self.latency = latency
+        self.slow_latency = slow_latency
+        rng = random.Random(seed)
+        self.slow = {i for i in range(hosts) if rng.random() < slow_fraction}
+        self.failing = {i for i in range(hosts) if rng.random() < fail_fraction}
+        self.select = {i for i in range(hosts) if rng.random() < select_fraction}
+        self.offsets = [rng.random() for _ in range(hosts)]
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.server = _Server((host, port), self._handler())
+        self._thread = None
+
+    def url(self, i):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/bmc/{i}"
+
+    def urls(self):
+        return {f"bmc-{i}": self.url(i) for i in range(self.hosts)}
+
+    def stats(self):
+        return {"requests": self.requests, "not_modified": self.not_modified, "bytes_sent": self.bytes_sent}
+
+    def _version(self, i):
+        return int(time.time() / self.update_interval + self.offsets[i])
+
+    def _thermal(self, i, version):
+        rng = random.Random(i * 1000003 + version)
+        return {
+            "@odata.id": f"/redfish/v1/Chassis/{CHASSIS}/Thermal",
+            "@odata.type": "#Thermal.v1_7_0.Thermal",
+            "Id": "Thermal",
+            "Name": "Thermal",
+            "Temperatures": [
+                {"MemberId": str(s), "Name": f"CPU{s} Temp", "ReadingCelsius": round(rng.uniform(40, 95), 1),
+                 "UpperThresholdCritical": 95, "Status": {"Health": "OK", "State": "Enabled"}}
+                for s in range(self.sensors)
+            ],
+            "Fans": [
+                {"MemberId": str(s), "Name": f"Fan{s}", "Reading": int(rng.uniform(800, 9000)),
+                 "ReadingUnits": "RPM", "Status": {"Health": "OK", "State": "Enabled"}}
+                for s in range(self.sensors)
+            ],
+            "Redundancy": [{"MemberId": "0", "Name": "Fan redundancy", "Mode": "N+m", "Status": {"Health": "OK"}}],
+        }
+
+    def _handler(self):
+        fleet = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with fleet._lock:
+                    fleet.requests += 1
+                parts = urlsplit(self.path)
+                if parts.path == "/stats":
+                    self._send(200, fleet.stats())
+                    return
+                segments = parts.path.strip("/").split("/")
+                if len(segments) < 2 or segments[0] != "bmc" or not segments[1].isdigit() or int(segments[1]) >= fleet.hosts:
+                    self._send(404, {"error": "no such BMC"})
+                    return
+                i = int(segments[1])
+                resource = "/" + "/".join(segments[2:])
+                delay = fleet.slow_latency if i in fleet.slow else fleet.latency
+                if delay:
+                    time.sleep(delay)
+                if i in fleet.failing:
+                    self._send(503, {"error": "BMC busy"})
+                    return
+                if resource in ("/redfish/v1", "/redfish/v1/"):
+                    self._send(200, {
+                        "@odata.id": "/redfish/v1/",
+                        "RedfishVersion": "1.11.0",
+                        "ProtocolFeaturesSupported": {"SelectQuery": i in fleet.select, "ExpandQuery": {"Levels": False}},
+                    })
+                elif resource == "/redfish/v1/Chassis":
+                    self._send(200, {"Members": [{"@odata.id": f"/redfish/v1/Chassis/{CHASSIS}"}], "Members@odata.count": 1})
+                elif resource == f"/redfish/v1/Chassis/{CHASSIS}/Thermal":
+                    version = fleet._version(i)
+                    etag = f'W/"{i}-{version}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        with fleet._lock:
+                            fleet.not_modified += 1
+                        self._send(304, None, etag)
+                        return
+                    body = fleet._thermal(i, version)
+                    select = parse_qs(parts.query).get("$select")
+                    if select and i in fleet.select:
+                        keys = set(select[0].split(","))
+                        body = {k: v for k, v in body.items() if k in keys or k.startswith("@odata")}
+                    self._send(200, body, etag)
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, status, body, etag=None):
+                data = json.dumps(body).encode("utf-8") if body is not None else b""
+                try:
+                    self.send_response(status)
+                    if etag:
+                        self.send_header("ETag", etag)
+                    if data:
+                        self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+                    return
+                with fleet._lock:
+                    fleet.bytes_sent += len(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="MockRedfish", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _serve(conn, kwargs):
+    fleet = MockRedfishFleet(**kwargs).start()
+    conn.send(fleet.server.server_address[:2])
+    conn.recv()  # parent asks us to stop
+    fleet.stop()
+
+
+def serve_in_process(**kwargs):
+    """
+    Start a MockRedfishFleet(**kwargs) in a spawned process. Returns
+    (urls, stop): urls maps BMC name to base URL, and stop() shuts the fleet
+    down.
+    """
+    import multiprocessing as mp
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe()
+    process = ctx.Process(target=_serve, args=(child, kwargs), daemon=True)
+    process.start()
+    host, port = parent.recv()
+    urls = {f"bmc-{i}": f"http://{host}:{port}/bmc/{i}" for i in range(kwargs.get("hosts", 100))}
+
+    def stop():
+        parent.send("stop")
+        process.join(timeout=10)
+
+    return urls, stop
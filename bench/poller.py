@@ -0,0 +1,85 @@
+"""
+Fleet sweep benchmark: RedfishPoller against a MockRedfishFleet with slow
+and failing BMCs. Runs a cold sweep (discovery + full reads) and then a warm
+one (conditional fetches), and reports the duration of each against the
+60 s target.
+
+    python -m bench.poller --hosts 5000 --concurrency 256 --spread 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from bench.mock_redfish import serve_in_process
+
+TARGET_S = 60.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RedfishPoller fleet sweep benchmark")
+    parser.add_argument("--hosts", type=int, default=5000)
+    parser.add_argument("--sensors", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--spread", type=float, default=20.0, help="seconds each sweep is jittered over")
+    parser.add_argument("--latency", type=float, default=0.02, help="normal BMC response time")
+    parser.add_argument("--slow-fraction", type=float, default=0.02)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--fail-fraction", type=float, default=0.01)
+    parser.add_argument("--update-interval", type=float, default=30.0, help="seconds between reading changes")
+    parser.add_argument("--sweeps", type=int, default=2)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    from events.poller import RedfishPoller
+
+    events = []
+    results = {"sweeps": []}
+    urls, stop = serve_in_process(
+        hosts=args.hosts, sensors=args.sensors, latency=args.latency, slow_fraction=args.slow_fraction,
+        slow_latency=args.slow_latency, fail_fraction=args.fail_fraction, update_interval=args.update_interval,
+    )
+    stats_url = next(iter(urls.values())).rsplit("/bmc/", 1)[0] + "/stats"
+
+    def fleet_stats():
+        return httpx.get(stats_url).json()
+
+    try:
+        poller = RedfishPoller(urls, handler=events.extend, concurrency=args.concurrency, spread=args.spread, seed=1)
+
+        async def run():
+            try:
+                for n in range(args.sweeps):
+                    requests = fleet_stats()["requests"]
+                    counts = await poller.sweep()
+                    counts["requests"] = fleet_stats()["requests"] - requests - 1
+                    results["sweeps"].append(counts)
+                    print(
+                        f"sweep {n}: {counts['seconds']:.1f}s  ok {counts['ok']}  not_modified {counts['not_modified']}"
+                        f"  failed {counts['failed']}  backoff {counts['backoff']}  events {counts['events']}"
+                        f"  requests {counts['requests']}"
+                    )
+            finally:
+                await poller.close()
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        results["total_s"] = time.perf_counter() - start
+        results["fleet"] = fleet_stats()
+        results["poll_latency"] = poller.metrics.snapshot()["stages"].get("poll")
+    finally:
+        stop()
+    slowest = max(s["seconds"] for s in results["sweeps"])
+    print(f"slowest sweep {slowest:.1f}s for {args.hosts} BMCs; target {TARGET_S:.0f}s: {'met' if slowest < TARGET_S else 'MISSED'}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Offline AgentCore benchmark: drives process_event against a local stub LLM
+with synthetic fleet traffic and writes per-scenario JSON results.
+
+    python -m bench.run --servers 200 --sensors 4 --llm-latency 0.02 --output results.json
+    python -m bench.run --compare old.json --output new.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fleet import FleetGenerator
+from bench.stub_llm import StubLLMServer
+
+SCENARIOS = ("cold_start", "steady_telemetry", "alert_storm")
+
+
+def _payloads(name, args):
+    fleet = FleetGenerator(args.servers, args.sensors, seed=args.seed)
+    if name == "steady_telemetry":
+        return fleet.telemetry(rounds=args.rounds)
+    if name == "alert_storm":
+        return fleet.alerts(args.alerts, hot_servers=args.hot_servers, repeat=True)
+    # cold_start: distinct alerts against empty caches and freshly built memory modules
+    return fleet.alerts(args.cold_events, repeat=False)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_scenario(name, llm_url, args):
+    """Runs in a fresh process so startup cost and peak RSS are per scenario."""
+    logging.disable(logging.INFO)
+    from agent.core import AgentCore
+    from agent.llm_cache import LLMResponseCache
+    from memory.audit import AuditMemory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        agent = AgentCore(
+            llm_server_url=llm_url,
+            api_key="bench",
+            llm_cache=LLMResponseCache(),
+            audit=AuditMemory(db_path=os.path.join(tmp, "audit.db"), write_behind=True),
+            tiered=args.tiered,
+            coalesce_window=args.coalesce_window if name == "alert_storm" else None,
+            llm_stream=args.stream,
+        )
+        construct = time.perf_counter() - start
+        payloads = list(_payloads(name, args))
+        sink = io.StringIO()
+        start = time.perf_counter()
+        first_event = None
+        with contextlib.redirect_stdout(sink):
+            for payload in payloads:
+                agent.process_event("redfish", payload)
+                if first_event is None:
+                    first_event = time.perf_counter() - start
+                sink.seek(0)
+                sink.truncate()
+            agent.flush_coalesced()
+        elapsed = time.perf_counter() - start
+        agent.audit.close()
+    metrics = agent.metrics
+    # Parsed events, before coalescing; "handled" is what reached handle_event
+    events = metrics.histograms["parse"].count if "parse" in metrics.histograms else 0
+    return {
+        "payloads": len(payloads),
+        "events": events,
+        "handled": metrics.counter("events_total"),
+        "seconds": elapsed,
+        "events_per_sec": events / elapsed if elapsed else 0.0,
+        "construct_ms": construct * 1e3,
+        "first_payload_ms": (first_event or 0.0) * 1e3,
+        "llm_requests": metrics.counter("llm_requests_total"),
+        "llm_cache_hits": metrics.counter("llm_cache_hits_total"),
+        "decisions": agent.decision_metrics(),
+        "stages": {
+            stage: {k: round(v, 3) for k, v in hist.snapshot().items()}
+            for stage, hist in sorted(metrics.histograms.items())
+        },
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    """Print events/sec and per-stage p99 changes between two result files."""
+    for name, result in new["scenarios"].items():
+        before = old.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        eps_old, eps_new = before["events_per_sec"], result["events_per_sec"]
+        change = (eps_new - eps_old) / eps_old * 100 if eps_old else 0.0
+        print(f"{name}: {eps_old:.1f} -> {eps_new:.1f} events/s ({change:+.1f}%)")
+        for stage, stats in result["stages"].items():
+            prev = before["stages"].get(stage)
+            if prev:
+                print(f"  {stage:<16} p99 {prev['p99_us']:>10.1f} -> {stats['p99_us']:>10.1f} us")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline AgentCore benchmark with a stub LLM")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--servers", type=int, default=100)
+    parser.add_argument("--sensors", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5, help="telemetry rounds in steady_telemetry")
+    parser.add_argument("--alerts", type=int, default=5000, help="alert payloads in alert_storm")
+    parser.add_argument("--hot-servers", type=int, default=5)
+    parser.add_argument("--cold-events", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--tiered", action="store_true", help="run AgentCore in tiered decision mode")
+    parser.add_argument("--stream", action="store_true", help="stream LLM responses and route components incrementally")
+    parser.add_argument("--coalesce-window", type=float, default=None, help="coalescing window for alert_storm")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="PATH", help="previous results file to diff against")
+    args = parser.parse_args(argv)
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+    ctx = mp.get_context("spawn")
+    with StubLLMServer(latency=args.llm_latency, jitter=args.llm_jitter) as stub:
+        for name in args.scenarios:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(_run_scenario, (name, stub.url, args))
+            results["scenarios"][name] = result
+            print(
+                f"{name}: {result['events']} events in {result['seconds']:.2f}s "
+                f"({result['events_per_sec']:.1f}/s), {result['llm_requests']} LLM calls, "
+                f"peak RSS {result['peak_rss_mb']} MB"
+            )
+            for stage, stats in result["stages"].items():
+                print(f"  {stage:<16} p50 {stats['p50_us']:>10.1f} us  p99 {stats['p99_us']:>10.1f} us")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
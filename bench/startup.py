@@ -0,0 +1,130 @@
+"""
+Cold-start benchmark: times `import agent.core` + AgentCore() in fresh
+interpreters, for the classic-rules-only path and with every module loaded.
+The warm_start path restores a checkpoint of a populated agent (rules,
+working state for --servers servers, their telemetry windows and a vector
+index) and makes its first decision from the restored rules.
+
+    python -m bench.startup --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGET_MS = 200.0
+
+# Each child prints {"startup_ms", "first_decision_ms"} measured from its first line
+CHILD = """
+import time
+t0 = time.perf_counter()
+import json, logging
+from agent.core import AgentCore
+agent = AgentCore(api_key="bench", rule_engines={engines!r}, checkpoint_dir={checkpoint!r}, checkpoint_interval=0)
+if {load_all!r}:
+    for name in list(agent.modules.factories):
+        getattr(agent, name)
+startup = time.perf_counter() - t0
+logging.disable(logging.INFO)
+if not {checkpoint!r}:
+    agent.classic_rules.ingest({{"rules": [{{"condition": "temperature > 90", "action": "raise_critical"}}]}})
+t1 = time.perf_counter()
+action, _ = agent.hybrid_decide_action({{"server_id": "s1", "type": "temperature", "temperature": 95}})
+first = time.perf_counter() - t1
+assert action == "raise_critical", action
+print(json.dumps({{"startup_ms": startup * 1e3, "first_decision_ms": first * 1e3, "loaded": agent.modules.loaded()}}))
+"""
+
+PATHS = {
+    "classic_only": {"engines": ("classic",), "load_all": False},
+    "all_engines": {"engines": ("classic", "fuzzy", "ml"), "load_all": False},
+    "all_modules": {"engines": ("classic", "fuzzy", "ml"), "load_all": True},
+    "warm_start": {"engines": ("classic", "fuzzy", "ml"), "load_all": False, "checkpoint": True},
+}
+
+
+def build_checkpoint(path, servers=10000, vectors=100000):
+    """Checkpoint an agent holding rule tables, per-server state and telemetry, and a vector index."""
+    import logging
+    import numpy as np
+    from agent.core import AgentCore
+    from memory.audit import AuditMemory
+    logging.disable(logging.INFO)
+    agent = AgentCore(api_key="bench", audit=AuditMemory(db_path=":memory:"), checkpoint_dir=path, checkpoint_interval=0)
+    agent.classic_rules.ingest({"rules": [{"condition": "temperature > 90", "action": "raise_critical"}]})
+    agent.fuzzy_rules.ingest({"rules": [{"condition": "temperature is high", "action": "warn"}]})
+    rng = np.random.default_rng(0)
+    for i in range(servers):
+        event = {"server_id": f"s{i}", "type": "temperature", "component": "CPU1", "timestamp": 1.7e9}
+        agent.working_mem.ingest({"rack": i // 40}, event)
+        for t in range(8):
+            agent.timeseries.record(dict(event, temperature=float(rng.uniform(40, 80)), timestamp=1.7e9 + 30 * t))
+    agent.vector_store.add(rng.random((vectors, agent.vector_store.vector_dim), dtype=np.float32))
+    agent.checkpoints.stop()
+    logging.disable(logging.NOTSET)
+
+
+def run_path(engines, load_all, runs, checkpoint=None):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    code = CHILD.format(engines=engines, load_all=load_all, checkpoint=checkpoint)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", code], env=env, cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        wall = time.perf_counter() - start
+        sample = json.loads(out.strip().splitlines()[-1])
+        sample["process_ms"] = wall * 1e3
+        samples.append(sample)
+    return {
+        key: {"min": min(s[key] for s in samples), "median": statistics.median(s[key] for s in samples)}
+        for key in ("startup_ms", "first_decision_ms", "process_ms")
+    } | {"loaded_modules": samples[-1]["loaded"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AgentCore cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), default=list(PATHS))
+    parser.add_argument("--servers", type=int, default=10000, help="warm_start: servers in the checkpoint")
+    parser.add_argument("--vectors", type=int, default=100000, help="warm_start: vectors in the checkpoint")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+    results = {}
+    checkpoint_dir = None
+    try:
+        for name in args.paths:
+            kwargs = dict(PATHS[name])
+            if kwargs.pop("checkpoint", False):
+                if checkpoint_dir is None:
+                    checkpoint_dir = tempfile.mkdtemp(prefix="agent-checkpoint-")
+                    build_checkpoint(checkpoint_dir, args.servers, args.vectors)
+                kwargs["checkpoint"] = checkpoint_dir
+            result = results[name] = run_path(runs=args.runs, **kwargs)
+            print(
+                f"{name:<13} startup {result['startup_ms']['median']:7.1f} ms (min {result['startup_ms']['min']:.1f})"
+                f"  first decision {result['first_decision_ms']['median']:7.1f} ms"
+                f"  process {result['process_ms']['median']:7.1f} ms"
+            )
+    finally:
+        if checkpoint_dir is not None:
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    if "classic_only" in results:
+        ok = results["classic_only"]["startup_ms"]["median"] < TARGET_MS
+        print(f"classic_only cold start target {TARGET_MS:.0f} ms: {'met' if ok else 'MISSED'}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned per-event configuration, shaped like a real LLM answer (decision
+# components first, in the order AgentCore asks for them)
+DEFAULT_RESPONSE = {
+    "classic_rules": {
+        "rules": [
+            {"condition": "temperature > 90", "action": "raise_critical"},
+            {"condition": "temperature > 80", "action": "raise_warning"},
+            {"condition": "fan_rpm < 1000", "action": "check_fan"},
+        ]
+    },
+    "fuzzy_rules": {"rules": [{"if": "temperature is high", "then": "throttle"}]},
+    "ml_rules": {"models": [{"name": "temperature", "event_types": ["temperature", "alert"]}]},
+    "working_mem": {"variables": [{"id": "last_checked", "value": "now"}]},
+    "raw_text": {"value": "Thermal event observed"},
+    "knowledge_graph": {
+        "server": {"kind": "host", "rack": "R12"},
+        "cpu": {"kind": "component", "part_of": "server"},
+        "fan": {"kind": "component", "part_of": "server"},
+    },
+    "procedural": {"steps": ["Check CPU temperature via Redfish", "Increase fan speed", "Notify admin", "Log remediation"]},
+    "meta": {"source": "stub", "confidence": 0.9},
+    "audit": {"decision": "monitor", "reason": "stub baseline"},
+    "external": {"notify": ["ops@example.com"]},
+    "policy": {"escalation": "page on raise_critical", "maintenance_window": "Sun 02:00-04:00"},
+}
+
+
+class StubLLMServer:
+    """
+    Local OpenAI-compatible /chat/completions endpoint for offline benchmarks.
+    Every request sleeps `latency` (+/- `jitter`) seconds and answers with the
+    canned `response` (a dict, or a callable taking the prompt and returning one).
+    Batched prompts get the same answer under keys "0".."n-1".
+
+    With stream=true the answer is sent as server-sent events of `chunk_chars`
+    characters, with the latency spread evenly over the chunks (generation
+    time); clients that hang up early are counted in `cancelled`. A fraction
+    `error_rate` of requests fails with 503, to exercise client failover.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, response=None, host="127.0.0.1", port=0, chunk_chars=16,
+                 error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.response = response or DEFAULT_RESPONSE
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _content(self, prompt):
+        config = self.response(prompt) if callable(self.response) else self.response
+        batch = _batch_size(prompt)
+        if batch:
+            config = {str(i): config for i in range(batch)}
+        return json.dumps(config)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                delay = stub.latency + (random.uniform(-stub.jitter, stub.jitter) if stub.jitter else 0.0)
+                prompt = request.get("messages", [{}])[-1].get("content", "")
+                if stub.error_rate and random.random() < stub.error_rate:
+                    self.send_error(503, "stub overloaded")
+                    return
+                if request.get("stream"):
+                    self._stream(request, stub._content(prompt), delay)
+                    return
+                if delay > 0:
+                    time.sleep(delay)
+                body = json.dumps({
+                    "id": f"stub-{stub.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": stub._content(prompt)},
+                    }],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 0, "total_tokens": len(prompt) // 4},
+                }).encode("utf-8")
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # e.g. the losing half of a hedged request
+                    self.close_connection = True
+                    with stub._lock:
+                        stub.cancelled += 1
+
+            def _stream(self, request, content, delay):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                pieces = [content[i:i + stub.chunk_chars] for i in range(0, len(content), stub.chunk_chars)]
+                pause = delay / len(pieces) if pieces and delay > 0 else 0.0
+                try:
+                    for i, piece in enumerate(pieces + [None]):
+                        if pause and piece is not None:
+                            time.sleep(pause)
+                        delta = {"role": "assistant"} if i == 0 else {}
+                        if piece is not None:
+                            delta["content"] = piece
+                        chunk = {
+                            "id": f"stub-{stub.requests}",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": request.get("model", "stub"),
+                            "choices": [{"index": 0, "delta": delta, "finish_reason": None if piece is not None else "stop"}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with stub._lock:
+                        stub.cancelled += 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="StubLLM", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _batch_size(prompt):
+    # Matches AgentCore._build_batch_prompt: "... for the N server events below"
+    marker = " server events below"
+    end = prompt.find(marker)
+    if end < 0:
+        return 0
+    words = prompt[:end].split()
+    return int(words[-1]) if words and words[-1].isdigit() else 0
@@ -0,0 +1,63 @@
+import json
+import logging
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+logger = logging.getLogger("BulkIngest")
+
+
+def _open(source):
+    if source in (None, "-"):
+        return sys.stdin, False
+    if hasattr(source, "read"):
+        return source, False
+    return open(source, "r", encoding="utf-8"), True
+
+
+def _decode_lines(lines):
+    payloads = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payloads.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed NDJSON line: {e}")
+    return payloads
+
+
+def iter_ndjson(source, workers=0, chunk_lines=2000):
+    """
+    Yield decoded JSON objects from an NDJSON/JSONL file path, file object or
+    "-" (stdin), line by line. With workers > 0, chunks of lines are decoded in
+    a process pool with at most 2 * workers chunks in flight, so memory stays
+    bounded and output order matches input order.
+    """
+    fh, owned = _open(source)
+    try:
+        if workers <= 0:
+            for line in fh:
+                yield from _decode_lines((line,))
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = []
+            while True:
+                lines = list(islice(fh, chunk_lines))
+                if lines:
+                    in_flight.append(pool.submit(_decode_lines, lines))
+                if in_flight and (not lines or len(in_flight) >= 2 * workers):
+                    yield from in_flight.pop(0).result()
+                if not lines and not in_flight:
+                    return
+    finally:
+        if owned:
+            fh.close()
+
+
+def iter_events(source, processor, workers=0, chunk_lines=2000):
+    """Stream normalized events out of an NDJSON file of raw payloads."""
+    for payload in iter_ndjson(source, workers=workers, chunk_lines=chunk_lines):
+        if isinstance(payload, dict):
+            yield from processor.iter_parse(payload)
@@ -0,0 +1,154 @@
+import time
+from datetime import datetime
+
+# Numeric fields tracked as first/last/max across repeats
+VALUE_FIELDS = ("value", "temperature", "fan_rpm")
+
+# Events carrying one of these readings are telemetry samples, not alerts:
+# every sample matters to the timeseries and the rules, so they pass through
+TELEMETRY_FIELDS = ("temperature", "fan_rpm")
+
+
+class _Group:
+    __slots__ = ("event", "count", "first_seen", "last_seen", "max_value", "last_value")
+
+    def __init__(self, event, value):
+        self.event = event
+        self.count = 1
+        seen = _seen(event)
+        self.first_seen = seen
+        self.last_seen = seen
+        self.max_value = value
+        self.last_value = value
+
+
+class EventCoalescer:
+    """
+    Collapses repeats of the same (server_id, type, component, message) alert
+    inside a time window. The first occurrence is forwarded immediately with
+    repeat_count=1; later duplicates are absorbed, and when the window closes
+    one aggregated event is forwarded carrying repeat_count, first_seen,
+    last_seen, max_value and last_value. first_seen/last_seen are the
+    events' own timestamps (wall-clock ISO time when they have none); `clock`
+    only drives window expiry.
+
+    Open groups are indexed by key (dict) and by time bucket, so each push is
+    O(1) amortized and expiry only touches buckets that have aged out. Buckets
+    are window / buckets_per_window wide, so a group may stay open up to one
+    bucket width past `window`. Closed windows are emitted by the next push()
+    or by expire(), which callers run when a batch ends or the stream idles.
+
+    Numeric telemetry (events with an `exempt` reading) is never coalesced.
+    """
+
+    def __init__(self, window=30.0, key_fields=("server_id", "type", "component", "message"),
+                 buckets_per_window=4, clock=time.monotonic, exempt=TELEMETRY_FIELDS):
+        self.window = window
+        self.key_fields = key_fields
+        self.exempt = exempt
+        self.bucket_width = window / buckets_per_window
+        self.clock = clock
+        self.groups = {}  # key -> _Group
+        self.buckets = {}  # bucket id -> [keys opened in that bucket]
+        self._oldest_bucket = None
+        self.received = 0
+        self.forwarded = 0
+        self.suppressed = 0
+        self.exempted = 0
+
+    def key_for(self, event):
+        return tuple(event.get(f) for f in self.key_fields)
+
+    def push(self, event, now=None):
+        """Feed one event; returns the list of events to forward now (possibly empty)."""
+        now = self.clock() if now is None else now
+        self.received += 1
+        out = self._expire(now)
+        if any(_is_number(event.get(f)) for f in self.exempt):
+            out.append(event)
+            self.exempted += 1
+            self.forwarded += 1
+            return out
+        key = self.key_for(event)
+        value = _numeric(event)
+        group = self.groups.get(key)
+        if group is not None:
+            group.count += 1
+            group.last_seen = _seen(event)
+            group.event = event
+            if value is not None:
+                group.last_value = value
+                group.max_value = value if group.max_value is None else max(group.max_value, value)
+            self.suppressed += 1
+            return out
+        self.groups[key] = _Group(event, value)
+        bucket = int(now // self.bucket_width)
+        self.buckets.setdefault(bucket, []).append(key)
+        if self._oldest_bucket is None or bucket < self._oldest_bucket:
+            self._oldest_bucket = bucket
+        out.append(dict(event, repeat_count=1))
+        self.forwarded += 1
+        return out
+
+    def expire(self, now=None):
+        """Aggregated events of the groups whose window has closed by `now`."""
+        return self._expire(self.clock() if now is None else now)
+
+    def _expire(self, now):
+        out = []
+        # A bucket is closed once even its newest possible group is older than window
+        last_closed = int((now - self.window) // self.bucket_width) - 1
+        while self._oldest_bucket is not None and self._oldest_bucket <= last_closed:
+            for key in self.buckets.pop(self._oldest_bucket):
+                group = self.groups.pop(key, None)
+                if group is not None and group.count > 1:
+                    out.append(self._aggregate(group))
+            self._oldest_bucket = min(self.buckets) if self.buckets else None
+        self.forwarded += len(out)
+        return out
+
+    def flush(self):
+        """Close every open group; returns the aggregated events for groups that saw repeats."""
+        out = [self._aggregate(g) for g in self.groups.values() if g.count > 1]
+        self.groups.clear()
+        self.buckets.clear()
+        self._oldest_bucket = None
+        self.forwarded += len(out)
+        return out
+
+    @staticmethod
+    def _aggregate(group):
+        return dict(
+            group.event,
+            repeat_count=group.count,
+            first_seen=group.first_seen,
+            last_seen=group.last_seen,
+            max_value=group.max_value,
+            last_value=group.last_value,
+            coalesced=True,
+        )
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "forwarded": self.forwarded,
+            "suppressed": self.suppressed,
+            "exempted": self.exempted,
+            "open_groups": len(self.groups),
+        }
+
+
+def _seen(event):
+    return event.get("timestamp") or datetime.now().isoformat()
+
+
+def _is_number(val):
+    return isinstance(val, (int, float)) and not isinstance(val, bool)
+
+
+def _numeric(event):
+    for field in VALUE_FIELDS:
+        val = event.get(field)
+        if _is_number(val):
+            return float(val)
+    return None
@@ -0,0 +1,337 @@
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+
+from agent.metrics import Metrics, now_ns
+
+_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 429: "Too Many Requests", 503: "Service Unavailable",
+}
+_STATUS_LABELS = {status: (("status", str(status)),) for status in _REASONS}
+
+
+class TokenBucket:
+    """`rate` tokens per second, up to `burst` saved up."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class RedfishListener:
+    """
+    Push-based Redfish event receiver. Accepts EventService subscription
+    POSTs (any path; the body is a Redfish Event or Telemetry payload) and
+    can subscribe to BMC Server-Sent Event streams (subscribe_sse). A POST is
+    acknowledged with 202 once it is queued, before any processing: a full
+    queue answers 503 and a source over its rate limit answers 429, both
+    with Retry-After so the BMC retries later instead of timing out.
+
+    A single consumer takes payloads off the bounded queue in micro-batches
+    (up to batch_size, waiting at most `linger` seconds to fill one) and
+    hands each batch to `handler(payloads)`. Handlers never run on the
+    accepting loop, so slow decisions cannot delay acks: a coroutine function
+    runs on a dedicated processing loop thread, a plain function on a worker
+    thread. With an AgentCore and no handler, batches go through
+    agent.process_events_async; while the queue is idle, an empty batch
+    every coalescing bucket lets the agent decide closed alert windows.
+
+    GET /health returns the queue depth and counters as JSON. Queue depth,
+    queue wait and batch latency are in `metrics` (the agent's, if given).
+    """
+
+    def __init__(self, agent=None, handler=None, host="0.0.0.0", port=8090, queue_size=10000,
+                 batch_size=64, linger=0.05, rate=None, burst=None, max_body=1 << 20,
+                 idle_timeout=75.0, event_type="redfish", metrics=None):
+        if agent is None and handler is None:
+            raise ValueError("RedfishListener needs an agent or a handler")
+        self.agent = agent
+        self.handler = handler or self._agent_handler
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.linger = linger
+        # Per-source limit in payloads/second (None: unlimited)
+        self.rate = rate
+        self.burst = burst or (rate * 2 if rate else None)
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self.event_type = event_type
+        self.metrics = metrics or (agent.metrics if agent is not None else Metrics())
+        self.logger = logging.getLogger("RedfishListener")
+        self.queue = None
+        self.server = None
+        self.buckets = {}  # source -> TokenBucket
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self._consumer = None
+        self._subscriptions = []
+        self._connections = set()
+        self._worker_loop = None
+
+    async def start(self):
+        """Bind and start accepting; `port` is updated when 0 was given."""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        if inspect.iscoroutinefunction(self.handler):
+            self._worker_loop = asyncio.new_event_loop()
+            threading.Thread(target=self._worker_loop.run_forever, name="ListenerWorker", daemon=True).start()
+        self.server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._consumer = asyncio.ensure_future(self._consume())
+        self.logger.info(f"Listening for Redfish events on {self.host}:{self.port}")
+        return self
+
+    async def stop(self, drain=True):
+        """Stop accepting; with drain=True, process what is already queued first."""
+        for task in self._subscriptions:
+            task.cancel()
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self.server.wait_closed()
+        if drain and self.queue is not None:
+            await self.queue.join()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, *self._subscriptions, return_exceptions=True)
+        if self._worker_loop is not None:
+            self._worker_loop.call_soon_threadsafe(self._worker_loop.stop)
+            self._worker_loop = None
+        self.logger.info(f"Listener stopped: {self.stats()}")
+
+    def run(self):
+        """Blocking: serve until interrupted."""
+        async def main():
+            await self.start()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.stop()
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_size": self.queue_size,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "limited_sources": len(self.buckets),
+        }
+
+    def offer(self, source, payload):
+        """Queue one payload without waiting; returns the HTTP status to answer with."""
+        if self.rate is not None:
+            now = time.monotonic()
+            bucket = self.buckets.get(source)
+            if bucket is None:
+                bucket = self.buckets[source] = TokenBucket(self.rate, self.burst, now)
+            if not bucket.take(now):
+                self.metrics.inc("listener_rate_limited_total")
+                return 429
+        try:
+            self.queue.put_nowait((payload, now_ns()))
+        except asyncio.QueueFull:
+            self.metrics.inc("listener_queue_full_total")
+            return 503
+        self.metrics.set_gauge("listener_queue_depth", self.queue.qsize())
+        return 202
+
+    async def _serve_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        source = peer[0] if peer else "unknown"
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+                method, path, version = parts
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    await self._respond(writer, 411, keep_alive=False)
+                    break
+                length = int(headers.get("content-length") or 0)
+                if length > self.max_body:
+                    await self._respond(writer, 413, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, response = self._dispatch(method, path, body, source)
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def _dispatch(self, method, path, body, source):
+        if method == "GET" and path.split("?")[0] == "/health":
+            return 200, self.stats()
+        if method != "POST":
+            return 405, None
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, None
+        if not isinstance(payload, dict):
+            return 400, None
+        status = self.offer(source, payload)
+        if status == 202:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+        return status, None
+
+    async def _respond(self, writer, status, response=None, keep_alive=True):
+        self.metrics.inc("listener_requests_total", labels=_STATUS_LABELS[status])
+        body = json.dumps(response).encode("utf-8") if response is not None else b""
+        head = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Content-Length: {len(body)}"]
+        if body:
+            head.append("Content-Type: application/json")
+        if status in (429, 503):
+            head.append("Retry-After: 1")
+        if not keep_alive:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _consume(self):
+        queue = self.queue
+        loop = asyncio.get_running_loop()
+        coalescer = getattr(self.agent, "coalescer", None) if self.handler == self._agent_handler else None
+        while True:
+            try:
+                # Wake up while idle so coalescing windows close without new traffic
+                batch = [await asyncio.wait_for(queue.get(), coalescer.bucket_width if coalescer else None)]
+            except asyncio.TimeoutError:
+                await self._handle(loop, [])
+                continue
+            deadline = loop.time() + self.linger
+            while len(batch) < self.batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            start = now_ns()
+            for _, enqueued in batch:
+                self.metrics.observe("listener_queue_wait", start - enqueued)
+            self.metrics.set_gauge("listener_queue_depth", queue.qsize())
+            await self._handle(loop, [payload for payload, _ in batch])
+            self.metrics.observe("listener_batch", now_ns() - start)
+            self.metrics.inc("listener_batches_total")
+            self.processed += len(batch)
+            for _ in batch:
+                queue.task_done()
+
+    async def _handle(self, loop, payloads):
+        try:
+            if self._worker_loop is not None:
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.handler(payloads), self._worker_loop))
+            else:
+                await loop.run_in_executor(None, self.handler, payloads)
+        except Exception as e:
+            self.metrics.inc("listener_batch_errors_total")
+            self.logger.error(f"Batch of {len(payloads)} payloads failed: {e}")
+
+    async def _agent_handler(self, payloads):
+        processor = self.agent.event_processors[self.event_type]
+        events = (event for payload in payloads for event in processor.iter_parse(payload))
+        await self.agent.process_events_async(self.agent.metrics.timed("parse", events))
+
+    def subscribe_sse(self, url, headers=None, verify=True, max_backoff=30.0):
+        """
+        Follow a BMC's Redfish SSE stream (EventService ServerSentEventUri),
+        reconnecting with Last-Event-ID and exponential backoff. Call after
+        start(). A full queue pauses reading, which backs the stream up.
+        """
+        task = asyncio.ensure_future(self._follow_sse(url, headers or {}, verify, max_backoff))
+        self._subscriptions.append(task)
+        return task
+
+    async def _follow_sse(self, url, headers, verify, max_backoff):
+        import httpx
+        last_id = None
+        backoff = 1.0
+        async with httpx.AsyncClient(verify=verify, timeout=httpx.Timeout(10.0, read=None)) as client:
+            while True:
+                request_headers = dict(headers, Accept="text/event-stream")
+                if last_id is not None:
+                    request_headers["Last-Event-ID"] = last_id
+                try:
+                    async with client.stream("GET", url, headers=request_headers) as response:
+                        response.raise_for_status()
+                        backoff = 1.0
+                        data = []
+                        async for line in response.aiter_lines():
+                            if line.startswith("data:"):
+                                data.append(line[5:].lstrip())
+                            elif line.startswith("id:"):
+                                last_id = line[3:].strip()
+                            elif not line and data:
+                                await self._offer_sse(url, "\n".join(data))
+                                data = []
+                except httpx.HTTPError as e:
+                    self.logger.warning(f"SSE stream {url} dropped: {e}; reconnecting in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+
+    async def _offer_sse(self, url, data):
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            self.logger.warning(f"Skipping non-JSON SSE event from {url}")
+            return
+        if self.rate is not None:
+            bucket = self.buckets.get(url)
+            if bucket is None:
+                bucket = self.buckets[url] = TokenBucket(self.rate, self.burst, time.monotonic())
+            while not bucket.take(time.monotonic()):
+                self.metrics.inc("listener_rate_limited_total")
+                await asyncio.sleep(1.0 / self.rate)
+        await self.queue.put((payload, now_ns()))
+        self.accepted += 1
+        self.metrics.set_gauge("listener_queue_depth", self.queue.qsize())
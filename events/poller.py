@@ -0,0 +1,261 @@
+import asyncio
+import inspect
+import logging
+import random
+import time
+
+from agent.metrics import Metrics, now_ns
+from events.redfish import RedfishEventProcessor
+
+_OUTCOMES = ("ok", "not_modified", "failed", "backoff")
+_OUTCOME_LABELS = {outcome: (("outcome", outcome),) for outcome in _OUTCOMES}
+
+
+class _Host:
+    __slots__ = ("name", "url", "client", "thermal_path", "select", "etag", "phase", "failures", "retry_at", "polls")
+
+    def __init__(self, name, url, phase):
+        self.name = name
+        self.url = url
+        self.client = None
+        self.thermal_path = None
+        self.select = False
+        self.etag = None
+        self.phase = phase  # fixed fraction of the sweep spread, so each host keeps its slot
+        self.failures = 0
+        self.retry_at = 0.0
+        self.polls = 0
+
+
+class RedfishPoller:
+    """
+    Polls Redfish Thermal resources across a fleet of BMCs from one process.
+
+    `hosts` is a list of BMC base URLs (https://bmc-1) or a {name: url} dict;
+    the name becomes the event server_id. On first contact each host's
+    service root and Chassis collection are read once to find its Thermal
+    resource and whether it supports $select. After that a poll is a single
+    GET that asks only for Temperatures/Fans where $select is supported, and
+    sends If-None-Match with the last ETag, so unchanged readings come back
+    as a body-less 304 that is not parsed at all.
+
+    Each host gets its own small httpx.AsyncClient that keeps its connection
+    alive between sweeps (size `ulimit -n` to the fleet, or pass
+    keepalive=False); one shared pool degrades badly at thousands of
+    connections. The clients share one SSL context, and at most `concurrency`
+    requests are in flight across the fleet. Within a sweep each host starts
+    at its own fixed, random offset inside `spread` seconds. A failing host
+    is skipped for min_backoff seconds, doubling up to max_backoff, instead
+    of being retried every sweep. Changed readings are parsed with RedfishEventProcessor and put
+    on a bounded queue (`queue_size` polls' worth; a full queue holds the
+    sweep back). One consumer drains it, up to `batch_size` events per call,
+    into `handler(events)` (plain or coroutine function), or into
+    agent.process_events_async when only `agent` is given. A sweep therefore
+    does not wait for LLM latency. drain() waits until everything queued is
+    delivered, and close() drains first.
+    """
+
+    def __init__(self, hosts, handler=None, agent=None, concurrency=256, spread=10.0, connect_timeout=3.0,
+                 read_timeout=10.0, keepalive=True, auth=None, verify=True, chassis=None,
+                 min_backoff=30.0, max_backoff=300.0, metrics=None, seed=None, queue_size=1000, batch_size=256):
+        if handler is None and agent is None:
+            raise ValueError("RedfishPoller needs a handler or an agent")
+        self.handler = handler or self._agent_handler
+        self.agent = agent
+        self.concurrency = concurrency
+        self.spread = spread
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive = keepalive
+        self.auth = auth
+        self.verify = verify
+        # Chassis to read when a host's Chassis collection is not consulted (e.g. "System.Embedded.1")
+        self.chassis = chassis
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics or (agent.metrics if agent is not None else Metrics())
+        self.logger = logging.getLogger("RedfishPoller")
+        self.processor = RedfishEventProcessor()
+        rng = random.Random(seed)
+        items = hosts.items() if isinstance(hosts, dict) else ((_host_name(url), url) for url in hosts)
+        self.hosts = [_Host(name, url.rstrip("/"), rng.random()) for name, url in items]
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self._ssl_context = None
+        self._slots = None
+        self._queue = None
+        self._consumer = None
+
+    def _client(self, host):
+        if host.client is None:
+            import httpx
+            if self._ssl_context is None:
+                # Building an SSL context loads the CA bundle: do it once, not per host
+                self._ssl_context = httpx.create_ssl_context(verify=self.verify)
+            host.client = httpx.AsyncClient(
+                auth=self.auth,
+                verify=self._ssl_context,
+                limits=httpx.Limits(
+                    max_connections=2,
+                    max_keepalive_connections=1 if self.keepalive else 0,
+                    keepalive_expiry=max(self.spread * 2, 60.0),
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                headers={"Accept": "application/json", "OData-Version": "4.0"},
+            )
+        return host.client
+
+    async def drain(self):
+        """Wait until every queued poll result has been delivered."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.drain()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+            self._queue = None
+        for host in self.hosts:
+            if host.client is not None:
+                await host.client.aclose()
+                host.client = None
+
+    async def sweep(self, spread=None):
+        """Poll every host once, spread over `spread` seconds; returns outcome counts and timing."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        if self._consumer is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._consumer = asyncio.ensure_future(self._consume())
+        spread = self.spread if spread is None else spread
+        start = time.monotonic()
+        counts = dict.fromkeys(_OUTCOMES, 0)
+        counts["events"] = 0
+
+        async def poll_one(host):
+            delay = host.phase * spread - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            outcome, events = await self.poll(host)
+            counts[outcome] += 1
+            if events:
+                counts["events"] += len(events)
+                await self._queue.put(events)
+
+        await asyncio.gather(*(poll_one(host) for host in self.hosts))
+        counts["hosts"] = len(self.hosts)
+        counts["seconds"] = time.monotonic() - start
+        self.metrics.set_gauge("poller_sweep_seconds", round(counts["seconds"], 3))
+        self.metrics.set_gauge("poller_hosts_failing", sum(1 for h in self.hosts if h.failures))
+        self.metrics.set_gauge("poller_queue_depth", self._queue.qsize())
+        self.logger.info(f"Sweep of {len(self.hosts)} hosts: {counts}")
+        return counts
+
+    async def run(self, interval=60.0):
+        """Sweep forever, one sweep per `interval` seconds, each spread over up to `interval`."""
+        try:
+            while True:
+                started = time.monotonic()
+                await self.sweep(min(self.spread, interval))
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+        finally:
+            await self.close()
+
+    async def poll(self, host):
+        """One poll of one host: (outcome, events), outcome one of ok/not_modified/failed/backoff."""
+        if host.retry_at > time.monotonic():
+            self.metrics.inc("poller_polls_total", labels=_OUTCOME_LABELS["backoff"])
+            return "backoff", None
+        async with self._slots:
+            start = now_ns()
+            try:
+                if host.thermal_path is None:
+                    await self._discover(host)
+                thermal = await self._fetch_thermal(host)
+                outcome = "ok" if thermal is not None else "not_modified"
+            except Exception as e:
+                outcome = "failed"
+                host.failures += 1
+                backoff = min(self.max_backoff, self.min_backoff * 2 ** (host.failures - 1))
+                host.retry_at = time.monotonic() + backoff * random.uniform(0.5, 1.0)
+                self.logger.debug(f"Poll of {host.name} failed ({type(e).__name__}: {e}); backing off {backoff:.0f}s")
+            else:
+                host.failures = 0
+            self.metrics.observe("poll", now_ns() - start)
+        host.polls += 1
+        self.metrics.inc("poller_polls_total", labels=_OUTCOME_LABELS[outcome])
+        if outcome != "ok":
+            return outcome, None
+        payload = {"ChassisId": host.name, "Telemetry": _telemetry(thermal)}
+        return outcome, list(self.processor.iter_parse(payload))
+
+    async def _discover(self, host):
+        client = self._client(host)
+        root = await client.get(f"{host.url}/redfish/v1/")
+        root.raise_for_status()
+        features = root.json().get("ProtocolFeaturesSupported") or {}
+        host.select = bool(features.get("SelectQuery"))
+        if self.chassis:
+            host.thermal_path = f"/redfish/v1/Chassis/{self.chassis}/Thermal"
+            return
+        chassis = await client.get(f"{host.url}/redfish/v1/Chassis")
+        chassis.raise_for_status()
+        members = chassis.json().get("Members") or []
+        if not members:
+            raise ValueError("no Chassis members")
+        host.thermal_path = members[0]["@odata.id"].rstrip("/") + "/Thermal"
+
+    async def _fetch_thermal(self, host):
+        """Thermal resource body, or None when unchanged since the last ETag (304)."""
+        url = host.url + host.thermal_path
+        if host.select:
+            url += "?$select=Temperatures,Fans"
+        headers = {"If-None-Match": host.etag} if host.etag else None
+        response = await self._client(host).get(url, headers=headers)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        host.etag = response.headers.get("ETag")
+        return response.json()
+
+    async def _consume(self):
+        queue = self._queue
+        while True:
+            events = await queue.get()
+            taken = 1
+            while len(events) < self.batch_size and not queue.empty():
+                events = events + queue.get_nowait()
+                taken += 1
+            try:
+                await self._deliver(events)
+            except Exception as e:
+                self.metrics.inc("poller_delivery_errors_total")
+                self.logger.error(f"Delivering {len(events)} polled events failed: {e}")
+            finally:
+                for _ in range(taken):
+                    queue.task_done()
+
+    async def _deliver(self, events):
+        if inspect.iscoroutinefunction(self.handler):
+            await self.handler(events)
+        else:
+            self.handler(events)
+
+    async def _agent_handler(self, events):
+        await self.agent.process_events_async(events)
+
+
+def _host_name(url):
+    return url.split("://", 1)[-1].rstrip("/")
+
+
+def _telemetry(thermal):
+    # Newer schemas report fans as Reading + ReadingUnits; the parser reads ReadingRPM
+    fans = []
+    for fan in thermal.get("Fans", []):
+        if "ReadingRPM" not in fan and fan.get("ReadingUnits", "RPM") == "RPM":
+            fan = dict(fan, ReadingRPM=fan.get("Reading"))
+        fans.append(fan)
+    return {"Temperatures": thermal.get("Temperatures", []), "Fans": fans}
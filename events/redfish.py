@@ -2,12 +2,15 @@ from datetime import datetime
 
 class RedfishEventProcessor:
     def parse(self, payload):
-        events = []
+        return list(self.iter_parse(payload))
+
+    def iter_parse(self, payload):
+        """Yield normalized events from a Redfish Event or Telemetry payload, one at a time."""
         if "Events" in payload:
+            server_id = payload.get("Id", "unknown_server")
             for ev in payload["Events"]:
                 event_type = ev.get("EventType", "Unknown")
                 msg = ev.get("Message", "")
-                server_id = payload.get("Id", "unknown_server")
                 ts = ev.get("EventTimestamp")
                 details = {
                     "server_id": server_id,
@@ -22,26 +25,25 @@ class RedfishEventProcessor:
                         details["value"] = float(ev["MessageArgs"][1])
                     except Exception:
                         details["value"] = ev["MessageArgs"][1]
-                events.append(details)
+                yield details
         elif "Telemetry" in payload:
             server_id = payload.get("ChassisId", "unknown_chassis")
             ts = datetime.now().isoformat()
             for temp in payload["Telemetry"].get("Temperatures", []):
-                events.append({
+                yield {
                     "server_id": server_id,
                     "type": "temperature",
                     "timestamp": ts,
                     "component": temp.get("Name"),
                     "temperature": temp.get("ReadingCelsius"),
                     "status": temp.get("Status", {}).get("Health")
-                })
+                }
             for fan in payload["Telemetry"].get("Fans", []):
-                events.append({
+                yield {
                     "server_id": server_id,
                     "type": "fan",
                     "timestamp": ts,
                     "component": fan.get("Name"),
                     "fan_rpm": fan.get("ReadingRPM"),
                     "status": fan.get("Status", {}).get("Health")
-                })
-        return events
+                }
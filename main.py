@@ -1,8 +1,47 @@
 from agent.core import AgentCore
+import argparse
 import httpx
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AgenticAI server event agent")
+    parser.add_argument("--ingest", metavar="PATH", help="bulk ingest an NDJSON/JSONL file of Redfish payloads ('-' for stdin)")
+    parser.add_argument("--workers", type=int, default=0, help="processes used for JSON decoding during --ingest / --backtest")
+    parser.add_argument("--listen", type=int, metavar="PORT", help="receive Redfish event subscription POSTs on PORT")
+    parser.add_argument("--rate", type=float, help="with --listen: per-source limit in payloads/second")
+    parser.add_argument("--poll", metavar="FILE", help="poll the Redfish Thermal resource of each BMC URL in FILE")
+    parser.add_argument("--interval", type=float, default=60.0, help="with --poll: seconds between fleet sweeps")
+    parser.add_argument("--backtest", metavar="SNAPSHOT", help="replay events through the rule tables in SNAPSHOT (JSON) without the LLM")
+    parser.add_argument("--events", metavar="PATH", help="with --backtest: JSONL of events or audit rows (default: the audit DB)")
+    args = parser.parse_args()
+    if args.backtest:
+        import json
+        import os
+        from agent.backtest import Backtester
+        backtester = Backtester(args.backtest, workers=args.workers)
+        if args.events:
+            report = backtester.run_jsonl(args.events)
+        else:
+            report = backtester.run_audit(os.getenv("AUDIT_DB_PATH", "audit.db"))
+        print(json.dumps(report, indent=2))
+        raise SystemExit(0)
     agent = AgentCore(http_client=httpx.Client(verify=False))
+    if args.ingest:
+        print(agent.ingest_stream(args.ingest, workers=args.workers))
+        raise SystemExit(0)
+    if args.poll:
+        import asyncio
+        from events.poller import RedfishPoller
+        with open(args.poll) as f:
+            hosts = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        try:
+            asyncio.run(RedfishPoller(hosts, agent=agent, verify=False).run(args.interval))
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+    if args.listen:
+        from events.listener import RedfishListener
+        RedfishListener(agent, port=args.listen, rate=args.rate).run()
+        raise SystemExit(0)
     poweredge_redfish_event = {
         "@odata.type": "#Event.v1_2_0.Event",
         "Id": "PE_server1",
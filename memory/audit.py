@@ -1,22 +1,193 @@
+import atexit
+import json
+import logging
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
 
+DEFAULT_DB_PATH = "audit.db"
+
+STRUCTURED_COLUMNS = (
+    ("ts", "REAL"),
+    ("server_id", "TEXT"),
+    ("type", "TEXT"),
+    ("component", "TEXT"),
+    ("severity", "TEXT"),
+    ("source", "TEXT"),
+    ("tier", "TEXT"),
+)
+
+INDEXES = (
+    ("idx_audit_ts", "ts"),
+    ("idx_audit_server_ts", "server_id, ts"),
+    ("idx_audit_component_ts", "component, ts"),
+    ("idx_audit_decision_ts", "decision, ts"),
+    ("idx_audit_source_ts", "source, ts"),
+)
+
+INSERT_SQL = (
+    "INSERT INTO audit (decision, reason, event, timestamp, ts, server_id, type, component, severity, source, tier) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+QUERY_COLUMNS = ("rowid", "ts", "timestamp", "server_id", "type", "component", "severity", "decision", "source", "tier", "reason", "event")
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
 class AuditMemory:
-    def __init__(self, db_path=":memory:"):
-        self.conn = sqlite3.connect(db_path)
+    """
+    Decision audit trail in SQLite (WAL mode on disk).
+
+    With write_behind=True, log_decision only enqueues; a background writer
+    thread flushes rows with executemany in one transaction whenever
+    batch_size rows are queued or flush_interval seconds have passed.
+    close() (also registered atexit) drains the queue before returning.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, write_behind=False, batch_size=500,
+                 flush_interval=0.5, max_queue=100000):
+        self.db_path = db_path
+        self.logger = logging.getLogger("AuditMemory")
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.cursor = self.conn.cursor()
+        if db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._lock = threading.Lock()
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.batches_written = 0
+        self.max_queue_depth = 0
+        self._queue = None
+        self._writer = None
+        self._closed = False
+        if write_behind:
+            self._queue = queue.Queue(maxsize=max_queue)
+            self._writer = threading.Thread(target=self._writer_loop, name="AuditWriter", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    def _create_schema(self):
         self.cursor.execute(
             "CREATE TABLE IF NOT EXISTS audit (decision TEXT, reason TEXT, event TEXT, timestamp TEXT)"
         )
+        # Structured columns, added in place to pre-existing audit tables
+        existing = {row[1] for row in self.cursor.execute("PRAGMA table_info(audit)")}
+        for name, decl in STRUCTURED_COLUMNS:
+            if name not in existing:
+                self.cursor.execute(f"ALTER TABLE audit ADD COLUMN {name} {decl}")
+        if "ts" not in existing:
+            self._backfill_ts()
+        for name, cols in INDEXES:
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON audit ({cols})")
+        self.conn.commit()
 
-    def log_decision(self, decision, reason, event=None):
-        ts = datetime.now().isoformat()
-        evt_str = str(event) if event else ""
-        self.cursor.execute(
-            "INSERT INTO audit (decision, reason, event, timestamp) VALUES (?, ?, ?, ?)",
-            (decision, reason, evt_str, ts),
+    def _backfill_ts(self):
+        # Legacy timestamps are naive local-time ISO strings (or carry their own offset);
+        # julianday() would read them as UTC, so convert them the way _epoch does
+        updates = []
+        for rowid, timestamp in self.cursor.execute("SELECT rowid, timestamp FROM audit WHERE ts IS NULL").fetchall():
+            try:
+                updates.append((_epoch(timestamp), rowid))
+            except (TypeError, ValueError):
+                self.logger.warning(f"Audit row {rowid}: cannot parse timestamp {timestamp!r}; ts left empty")
+        self.cursor.executemany("UPDATE audit SET ts = ? WHERE rowid = ?", updates)
+
+    def log_decision(self, decision, reason, event=None, source=None, tier=None):
+        now = time.time()
+        ts = datetime.fromtimestamp(now).isoformat()
+        event = event or {}
+        evt_str = json.dumps(event, default=str) if event else ""
+        row = (
+            decision, reason, evt_str, ts, now,
+            event.get("server_id"), event.get("type"), _text(event.get("component")),
+            event.get("severity"), source, tier,
         )
-        self.conn.commit()
+        self.submit_row(row)
+
+    def submit_row(self, row):
+        """Queue (write-behind) or write one pre-built audit row."""
+        if self._queue is not None and not self._closed:
+            self._queue.put(row)
+            depth = self._queue.qsize()
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+            return
+        self.write_rows([row])
+
+    def write_rows(self, rows):
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(INSERT_SQL, rows)
+            self.rows_written += len(rows)
+            self.batches_written += 1
+
+    def _writer_loop(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            if batch:
+                try:
+                    self.write_rows(batch)
+                except Exception as e:
+                    self.logger.error(f"Audit batch write failed ({len(batch)} rows): {e}")
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def flush(self, timeout=None):
+        """Block until every queued row is written (no-op when synchronous)."""
+        if self._queue is None:
+            return True
+        if timeout is None:
+            self._queue.join()
+            return True
+        end = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.005)
+        return not self._queue.unfinished_tasks
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            atexit.unregister(self.close)
+        with self._lock:
+            self.conn.close()
+
+    def metrics(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "rows_written": self.rows_written,
+            "batches_written": self.batches_written,
+        }
 
     def ingest(self, config, event=None):
         """
@@ -40,23 +211,212 @@ class AuditMemory:
                     if isinstance(entry, dict):
                         decision = entry.get("decision", "info")
                         reason = entry.get("reason", entry.get("event", str(entry)))
-                        self.log_decision(decision, reason, event)
+                        self.log_decision(decision, reason, event, source="llm")
                     elif isinstance(entry, str):
-                        self.log_decision("info", entry, event)
+                        self.log_decision("info", entry, event, source="llm")
             return
         elif isinstance(config, list):
             for entry in config:
                 if isinstance(entry, dict):
                     decision = entry.get("decision", "info")
                     reason = entry.get("reason", entry.get("event", str(entry)))
-                    self.log_decision(decision, reason, event)
+                    self.log_decision(decision, reason, event, source="llm")
                 elif isinstance(entry, str):
-                    self.log_decision("info", entry, event)
+                    self.log_decision("info", entry, event, source="llm")
             return
         elif isinstance(config, str):
-            self.log_decision("info", config, event)
+            self.log_decision("info", config, event, source="llm")
             return
 
     def get_audit_log(self, limit=100):
-        self.cursor.execute("SELECT * FROM audit ORDER BY timestamp DESC LIMIT ?", (limit,))
-        return self.cursor.fetchall()
+        self.flush()
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT decision, reason, event, timestamp FROM audit ORDER BY ts DESC LIMIT ?", (limit,)
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def _filters(start=None, end=None, server_id=None, decision=None, source=None, component=None, tier=None):
+        clauses, params = [], []
+        for column, value in (("server_id", server_id), ("decision", decision),
+                              ("source", source), ("component", component), ("tier", tier)):
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(_epoch(end))
+        return clauses, params
+
+    def query(self, start=None, end=None, server_id=None, decision=None, source=None,
+              component=None, tier=None, limit=100, cursor=None):
+        """
+        Filtered audit rows, newest first, as dicts. Pagination is keyset-based:
+        pass the returned next_cursor back as `cursor` for the following page.
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        clauses, params = self._filters(start, end, server_id, decision, source, component, tier)
+        if cursor is not None:
+            clauses.append("(ts < ? OR (ts = ? AND rowid < ?))")
+            params.extend([cursor[0], cursor[0], cursor[1]])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join(QUERY_COLUMNS)} FROM audit {where} ORDER BY ts DESC, rowid DESC LIMIT ?"
+        self.flush()
+        with self._lock:
+            fetched = self.conn.execute(sql, params + [limit + 1]).fetchall()
+        rows = [dict(zip(QUERY_COLUMNS, r)) for r in fetched[:limit]]
+        next_cursor = (rows[-1]["ts"], rows[-1]["rowid"]) if len(fetched) > limit else None
+        return rows, next_cursor
+
+    def decisions_per_server_per_hour(self, start=None, end=None, server_id=None, decision=None, source=None):
+        """[(server_id, hour_start_epoch, decision, count)] ordered by server and hour."""
+        clauses, params = self._filters(start, end, server_id, decision, source)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            "SELECT server_id, CAST(ts / 3600 AS INTEGER) * 3600 AS hour, decision, COUNT(*) "
+            f"FROM audit {where} GROUP BY server_id, hour, decision ORDER BY server_id, hour"
+        )
+        self.flush()
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def top_noisy_components(self, start=None, end=None, limit=10, server_id=None, decision=None):
+        """[(server_id, component, count)] for the components with the most audit rows."""
+        clauses, params = self._filters(start, end, server_id, decision)
+        clauses.append("component IS NOT NULL")
+        sql = (
+            "SELECT server_id, component, COUNT(*) AS n FROM audit "
+            f"WHERE {' AND '.join(clauses)} GROUP BY server_id, component ORDER BY n DESC LIMIT ?"
+        )
+        self.flush()
+        with self._lock:
+            return self.conn.execute(sql, params + [limit]).fetchall()
+
+    def to_dataframe(self, chunksize=None, **filters):
+        """Audit rows matching `filters` (see query) as a pandas DataFrame, or an iterator of them with chunksize."""
+        import pandas as pd
+        clauses, params = self._filters(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join(QUERY_COLUMNS)} FROM audit {where} ORDER BY ts"
+        self.flush()
+        if chunksize:
+            return self._read_chunks(pd, sql, params, chunksize)
+        if self.db_path == ":memory:":
+            with self._lock:
+                return pd.read_sql_query(sql, self.conn, params=params)
+        # Separate read connection so long exports do not hold the writer lock
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def _read_chunks(self, pd, sql, params, chunksize):
+        # A generator, so the read connection is closed once the chunks are exhausted (or abandoned)
+        if self.db_path == ":memory:":
+            # Only the fetches hold the lock, so the consumer may log decisions between chunks
+            with self._lock:
+                cursor = self.conn.execute(sql, params)
+            try:
+                while True:
+                    with self._lock:
+                        rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        return
+                    yield pd.DataFrame(rows, columns=QUERY_COLUMNS)
+            finally:
+                with self._lock:
+                    cursor.close()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield from pd.read_sql_query(sql, conn, params=params, chunksize=chunksize)
+        finally:
+            conn.close()
+
+    def export_parquet(self, path, chunksize=100000, **filters):
+        """Stream matching audit rows into a Parquet file (requires pyarrow). Returns rows written."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("export_parquet requires pyarrow (pip install pyarrow)") from None
+        writer = None
+        written = 0
+        try:
+            for chunk in self.to_dataframe(chunksize=chunksize, **filters):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class RemoteAuditMemory(AuditMemory):
+    """
+    AuditMemory stand-in for worker processes: rows are built as usual but
+    shipped over a multiprocessing queue to the single process that owns the
+    database (see agent.pool.AgentPool).
+    """
+
+    def __init__(self, row_queue):
+        self.logger = logging.getLogger("AuditMemory")
+        self.row_queue = row_queue
+        self._queue = None
+        self._closed = False
+
+    def submit_row(self, row):
+        self.row_queue.put(row)
+
+    def flush(self, timeout=None):
+        return True
+
+    def close(self):
+        self._closed = True
+
+    def metrics(self):
+        return {}
+
+    def _owner_only(self, name):
+        raise RuntimeError(
+            f"RemoteAuditMemory.{name}: this worker only ships audit rows; "
+            "query the AuditMemory of the process that owns the database (AgentPool.audit)"
+        )
+
+    def get_audit_log(self, *args, **kwargs):
+        self._owner_only("get_audit_log")
+
+    def query(self, *args, **kwargs):
+        self._owner_only("query")
+
+    def decisions_per_server_per_hour(self, *args, **kwargs):
+        self._owner_only("decisions_per_server_per_hour")
+
+    def top_noisy_components(self, *args, **kwargs):
+        self._owner_only("top_noisy_components")
+
+    def to_dataframe(self, *args, **kwargs):
+        self._owner_only("to_dataframe")
+
+    def export_parquet(self, *args, **kwargs):
+        self._owner_only("export_parquet")
@@ -1,60 +1,149 @@
+import hashlib
+import json
 import logging
+import threading
+from collections import OrderedDict
+
+from agent.lazy import lazy_import
+from memory.rule_expr import compile_expression, to_columns, RuleExpressionError
+
+np = lazy_import("numpy")
+
 
 class ClassicRuleMemory:
+    # Compiled rule tables shared across instances, keyed by content hash
+    _compiled_tables = OrderedDict()
+    _max_compiled_tables = 256
+    _compiled_tables_lock = threading.Lock()
+
     def __init__(self):
         self.table = None
+        self.compiled = []
+        self.table_hash = None
         self.logger = logging.getLogger("ClassicRuleMemory")
 
     def ingest(self, config):
         # Defensive: handle many LLM output variants
         if not config:
             self.table = None
-            return
-        if "rules" in config and isinstance(config["rules"], list):
+        elif isinstance(config, dict) and "rules" in config and isinstance(config["rules"], list):
             self.table = config["rules"]
         elif isinstance(config, list):
             self.table = config
         else:
             self.table = None
+        self.compiled, self.table_hash = self.compile_table(self.table)
+
+    @classmethod
+    def compile_table(cls, table):
+        """
+        Compile a rule table into [(expr, action, compiled_or_None, error)].
+        Identical tables (by content hash) are compiled once.
+        """
+        if not table:
+            return [], None
+        try:
+            digest = hashlib.sha256(
+                json.dumps(table, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+        except (TypeError, ValueError):
+            digest = None
+        if digest is not None:
+            with cls._compiled_tables_lock:
+                cached = cls._compiled_tables.get(digest)
+                if cached is not None:
+                    cls._compiled_tables.move_to_end(digest)
+                    return cached, digest
+        compiled = []
+        for rule in table:
+            expr, action = cls._rule_expression(rule)
+            if not expr:
+                continue
+            try:
+                compiled.append((expr, action, compile_expression(expr), None))
+            except RuleExpressionError as e:
+                compiled.append((expr, action, None, e))
+        if digest is not None:
+            # Compiled outside the lock; a racing thread compiling the same table just overwrites it
+            with cls._compiled_tables_lock:
+                cls._compiled_tables[digest] = compiled
+                while len(cls._compiled_tables) > cls._max_compiled_tables:
+                    cls._compiled_tables.popitem(last=False)
+        return compiled, digest
+
+    @staticmethod
+    def _rule_expression(rule):
+        expr = None
+        action = None
+        if not isinstance(rule, dict):
+            return None, None
+        # Flat: {"condition": "...", "action": "..."}
+        if "condition" in rule:
+            expr = rule["condition"]
+            action = rule.get("action", None)
+        # Deep: {"conditions": [ {attr, operator, value} ], "actions": [ {type, message} ]}
+        elif "conditions" in rule and isinstance(rule["conditions"], list) and rule["conditions"]:
+            cond = rule["conditions"][0]
+            attr = cond.get("attribute")
+            op = cond.get("operator")
+            value = cond.get("value")
+            if attr and op and value is not None:
+                # Safe string value formatting
+                if isinstance(value, str):
+                    expr = f"{attr} {op} {value!r}"
+                else:
+                    expr = f"{attr} {op} {value}"
+            if "actions" in rule and isinstance(rule["actions"], list) and rule["actions"]:
+                action = rule["actions"][0].get("type", None)
+        if not isinstance(expr, str):
+            return None, action
+        return expr, action
 
     def decide_action(self, state):
         explanations = []
-        if not self.table:
+        if not self.compiled:
             return "monitor", "[Classic] No classic rule matched for this demo."
-        for rule in self.table:
-            expr = None
-            action = None
-            # Flat: {"condition": "...", "action": "..."}
-            if "condition" in rule:
-                expr = rule["condition"]
-                action = rule.get("action", None)
-            # Deep: {"conditions": [ {attr, operator, value} ], "actions": [ {type, message} ]}
-            elif "conditions" in rule and isinstance(rule["conditions"], list) and rule["conditions"]:
-                cond = rule["conditions"][0]
-                attr = cond.get("attribute")
-                op = cond.get("operator")
-                value = cond.get("value")
-                if attr and op and value is not None:
-                    # Safe string value formatting
-                    if isinstance(value, str):
-                        expr = f"{attr} {op} '{value}'"
-                    else:
-                        expr = f"{attr} {op} {value}"
-                if "actions" in rule and isinstance(rule["actions"], list) and rule["actions"]:
-                    action = rule["actions"][0].get("type", None)
-            if not expr:
+        for expr, action, compiled, error in self.compiled:
+            if compiled is None:
+                explanations.append(f"Classic rule eval failed: {expr}: {error}")
                 continue
-            expr_eval = expr
-            # Support state renaming: temperature <-> cpu_temp
-            if "temperature" in expr and "temperature" not in state and "cpu_temp" in state:
-                expr_eval = expr.replace("temperature", "cpu_temp")
             try:
-                result = eval(expr_eval, {}, state)
+                result = compiled.evaluate(state)
                 explanations.append(
-                    f"Classic rule matched: {expr_eval} => {action}" if result else f"Classic rule did not match: {expr_eval}"
+                    f"Classic rule matched: {expr} => {action}" if result else f"Classic rule did not match: {expr}"
                 )
                 if result:
                     return action or "alert", " | ".join(explanations)
             except Exception as e:
-                explanations.append(f"Classic rule eval failed: {expr_eval}: {e}")
+                explanations.append(f"Classic rule eval failed: {expr}: {e}")
         return "monitor", " | ".join(explanations) if explanations else "[Classic] No classic rule matched for this demo."
+
+    def attributes(self):
+        """State attributes the compiled rules read."""
+        return {name for _, _, compiled, _ in self.compiled if compiled is not None for name in compiled.names}
+
+    def decide_action_batch(self, states):
+        """
+        Evaluate the rule table against many states at once: `states` is a list
+        of state dicts or a {attribute: array} mapping. One vectorized pass per
+        rule, first matching rule wins. Returns (actions, rule_index) arrays;
+        rule_index is -1 where no rule matched and the action is 'monitor'.
+        """
+        columns, n = to_columns(states)
+        actions = np.full(n, "monitor", dtype=object)
+        rule_index = np.full(n, -1, dtype=np.int64)
+        undecided = np.ones(n, dtype=bool)
+        for i, (expr, action, compiled, error) in enumerate(self.compiled):
+            if compiled is None:
+                continue
+            try:
+                hit = compiled.evaluate_columns(columns, n) & undecided
+            except Exception as e:
+                self.logger.warning(f"Classic rule batch eval failed: {expr}: {e}")
+                continue
+            actions[hit] = action or "alert"
+            rule_index[hit] = i
+            undecided &= ~hit
+            if not undecided.any():
+                break
+        return actions, rule_index
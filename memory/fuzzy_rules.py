@@ -1,74 +1,277 @@
 import logging
+import re
+
 import numpy as np
-import skfuzzy as fuzz
+
+from memory.rule_expr import DEFAULT_ALIASES, to_columns, float_column
+
+# Default linguistic variables: attribute -> term -> [a, b, c] (triangle) or
+# [a, b, c, d] (trapezoid). A repeated first/last point is an open shoulder.
+DEFAULT_VARIABLES = {
+    "temperature": {
+        "low": [0, 0, 60],
+        "medium": [40, 65, 90],
+        "high": [60, 100, 120],
+    },
+    "fan_rpm": {
+        "low": [0, 0, 3000],
+        "medium": [2000, 5000, 8000],
+        "high": [3000, 10000, 10000],
+    },
+}
+
+DEFAULT_THRESHOLD = 0.7
+
+_CLAUSE_RE = re.compile(r"\b([A-Za-z_]\w*)\s*(\bis\b|==|!=|=)?\s*(\bnot\b\s*)?['\"]?([A-Za-z_]\w*)['\"]?")
+
+
+def _trapezoid(params):
+    """Normalize a membership spec to a trapezoid (a, b, c, d)."""
+    if isinstance(params, dict):
+        params = params.get("params") or params.get("points")
+    params = [float(p) for p in params]
+    if len(params) == 3:
+        a, b, c = params
+        return a, b, b, c
+    if len(params) == 4:
+        return tuple(params)
+    raise ValueError(f"membership function needs 3 or 4 points, got {len(params)}")
+
+
+def membership(x, trap):
+    """Closed-form trapezoidal membership of a scalar."""
+    a, b, c, d = trap
+    if x < b:
+        if a == b:
+            rise = 1.0
+        else:
+            rise = (x - a) / (b - a)
+            if rise <= 0.0:
+                return 0.0
+    else:
+        rise = 1.0
+    if x > c:
+        if c == d:
+            fall = 1.0
+        else:
+            fall = (d - x) / (d - c)
+            if fall <= 0.0:
+                return 0.0
+    else:
+        fall = 1.0
+    return min(rise, fall, 1.0)
+
+
+def membership_array(x, trap):
+    """Closed-form trapezoidal membership of an array (NaN -> 0)."""
+    a, b, c, d = trap
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rise = np.ones_like(x) if a == b else (x - a) / (b - a)
+        fall = np.ones_like(x) if c == d else (d - x) / (d - c)
+    mu = np.clip(np.minimum(rise, fall), 0.0, 1.0)
+    return np.nan_to_num(mu, nan=0.0)
+
 
 class FuzzyRuleMemory:
-    def __init__(self):
+    def __init__(self, variables=None):
         self.table = None
+        self.rules = []
         self.logger = logging.getLogger("FuzzyRuleMemory")
-        # Real fuzzy membership: temperature and fan_rpm universes
-        self.temp_universe = np.arange(0, 121, 1)
-        self.fan_universe = np.arange(0, 10001, 1)
-        # Memberships
-        self.temp_lo = fuzz.trimf(self.temp_universe, [0, 0, 60])
-        self.temp_hi = fuzz.trimf(self.temp_universe, [60, 100, 120])
-        self.fan_lo = fuzz.trimf(self.fan_universe, [0, 0, 3000])
-        self.fan_hi = fuzz.trimf(self.fan_universe, [3000, 10000, 10000])
+        self.variables = {}
+        self.define_variables(variables or DEFAULT_VARIABLES)
+
+    def define_variables(self, variables):
+        """
+        Add/replace linguistic variables. Accepts {attr: {term: points}} or a
+        list of {"name"/"attribute": attr, "terms"/"sets": {term: points}}.
+        """
+        if isinstance(variables, list):
+            variables = {
+                v.get("name") or v.get("attribute"): v.get("terms") or v.get("sets") or {}
+                for v in variables if isinstance(v, dict)
+            }
+        if not isinstance(variables, dict):
+            return
+        for attr, terms in variables.items():
+            if not attr or not isinstance(terms, dict):
+                continue
+            parsed = {}
+            for term, params in terms.items():
+                try:
+                    parsed[str(term).lower()] = _trapezoid(params)
+                except (TypeError, ValueError) as e:
+                    self.logger.warning(f"Skipping fuzzy set {attr}.{term}: {e}")
+            if parsed:
+                self.variables.setdefault(attr, {}).update(parsed)
 
     def ingest(self, config):
-        # Defensive: allow table/list or {rules: [...]}
+        # Defensive: allow table/list or {rules: [...], variables: {...}}
+        if isinstance(config, dict) and "variables" in config:
+            self.define_variables(config["variables"])
         if not config:
             self.table = None
-            return
-        if "rules" in config and isinstance(config["rules"], list):
+        elif isinstance(config, dict) and "rules" in config and isinstance(config["rules"], list):
             self.table = config["rules"]
         elif isinstance(config, list):
             self.table = config
         else:
             self.table = None
+        self.rules = [r for r in (self._compile_rule(rule) for rule in (self.table or [])) if r]
 
-    def decide_action(self, state):
-        explanations = []
-        temp = state.get("temperature") or state.get("cpu_temp") or 0
-        fan_rpm = state.get("fan_rpm") or 0
-        temp_hi_val = fuzz.interp_membership(self.temp_universe, self.temp_hi, temp)
-        fan_hi_val = fuzz.interp_membership(self.fan_universe, self.fan_hi, fan_rpm)
-        found = False
-        for rule in (self.table or []):
-            cond = None
-            action = None
-            # Flat: {"condition": "...", "action": "..."}
-            if "condition" in rule:
-                cond = rule["condition"]
-                action = rule.get("action")
-            # Deep: {"conditions": [...], "actions": [...]}
-            elif "conditions" in rule and isinstance(rule["conditions"], list) and rule["conditions"]:
-                cond_obj = rule["conditions"][0]
+    def _compile_rule(self, rule):
+        """Compile a rule into (cond, action, groups, threshold); groups are OR-ed lists of AND-ed clauses."""
+        if not isinstance(rule, dict):
+            return None
+        cond = None
+        action = None
+        clauses = []
+        # Flat: {"condition": "...", "action": "..."}
+        if "condition" in rule:
+            cond = rule["condition"]
+            action = rule.get("action")
+        # Deep: {"conditions": [...], "actions": [...]}
+        elif "conditions" in rule and isinstance(rule["conditions"], list) and rule["conditions"]:
+            parts = []
+            for cond_obj in rule["conditions"]:
+                if not isinstance(cond_obj, dict):
+                    continue
                 attr = cond_obj.get("attribute")
                 op = cond_obj.get("operator")
                 val = cond_obj.get("value")
-                cond = f"{attr} {op} {val}"
-                if "actions" in rule and isinstance(rule["actions"], list) and rule["actions"]:
-                    action = rule["actions"][0].get("type")
-            if not cond:
+                parts.append(f"{attr} {op} {val}")
+                term = str(val).lower()
+                if self._term(attr, term):
+                    clauses.append((attr, term, op in ("!=", "is not", "not")))
+            cond = " and ".join(parts)
+            if "actions" in rule and isinstance(rule["actions"], list) and rule["actions"]:
+                action = rule["actions"][0].get("type")
+        if not cond or not isinstance(cond, str):
+            return None
+        groups = [clauses] if clauses else self._parse_condition(cond)
+        threshold = rule.get("threshold")
+        try:
+            threshold = DEFAULT_THRESHOLD if threshold is None else float(threshold)
+        except (TypeError, ValueError):
+            self.logger.warning(f"Rule {cond!r}: invalid threshold {threshold!r}, using {DEFAULT_THRESHOLD}")
+            threshold = DEFAULT_THRESHOLD
+        return cond, action, groups, threshold
+
+    def _parse_condition(self, cond):
+        groups = []
+        for disjunct in re.split(r"\s+or\s+|\s*\|\|\s*", cond, flags=re.IGNORECASE):
+            clauses = []
+            for part in re.split(r"\s+and\s+|\s*&&\s*", disjunct, flags=re.IGNORECASE):
+                clause = self._parse_clause(part)
+                if clause and clause not in clauses:
+                    clauses.append(clause)
+            if clauses:
+                groups.append(clauses)
+        return groups
+
+    def _parse_clause(self, part):
+        for attr, op, negate, term in _CLAUSE_RE.findall(part):
+            term = term.lower()
+            if self._term(attr, term):
+                return attr, term, op == "!=" or bool(negate)
+        # Loose phrasing ("high temperature"): a known attribute + term mentioned
+        lowered = part.lower()
+        for attr, terms in self.variables.items():
+            if attr in part:
+                for term in terms:
+                    if re.search(rf"\b{term}\b", lowered):
+                        return attr, term, bool(re.search(r"\bnot\b|!=", lowered))
+        return None
+
+    def _term(self, attr, term):
+        terms = self.variables.get(attr)
+        if terms is None:
+            # Rule written against the alias target (e.g. cpu_temp)
+            for src, dst in DEFAULT_ALIASES.items():
+                if dst == attr:
+                    terms = self.variables.get(src)
+        return terms.get(term) if terms else None
+
+    @staticmethod
+    def _value(state, attr):
+        val = state.get(attr)
+        if val is None and attr in DEFAULT_ALIASES:
+            val = state.get(DEFAULT_ALIASES[attr])
+        try:
+            return None if val is None else float(val)
+        except (TypeError, ValueError):
+            return None
+
+    def decide_action(self, state):
+        explanations = []
+        degrees = {}
+        for cond, action, groups, threshold in self.rules:
+            if not groups:
+                explanations.append(f"[Fuzzy] Condition '{cond}' has no fuzzy terms => False")
                 continue
-            is_fuzzy = False
-            trace = ""
-            # Simple demo: recognize temperature/fan_rpm fuzzy
-            if "temperature" in cond and "high" in cond:
-                trace = f"Temp={temp}, fuzzy_hi={temp_hi_val:.2f}"
-                if temp_hi_val > 0.7:
-                    is_fuzzy = True
-            if "fan_rpm" in cond and "high" in cond:
-                trace = f"FanRPM={fan_rpm}, fuzzy_hi={fan_hi_val:.2f}"
-                if fan_hi_val > 0.7:
-                    is_fuzzy = True
+            strength = 0.0
+            trace = []
+            for clauses in groups:
+                group_strength = 1.0
+                for attr, term, negate in clauses:
+                    key = (attr, term)
+                    if key not in degrees:
+                        value = self._value(state, attr)
+                        degrees[key] = (value, 0.0 if value is None else membership(value, self._term(attr, term)))
+                    value, mu = degrees[key]
+                    if value is None:
+                        trace.append(f"{attr} missing")
+                    else:
+                        if negate:
+                            mu = 1.0 - mu
+                        trace.append(f"{attr}={value:g}, fuzzy_{'not_' if negate else ''}{term}={mu:.2f}")
+                    group_strength = min(group_strength, mu)
+                strength = max(strength, group_strength)
+            is_fuzzy = strength > threshold
             explanations.append(
-                f"[Fuzzy] Condition '{cond}' {trace} => {is_fuzzy}"
+                f"[Fuzzy] Condition '{cond}' {'; '.join(trace)} => {is_fuzzy}"
             )
             if is_fuzzy:
-                found = True
                 return action or "warn", " | ".join(explanations) + f" | [Fuzzy] Action '{action}' matched fuzzy condition '{cond}'"
-        if not found:
-            explanations.append("[Fuzzy] No fuzzy rule matched.")
+        explanations.append("[Fuzzy] No fuzzy rule matched.")
         return None, " | ".join(explanations)
+
+    def attributes(self):
+        """State attributes the fuzzy rules read."""
+        return {attr for _, _, groups, _ in self.rules for clauses in groups for attr, _, _ in clauses}
+
+    def decide_action_batch(self, states):
+        """
+        Score many readings at once: `states` is a list of state dicts or a
+        {attribute: array} mapping. Returns (actions, strength) arrays; action
+        is None where no rule fired, strength is the firing rule's degree.
+        """
+        columns, n = to_columns(states)
+        actions = np.full(n, None, dtype=object)
+        strengths = np.zeros(n, dtype=np.float64)
+        undecided = np.ones(n, dtype=bool)
+        degrees = {}
+        for cond, action, groups, threshold in self.rules:
+            if not groups:
+                continue
+            strength = np.zeros(n, dtype=np.float64)
+            for clauses in groups:
+                group_strength = np.ones(n, dtype=np.float64)
+                for attr, term, negate in clauses:
+                    key = (attr, term)
+                    if key not in degrees:
+                        col = float_column(columns, attr, n)
+                        degrees[key] = (membership_array(col, self._term(attr, term)), ~np.isnan(col))
+                    mu, present = degrees[key]
+                    if negate:
+                        mu = np.where(present, 1.0 - mu, 0.0)
+                    group_strength = np.minimum(group_strength, mu)
+                strength = np.maximum(strength, group_strength)
+            hit = (strength > threshold) & undecided
+            actions[hit] = action or "warn"
+            strengths[hit] = strength[hit]
+            undecided &= ~hit
+            if not undecided.any():
+                break
+        return actions, strengths
+
@@ -1,40 +1,325 @@
+import functools
+import json
 import logging
+import math
+import os
+
 import numpy as np
-from sklearn.linear_model import LogisticRegression
 
-class MLRuleMemory:
+from memory.rule_expr import DEFAULT_ALIASES, to_columns, float_column
+
+CRITICAL_PROBA = 0.8
+DECISION_PROBA = 0.5
+
+# Pre-trained demo model shipped as coefficients; refit (needs sklearn) only if missing
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "temperature_demo.json")
+
+
+class LogisticModel:
+    """
+    Fitted binary logistic regression kept as plain coefficients, so it can be
+    stored as a small JSON artifact and scored without importing sklearn.
+    """
+
+    kind = "LogisticRegression"
+
+    def __init__(self, coef, intercept, classes=(0, 1)):
+        self.coef_ = np.asarray(coef, dtype=np.float64).reshape(1, -1)
+        self.intercept_ = np.array([float(intercept)])
+        self.classes_ = np.asarray(classes)
+
+    def predict_proba(self, X):
+        z = np.asarray(X, dtype=np.float64) @ self.coef_[0] + self.intercept_[0]
+        with np.errstate(over="ignore"):
+            p = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= DECISION_PROBA).astype(int)]
+
+    @classmethod
+    def from_estimator(cls, model):
+        return cls(model.coef_[0], model.intercept_[0], model.classes_.tolist())
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "kind": self.kind,
+                "coef": self.coef_[0].tolist(),
+                "intercept": float(self.intercept_[0]),
+                "classes": self.classes_.tolist(),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+        return cls(spec["coef"], spec["intercept"], spec.get("classes", (0, 1)))
+
+
+def fit_default_temperature_model():
+    # Fake: ML model trained for demo on simple synthetic data (threshold 90 for critical)
+    from sklearn.linear_model import LogisticRegression
+    clf = LogisticRegression()
+    X = np.array([[80], [85], [90], [95], [100]])
+    y = np.array([0, 0, 1, 1, 1])  # 1=critical
+    clf.fit(X, y)
+    return LogisticModel.from_estimator(clf)
+
+
+@functools.lru_cache(maxsize=None)
+def default_temperature_model(path=DEFAULT_MODEL_PATH):
+    """Demo model from its cached artifact; fitted (and the artifact written) only when missing."""
+    try:
+        return LogisticModel.load(path)
+    except (OSError, ValueError, KeyError):
+        pass
+    model = fit_default_temperature_model()
+    try:
+        model.save(path)
+    except OSError as e:
+        logging.getLogger("MLRuleMemory").warning(f"Could not cache default model at {path}: {e}")
+    return model
+
+
+class ModelEntry:
+    __slots__ = ("name", "version", "model", "features", "event_types", "critical", "kind", "_linear")
+
+    def __init__(self, name, version, model, features, event_types=None, critical=CRITICAL_PROBA):
+        self.name = name
+        self.version = str(version)
+        self.model = model
+        self.features = list(features)
+        self.event_types = set(event_types or [])
+        self.kind = getattr(model, "kind", type(model).__name__)
+        self.critical = critical
+        self._linear = _linear_params(model)
+
+    def predict_proba(self, X):
+        """P(critical) for an (n, n_features) array; one call per batch."""
+        if self._linear is not None:
+            coef, intercept = self._linear
+            z = np.asarray(X, dtype=np.float64) @ coef + intercept
+            with np.errstate(over="ignore"):
+                return 1.0 / (1.0 + np.exp(-z))
+        return self.model.predict_proba(X)[:, 1]
+
+    def predict_one(self, x):
+        if self._linear is not None and len(x) == 1:
+            coef, intercept = self._linear
+            z = x[0] * coef[0] + intercept
+            return 1.0 / (1.0 + math.exp(-z)) if z > -700 else 0.0
+        return float(self.predict_proba(np.array([x], dtype=np.float64))[0])
+
+
+def _linear_params(model):
+    """Binary logistic regression can be scored without an sklearn dispatch."""
+    if isinstance(model, LogisticModel) or (
+        type(model).__name__ == "LogisticRegression" and type(model).__module__.startswith("sklearn.")
+        and hasattr(model, "coef_") and len(getattr(model, "classes_", [])) == 2
+    ):
+        return model.coef_[0].astype(np.float64), float(model.intercept_[0])
+    return None
+
+
+class ModelRegistry:
+    """
+    Models keyed by (name, version), plus an event type -> model name map.
+    Models come from joblib files, JSON LogisticModel artifacts, or are registered in-process.
+    """
+
     def __init__(self):
+        self.models = {}
+        self.latest = {}
+        self.by_event_type = {}
+        self.default = None
+        self.logger = logging.getLogger("ModelRegistry")
+
+    def register(self, name, model, version="1", features=("temperature",), event_types=None,
+                 critical=CRITICAL_PROBA, default=False):
+        entry = ModelEntry(name, version, model, features, event_types, critical)
+        self.models[(name, entry.version)] = entry
+        current = self.latest.get(name)
+        if current is None or _version_key(entry.version) >= _version_key(current):
+            self.latest[name] = entry.version
+        for event_type in entry.event_types:
+            self.by_event_type[event_type] = name
+        if default or self.default is None:
+            self.default = name
+        return entry
+
+    def load(self, name, path, version="1", **kwargs):
+        if path.endswith(".json"):
+            model = LogisticModel.load(path)
+        else:
+            import joblib
+            model = joblib.load(path, mmap_mode="r")
+        self.logger.info(f"Loaded model {name}@{version} from {path}")
+        return self.register(name, model, version, **kwargs)
+
+    def get(self, name, version=None):
+        version = version or self.latest.get(name)
+        return self.models.get((name, str(version))) if version is not None else None
+
+    def for_event_type(self, event_type):
+        name = self.by_event_type.get(event_type, self.default)
+        return self.get(name) if name else None
+
+
+def _version_key(version):
+    return tuple(int(p) if p.isdigit() else p for p in str(version).split("."))
+
+
+class MLRuleMemory:
+    def __init__(self, registry=None, model_dir=None):
         self.logger = logging.getLogger("MLRuleMemory")
-        # Fake: ML model trained for demo
-        self.temp_clf = LogisticRegression()
-        # Fit on simple synthetic data (threshold 90 for critical)
-        X = np.array([[80], [85], [90], [95], [100]])
-        y = np.array([0, 0, 1, 1, 1])  # 1=critical
-        try:
-            self.temp_clf.fit(X, y)
-        except Exception:
-            pass
+        self.registry = registry or ModelRegistry()
+        # Model files the LLM config may name must live here (joblib.load runs code)
+        self.model_dir = model_dir or os.getenv("ML_MODEL_DIR")
+        if not self.registry.models:
+            try:
+                self.registry.register(
+                    "temperature", default_temperature_model(), version="demo",
+                    features=("temperature",), event_types=("temperature", "alert"), default=True
+                )
+            except Exception as e:
+                self.logger.warning(f"Default model unavailable: {e}")
         self.table = None
 
     def ingest(self, config):
-        # Can optionally use config["models"] for more advanced real-world
+        """
+        config["models"]: list of {"name", "version", "path", "features",
+        "event_types", "critical"} (or a dict keyed by name). Entries with a
+        path are loaded (joblib, or .json coefficients) only from inside
+        model_dir (relative paths are resolved against it); others just remap
+        event types to already registered models.
+        """
         self.table = config.get("models") if isinstance(config, dict) and "models" in config else None
+        specs = self.table
+        if isinstance(specs, dict):
+            specs = [dict(spec, name=name) for name, spec in specs.items() if isinstance(spec, dict)]
+        for spec in specs if isinstance(specs, list) else []:
+            if not isinstance(spec, dict) or not spec.get("name"):
+                continue
+            name = spec["name"]
+            version = str(spec.get("version", "1"))
+            features = spec.get("features") or [spec.get("feature", "temperature")]
+            event_types = spec.get("event_types") or ([spec["event_type"]] if spec.get("event_type") else [])
+            path = self._model_path(spec.get("path"))
+            try:
+                if path and os.path.exists(path) and self.registry.get(name, version) is None:
+                    self.registry.load(
+                        name, path, version, features=features, event_types=event_types,
+                        critical=self._critical(spec.get("critical"), name)
+                    )
+                elif self.registry.get(name) is not None:
+                    for event_type in event_types:
+                        self.registry.by_event_type[event_type] = name
+            except Exception as e:
+                self.logger.warning(f"Could not load model {name}@{version}: {e}")
+
+    def _critical(self, critical, name):
+        """P(critical) cut-off from a config value; CRITICAL_PROBA when missing or not a number."""
+        if critical is None:
+            return CRITICAL_PROBA
+        try:
+            return float(critical)
+        except (TypeError, ValueError):
+            self.logger.warning(f"Model {name}: invalid critical {critical!r}, using {CRITICAL_PROBA}")
+            return CRITICAL_PROBA
+
+    def _model_path(self, path):
+        """Real path of a configured model file, or None when it is outside model_dir."""
+        if not path or not isinstance(path, str):
+            return None
+        if not self.model_dir:
+            self.logger.warning(f"Ignoring model path {path}: no model directory configured (ML_MODEL_DIR)")
+            return None
+        root = os.path.realpath(self.model_dir)
+        real = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, real]) != root:
+            self.logger.warning(f"Ignoring model path {path}: outside model directory {root}")
+            return None
+        return real
+
+    @staticmethod
+    def _features(entry, state):
+        values = []
+        for feature in entry.features:
+            val = state.get(feature)
+            if val is None and feature in DEFAULT_ALIASES:
+                val = state.get(DEFAULT_ALIASES[feature])
+            if val is None:
+                return None
+            values.append(val)
+        return values
 
     def decide_action(self, state):
         explanations = []
-        temp = state.get("temperature") or state.get("cpu_temp")
-        if temp is None:
-            explanations.append("[ML] No temperature value in state.")
+        entry = self.registry.for_event_type(state.get("type"))
+        if entry is None:
+            explanations.append("[ML] No model registered.")
+            return None, " | ".join(explanations)
+        x = self._features(entry, state)
+        if x is None:
+            explanations.append(f"[ML] No {'/'.join(entry.features)} value in state.")
             return None, " | ".join(explanations)
-        # Predict with trained model
+        # Prediction is derived from the probability: one model call per event
         try:
-            pred_proba = self.temp_clf.predict_proba(np.array([[temp]]))[0, 1]
-            prediction = self.temp_clf.predict(np.array([[temp]]))[0]
-            explanations.append(f"[ML] LogisticRegression: Temp={temp}, prob={pred_proba:.2f}, pred={'critical' if prediction else 'normal'}")
-            if prediction == 1 and pred_proba > 0.8:
+            pred_proba = entry.predict_one([float(v) for v in x])
+            prediction = pred_proba >= DECISION_PROBA
+            inputs = ", ".join(f"{f}={v}" for f, v in zip(entry.features, x))
+            explanations.append(
+                f"[ML] {entry.kind} {entry.name}@{entry.version}: {inputs}, "
+                f"prob={pred_proba:.2f}, pred={'critical' if prediction else 'normal'}"
+            )
+            if prediction and pred_proba > entry.critical:
                 return "raise_critical", " | ".join(explanations)
-            elif prediction == 1:
+            elif prediction:
                 return "raise_warning", " | ".join(explanations)
         except Exception as e:
             explanations.append(f"[ML] Model error: {e}")
         return None, " | ".join(explanations)
+
+    def attributes(self):
+        """State attributes the registered models read, plus the event type that selects one."""
+        return {"type"} | {feature for entry in self.registry.models.values() for feature in entry.features}
+
+    def decide_action_batch(self, states):
+        """
+        Score a telemetry sweep: `states` is a list of state dicts or a
+        {attribute: array} mapping. Rows are grouped by the model their event
+        type selects and each group is scored with one call. Returns
+        (actions, proba); proba is NaN where unscored.
+        """
+        columns, n = to_columns(states)
+        actions = np.full(n, None, dtype=object)
+        proba = np.full(n, np.nan)
+        types = columns.get("type")
+        if types is None or types.dtype.kind != "O":
+            by_type = {None: np.arange(n)}
+        else:
+            by_type = {event_type: np.flatnonzero(types == event_type) for event_type in set(types.tolist())}
+        groups = {}
+        for event_type, rows in by_type.items():
+            entry = self.registry.for_event_type(event_type)
+            if entry is not None:
+                groups.setdefault((entry.name, entry.version), (entry, []))[1].append(rows)
+        for entry, parts in groups.values():
+            rows = np.sort(np.concatenate(parts))
+            X = np.column_stack([float_column(columns, f, n)[rows] for f in entry.features])
+            ok = ~np.isnan(X).any(axis=1)
+            if not ok.any():
+                continue
+            idx = rows[ok]
+            try:
+                p = entry.predict_proba(X[ok])
+            except Exception as e:
+                self.logger.warning(f"[ML] Batch model error ({entry.name}): {e}")
+                continue
+            proba[idx] = p
+            actions[idx] = np.where(
+                p > entry.critical, "raise_critical", np.where(p >= DECISION_PROBA, "raise_warning", None)
+            )
+        return actions, proba
@@ -1,29 +1,77 @@
-import networkx as nx
+import logging
+
+from agent.lazy import lazy_import
+
+nx = lazy_import("networkx")
+
+# Remediation workflows as ordered step lists; agent.skills.Skills reads them from here
+DEFAULT_SKILLS = {
+    "restart_server": [
+        "Check server status", "Notify user", "Restart", "Log outcome"
+    ],
+    "handle_overheating": [
+        "Check CPU temperature via Redfish",
+        "Increase fan speed",
+        "Notify admin if temperature > 80C",
+        "Throttle CPU or shutdown if temp > 90C",
+        "Log remediation"
+    ]
+}
+
 
 class ProceduralMemory:
+    """
+    Remediation workflows: step lists (`skills`), optional dependency graphs
+    (`graphs`, a workflow without one runs its steps in list order) and the
+    Python code of each step (`code`: a snippet string run with `context`
+    bound to the event, or a callable taking the context). Executed by
+    agent.workflow.WorkflowEngine; `version` changes whenever a workflow does.
+    """
+
     def __init__(self):
-        self.skills = {
-            "restart_server": [
-                "Check server status", "Notify user", "Restart", "Log outcome"
-            ],
-            "handle_overheating": [
-                "Check CPU temperature via Redfish",
-                "Increase fan speed",
-                "Notify admin if temperature > 80C",
-                "Throttle CPU or shutdown if temp > 90C",
-                "Log remediation"
-            ]
-        }
-        self.graphs = {"handle_overheating": nx.DiGraph()}
-        self.graphs["handle_overheating"].add_edge("Check CPU temperature via Redfish", "Increase fan speed")
-        self.graphs["handle_overheating"].add_edge("Increase fan speed", "Notify admin if temperature > 80C")
-        self.graphs["handle_overheating"].add_edge("Notify admin if temperature > 80C", "Throttle CPU or shutdown if temp > 90C")
-        self.graphs["handle_overheating"].add_edge("Throttle CPU or shutdown if temp > 90C", "Log remediation")
+        self.logger = logging.getLogger("ProceduralMemory")
+        self.skills = {name: list(steps) for name, steps in DEFAULT_SKILLS.items()}
+        self.graphs = {}
         self.code = {
             "Increase fan speed": "print(f'Increasing fan speed for {context.get(\"server_id\")}')",
             "Notify admin if temperature > 80C": "print(f'Notifying admin: {context.get(\"server_id\")} overheating!')",
             "Throttle CPU or shutdown if temp > 90C": "print(f'Throttling CPU or shutting down {context.get(\"server_id\")}')"
         }
+        self.version = 0
+
+    def add_workflow(self, name, steps, edges=None, code=None):
+        """
+        Register workflow `name`. Without `edges` the steps run in order;
+        with them, steps not connected by an edge may run concurrently.
+        """
+        self.skills[name] = list(steps)
+        if edges is not None:
+            graph = nx.DiGraph()
+            graph.add_nodes_from(steps)
+            graph.add_edges_from(edges)
+            self.graphs[name] = graph
+        else:
+            self.graphs.pop(name, None)
+        if code:
+            self.code.update(code)
+        self.version += 1
+
+    def set_step_code(self, step, code):
+        self.code[step] = code
+        self.version += 1
+
+    def workflow_graph(self, name):
+        """Dependency graph of workflow `name`: the explicit one, else a chain of its steps."""
+        if name not in self.skills and name not in self.graphs:
+            raise KeyError(name)
+        graph = self.graphs.get(name)
+        if graph is not None:
+            return graph
+        graph = nx.DiGraph()
+        steps = self.skills[name]
+        graph.add_nodes_from(steps)
+        graph.add_edges_from(zip(steps, steps[1:]))
+        return graph
 
     def ingest(self, config):
         pass
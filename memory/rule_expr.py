@@ -0,0 +1,346 @@
+import ast
+import functools
+import operator
+
+from agent.lazy import lazy_import
+
+# Only the column-wise (batch) paths need NumPy; scalar rules never load it
+np = lazy_import("numpy")
+
+# State attribute aliases: a rule written against the key on the left falls
+# back to the key on the right when the state does not carry it.
+DEFAULT_ALIASES = {"temperature": "cpu_temp"}
+
+_BOOL_OPS = {ast.And: all, ast.Or: any}
+_UNARY_OPS = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+
+def _is_sequence(value):
+    # Object arrays hold per-row Python values, so they can repeat strings too
+    return isinstance(value, (str, bytes, list, tuple)) or getattr(value, "dtype", None) is not None and value.dtype.kind == "O"
+
+
+def _multiply(a, b):
+    # Repeating a string or sequence by a large count would exhaust memory
+    if _is_sequence(a) or _is_sequence(b):
+        raise TypeError("rule expressions can only multiply numbers")
+    return a * b
+
+
+def _modulo(a, b):
+    # '%999999999d' % x would build an equally huge string
+    if _is_sequence(a):
+        raise TypeError("rule expressions can only take the modulo of numbers")
+    return a % b
+
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: operator.truediv,
+    ast.Mod: _modulo,
+}
+_CMP_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+class RuleExpressionError(ValueError):
+    pass
+
+
+class CompiledExpression:
+    """
+    A rule condition parsed once into a restricted AST (comparisons, and/or/not,
+    arithmetic, literals and state names only) and turned into closures for
+    per-state and column-wise evaluation.
+    """
+
+    def __init__(self, source, tree):
+        self.source = source
+        self.names = sorted({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)})
+        self._tree = tree
+        self._scalar = _build_scalar(tree.body)
+        self._vector_fn = None
+
+    @property
+    def _vector(self):
+        if self._vector_fn is None:
+            self._vector_fn = _build_vector(self._tree.body)
+        return self._vector_fn
+
+    def evaluate(self, state, aliases=DEFAULT_ALIASES):
+        return bool(self._scalar(_ScalarScope(state, aliases)))
+
+    def evaluate_columns(self, columns, n, aliases=DEFAULT_ALIASES):
+        """
+        Evaluate against {name: np.ndarray} columns of length n. A comparison
+        with a missing (None/NaN) operand is False for that row, so the other
+        side of an `or` can still match, as in evaluate().
+        """
+        resolved = {name: _resolve_column(columns, name, aliases, n) for name in self.names}
+        try:
+            with np.errstate(all="ignore"):
+                result = _truth(self._vector(resolved))
+        except TypeError:
+            # Mixed-type object columns: fall back to row-wise evaluation
+            result = np.zeros(n, dtype=bool)
+            for i in range(n):
+                try:
+                    result[i] = self._scalar(_ScalarScope({k: c[i] for k, c in resolved.items()}, {}))
+                except Exception:
+                    pass
+        return np.array(np.broadcast_to(result, (n,)))
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_expression(source):
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleExpressionError(f"invalid syntax: {e.msg}") from None
+    for node in ast.walk(tree):
+        _check_node(node)
+    return CompiledExpression(source, tree)
+
+
+def _check_node(node):
+    allowed = (
+        ast.Expression, ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Compare,
+        ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple, ast.Set,
+    )
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Mult, ast.Mod)):
+        operands = (node.left, node.right) if isinstance(node.op, ast.Mult) else (node.left,)
+        if any(_is_literal_sequence(o) for o in operands):
+            raise RuleExpressionError("strings and sequences cannot be repeated or formatted")
+    if isinstance(node, allowed):
+        return
+    if type(node) in _BOOL_OPS or type(node) in _UNARY_OPS or type(node) in _BIN_OPS or type(node) in _CMP_OPS:
+        return
+    raise RuleExpressionError(f"disallowed syntax: {type(node).__name__}")
+
+
+def _is_literal_sequence(node):
+    return isinstance(node, (ast.List, ast.Tuple, ast.Set)) or (
+        isinstance(node, ast.Constant) and isinstance(node.value, (str, bytes))
+    )
+
+
+class _Missing:
+    """Value of a state name that is absent, None or NaN: falsy, and any comparison with it is False."""
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "<missing>"
+
+
+MISSING = _Missing()
+
+
+def _is_missing(value):
+    return value is None or value is MISSING or (isinstance(value, float) and value != value)
+
+
+class _ScalarScope:
+    __slots__ = ("state", "aliases")
+
+    def __init__(self, state, aliases):
+        self.state = state
+        self.aliases = aliases
+
+    def lookup(self, name):
+        value = self.state.get(name)
+        if _is_missing(value):
+            alias = self.aliases.get(name)
+            value = self.state.get(alias) if alias is not None else None
+        return MISSING if _is_missing(value) else value
+
+
+def _build_scalar(node):
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda scope: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda scope: scope.lookup(name)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = [_build_scalar(e) for e in node.elts]
+        return lambda scope: [f(scope) for f in items]
+    if isinstance(node, ast.BoolOp):
+        values = [_build_scalar(v) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda scope: all(f(scope) for f in values)
+        return lambda scope: any(f(scope) for f in values)
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPS[type(node.op)]
+        operand = _build_scalar(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda scope: op(operand(scope))
+
+        def unary(scope):
+            value = operand(scope)
+            return MISSING if value is MISSING else op(value)
+        return unary
+    if isinstance(node, ast.BinOp):
+        op = _BIN_OPS[type(node.op)]
+        left, right = _build_scalar(node.left), _build_scalar(node.right)
+
+        def binary(scope):
+            a, b = left(scope), right(scope)
+            return MISSING if a is MISSING or b is MISSING else op(a, b)
+        return binary
+    if isinstance(node, ast.Compare):
+        first = _build_scalar(node.left)
+        chain = [(_CMP_OPS[type(op)], _build_scalar(c)) for op, c in zip(node.ops, node.comparators)]
+
+        def compare(scope):
+            left = first(scope)
+            for op, comp in chain:
+                right = comp(scope)
+                if left is MISSING or right is MISSING or not op(left, right):
+                    return False
+                left = right
+            return True
+        return compare
+    raise RuleExpressionError(f"disallowed syntax: {type(node).__name__}")
+
+
+def _build_vector(node):
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda cols: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda cols: cols[name]
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = [_build_vector(e) for e in node.elts]
+        return lambda cols: [f(cols) for f in items]
+    if isinstance(node, ast.BoolOp):
+        values = [_build_vector(v) for v in node.values]
+        reduce = np.logical_and.reduce if isinstance(node.op, ast.And) else np.logical_or.reduce
+        return lambda cols: reduce([_truth(f(cols)) for f in values])
+    if isinstance(node, ast.UnaryOp):
+        operand = _build_vector(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda cols: np.logical_not(_truth(operand(cols)))
+        op = _UNARY_OPS[type(node.op)]
+        return lambda cols: op(operand(cols))
+    if isinstance(node, ast.BinOp):
+        op = _BIN_OPS[type(node.op)]
+        left, right = _build_vector(node.left), _build_vector(node.right)
+        return lambda cols: op(left(cols), right(cols))
+    if isinstance(node, ast.Compare):
+        first = _build_vector(node.left)
+        chain = [(type(op), _build_vector(c)) for op, c in zip(node.ops, node.comparators)]
+
+        def compare(cols):
+            left = first(cols)
+            result = True
+            for op_type, comp in chain:
+                right = comp(cols)
+                if op_type in (ast.In, ast.NotIn):
+                    if not isinstance(right, list):
+                        raise TypeError("membership test needs a literal list")
+                    hit = np.isin(left, np.asarray(right, dtype=object))
+                    step = hit if op_type is ast.In else ~hit
+                else:
+                    step = _CMP_OPS[op_type](left, right)
+                # A missing operand makes this comparison False (NaN != x would be True)
+                result = np.logical_and(result, step & _valid(left) & _valid(right))
+                left = right
+            return result
+        return compare
+    raise RuleExpressionError(f"disallowed syntax: {type(node).__name__}")
+
+
+def to_columns(states, names=None):
+    """
+    Turn a list of state dicts into {name: np.ndarray}. Numeric columns become
+    float64 with NaN for missing values; anything else stays an object array.
+    With `names`, only those columns are built.
+    """
+    if isinstance(states, dict):
+        columns = {k: np.asarray(v) for k, v in states.items()}
+        n = len(next(iter(columns.values()))) if columns else 0
+        return columns, n
+    states = list(states)
+    n = len(states)
+    if names is None:
+        names = set()
+        for state in states:
+            names.update(state.keys())
+    columns = {}
+    for name in names:
+        values = [state.get(name) for state in states]
+        if all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values):
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        else:
+            columns[name] = np.array(values, dtype=object)
+    return columns, n
+
+
+def float_column(columns, name, n, aliases=DEFAULT_ALIASES):
+    """Numeric column for name (alias-filled), NaN where missing or non-numeric."""
+    col = columns.get(name)
+    col = col.astype(np.float64) if col is not None and col.dtype.kind in "fiu" else None
+    alias = aliases.get(name)
+    alias_col = columns.get(alias) if alias else None
+    if alias_col is not None and alias_col.dtype.kind in "fiu":
+        alias_col = alias_col.astype(np.float64)
+        col = alias_col if col is None else np.where(np.isnan(col), alias_col, col)
+    return col if col is not None else np.full(n, np.nan)
+
+
+def _present(col):
+    if col.dtype.kind == "f":
+        return ~np.isnan(col)
+    if col.dtype.kind == "O":
+        return np.fromiter((v is not None and v == v for v in col), dtype=bool, count=len(col))
+    return np.ones(len(col), dtype=bool)
+
+
+def _valid(value):
+    """Row mask of present values for an operand (constants and literal lists always are)."""
+    return _present(value) if isinstance(value, np.ndarray) and value.ndim else True
+
+
+def _truth(value):
+    """Truthiness of an operand column, with missing values (None/NaN) False."""
+    arr = np.asarray(value)
+    if arr.dtype.kind == "f":
+        return (arr != 0) & ~np.isnan(arr)
+    if arr.dtype.kind == "O":
+        return np.fromiter((not _is_missing(v) and bool(v) for v in arr.ravel()), dtype=bool, count=arr.size).reshape(arr.shape)
+    return arr.astype(bool)
+
+
+def _missing(n):
+    return np.full(n, np.nan)
+
+
+def _resolve_column(columns, name, aliases, n):
+    col = columns.get(name)
+    alias = aliases.get(name)
+    alias_col = columns.get(alias) if alias is not None else None
+    if col is None:
+        return alias_col if alias_col is not None else _missing(n)
+    if alias_col is None:
+        return col
+    present = _present(col)
+    if present.all():
+        return col
+    if col.dtype.kind == "f" and alias_col.dtype.kind == "f":
+        return np.where(present, col, alias_col)
+    return np.where(present, col.astype(object), alias_col.astype(object))
@@ -0,0 +1,268 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from memory.rule_expr import DEFAULT_ALIASES
+
+# Numeric event fields recorded as metrics
+DEFAULT_METRICS = ("temperature", "cpu_temp", "fan_rpm", "value")
+
+# Feature windows: suffix -> seconds
+DEFAULT_WINDOWS = {"1m": 60, "5m": 300}
+
+
+def event_time(event):
+    ts = event.get("timestamp")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, str):
+        try:
+            return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+class _Window:
+    """Running aggregates over one time window, for every series row."""
+
+    ARRAYS = ("start", "n", "sv", "st", "stt", "stv", "dq", "dq_head", "dq_len")
+    __slots__ = ("seconds",) + ARRAYS
+
+    def __init__(self, seconds, rows, capacity):
+        self.seconds = seconds
+        self.start = np.zeros(rows, dtype=np.int32)
+        self.n = np.zeros(rows, dtype=np.int32)
+        self.sv = np.zeros(rows)
+        self.st = np.zeros(rows)
+        self.stt = np.zeros(rows)
+        self.stv = np.zeros(rows)
+        # Monotonic deque of ring positions (decreasing values) for the window max
+        self.dq = np.zeros((rows, capacity), dtype=np.int32)
+        self.dq_head = np.zeros(rows, dtype=np.int32)
+        self.dq_len = np.zeros(rows, dtype=np.int32)
+
+    def grow(self, rows):
+        for name in ("start", "n", "sv", "st", "stt", "stv", "dq_head", "dq_len"):
+            arr = getattr(self, name)
+            setattr(self, name, np.concatenate([arr, np.zeros(rows - len(arr), dtype=arr.dtype)]))
+        self.dq = np.concatenate([self.dq, np.zeros((rows - len(self.dq), self.dq.shape[1]), dtype=np.int32)])
+
+
+class TimeSeriesMemory:
+    """
+    Per (server_id, component, metric) ring buffers of (time, value) in
+    preallocated NumPy arrays: fixed memory per series, rows grow by doubling.
+    Each window keeps running sums and a monotonic max-deque, so mean, max,
+    slope and rate-of-change are O(1) per insert and per read.
+
+    Features are exposed as '<metric>_<feature>_<window>' state attributes,
+    e.g. temperature_slope_5m (slope and rate are per second).
+    """
+
+    ARRAYS = ("t", "v", "t0", "head", "count")
+
+    def __init__(self, capacity=64, windows=None, metrics=DEFAULT_METRICS, initial_series=1024):
+        self.capacity = capacity
+        self.metrics = tuple(metrics)
+        self.logger = logging.getLogger("TimeSeriesMemory")
+        self.series = {}  # (server_id, component) -> {metric: row}
+        self.rows = 0
+        self.samples = 0  # appends so far; changes whenever the buffers do
+        self._lock = threading.Lock()
+        self._alloc(initial_series)
+        self.windows = {
+            name: _Window(seconds, initial_series, capacity)
+            for name, seconds in (windows or DEFAULT_WINDOWS).items()
+        }
+
+    def _alloc(self, rows):
+        # Times are float32 seconds relative to the series' first sample (t0)
+        self.t = np.zeros((rows, self.capacity), dtype=np.float32)
+        self.v = np.zeros((rows, self.capacity), dtype=np.float32)
+        self.t0 = np.zeros(rows)
+        self.head = np.zeros(rows, dtype=np.int32)
+        self.count = np.zeros(rows, dtype=np.int32)
+
+    def _grow(self):
+        rows = len(self.t0) * 2
+        old = (self.t, self.v, self.t0, self.head, self.count)
+        self._alloc(rows)
+        n = len(old[2])
+        self.t[:n], self.v[:n], self.t0[:n], self.head[:n], self.count[:n] = old
+        for window in self.windows.values():
+            window.grow(rows)
+
+    def _row(self, server_id, component, metric):
+        by_metric = self.series.setdefault((server_id, component), {})
+        row = by_metric.get(metric)
+        if row is None:
+            if self.rows == len(self.t0):
+                self._grow()
+            row = by_metric[metric] = self.rows
+            self.rows += 1
+        return row
+
+    def record(self, event):
+        """Record every numeric metric carried by a normalized event."""
+        ts = None
+        for metric in self.metrics:
+            val = event.get(metric)
+            if isinstance(val, bool) or not isinstance(val, (int, float)):
+                continue
+            if ts is None:
+                ts = event_time(event)
+            self.append(event.get("server_id"), event.get("component"), metric, ts, float(val))
+
+    def append(self, server_id, component, metric, ts, value):
+        with self._lock:
+            self._append(server_id, component, metric, ts, value)
+            self.samples += 1
+
+    def _append(self, server_id, component, metric, ts, value):
+        row = self._row(server_id, component, metric)
+        cap = self.capacity
+        count = int(self.count[row])
+        if count == 0:
+            self.t0[row] = ts
+        pos = int(self.head[row])
+        t = max(ts - self.t0[row], float(self.t[row, (pos - 1) % cap]) if count else 0.0)
+        if count == cap:
+            # Overwriting the oldest sample: drop it from any window still holding it
+            for window in self.windows.values():
+                if window.n[row] and window.start[row] == pos:
+                    self._evict(window, row)
+        self.t[row, pos] = t
+        self.v[row, pos] = value
+        self.head[row] = (pos + 1) % cap
+        self.count[row] = min(count + 1, cap)
+        t = float(self.t[row, pos])
+        value = float(self.v[row, pos])
+        for window in self.windows.values():
+            if window.n[row] == 0:
+                window.start[row] = pos
+            window.n[row] += 1
+            window.sv[row] += value
+            window.st[row] += t
+            window.stt[row] += t * t
+            window.stv[row] += t * value
+            # Max deque: drop tail entries that can never be the max again
+            dq, head, length = window.dq[row], int(window.dq_head[row]), int(window.dq_len[row])
+            while length and self.v[row, dq[(head + length - 1) % cap]] <= value:
+                length -= 1
+            dq[(head + length) % cap] = pos
+            window.dq_len[row] = length + 1
+            while window.n[row] > 1 and self.t[row, window.start[row]] < t - window.seconds:
+                self._evict(window, row)
+
+    def _evict(self, window, row):
+        cap = self.capacity
+        pos = int(window.start[row])
+        t = float(self.t[row, pos])
+        value = float(self.v[row, pos])
+        window.sv[row] -= value
+        window.st[row] -= t
+        window.stt[row] -= t * t
+        window.stv[row] -= t * value
+        window.n[row] -= 1
+        window.start[row] = (pos + 1) % cap
+        if window.dq_len[row] and window.dq[row, window.dq_head[row]] == pos:
+            window.dq_head[row] = (window.dq_head[row] + 1) % cap
+            window.dq_len[row] -= 1
+
+    def window_stats(self, row, name):
+        window = self.windows[name]
+        n = int(window.n[row])
+        if n == 0:
+            return None
+        cap = self.capacity
+        last = (int(self.head[row]) - 1) % cap
+        first = int(window.start[row])
+        sv, st = window.sv[row], window.st[row]
+        denom = n * window.stt[row] - st * st
+        span = float(self.t[row, last] - self.t[row, first])
+        return {
+            "mean": float(sv / n),
+            "max": float(self.v[row, window.dq[row, window.dq_head[row]]]),
+            "slope": float((n * window.stv[row] - st * sv) / denom) if n > 1 and denom > 1e-9 else 0.0,
+            "rate": float(self.v[row, last] - self.v[row, first]) / span if span > 0 else 0.0,
+            "count": n,
+        }
+
+    def features(self, event):
+        """Rolling features for the event's (server_id, component) as flat state attributes."""
+        by_metric = self.series.get((event.get("server_id"), event.get("component")))
+        if not by_metric:
+            return {}
+        features = {}
+        for metric, row in by_metric.items():
+            names = [metric] + ([DEFAULT_ALIASES[metric]] if metric in DEFAULT_ALIASES else [])
+            for window_name in self.windows:
+                stats = self.window_stats(row, window_name)
+                if stats is None:
+                    continue
+                for feature, val in stats.items():
+                    for name in names:
+                        features.setdefault(f"{name}_{feature}_{window_name}", val)
+        return features
+
+    def history(self, server_id, component, metric):
+        """(timestamps, values) arrays for one series, oldest first."""
+        row = self.series.get((server_id, component), {}).get(metric)
+        if row is None:
+            return np.array([]), np.array([])
+        count, head = int(self.count[row]), int(self.head[row])
+        order = (np.arange(count) + (head - count)) % self.capacity
+        return self.t[row, order].astype(np.float64) + self.t0[row], self.v[row, order].astype(np.float64)
+
+    def memory_bytes(self):
+        total = self.t.nbytes + self.v.nbytes + self.t0.nbytes + self.head.nbytes + self.count.nbytes
+        for window in self.windows.values():
+            total += sum(getattr(window, name).nbytes for name in _Window.ARRAYS)
+        return total
+
+    def save(self, path):
+        """Write the buffers to directory `path`: one .npy per array plus series.pkl."""
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            arrays = {name: getattr(self, name).copy() for name in self.ARRAYS}
+            for window_name, window in self.windows.items():
+                for name in _Window.ARRAYS:
+                    arrays[f"{window_name}.{name}"] = getattr(window, name).copy()
+            meta = {
+                "capacity": self.capacity,
+                "metrics": self.metrics,
+                "windows": {name: window.seconds for name, window in self.windows.items()},
+                "series": {key: dict(rows) for key, rows in self.series.items()},
+                "rows": self.rows,
+                "samples": self.samples,
+            }
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), arr)
+        with open(os.path.join(path, "series.pkl"), "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a saved store; mmap=True maps the arrays copy-on-write, so pages
+        are read on first touch and new samples never write back to the files.
+        """
+        with open(os.path.join(path, "series.pkl"), "rb") as f:
+            meta = pickle.load(f)
+        store = cls(capacity=meta["capacity"], windows=meta["windows"], metrics=meta["metrics"], initial_series=1)
+        mode = "c" if mmap else None
+        for name in cls.ARRAYS:
+            setattr(store, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode))
+        for window_name, window in store.windows.items():
+            for name in _Window.ARRAYS:
+                setattr(window, name, np.load(os.path.join(path, f"{window_name}.{name}.npy"), mmap_mode=mode))
+        store.series = meta["series"]
+        store.rows = meta["rows"]
+        store.samples = meta["samples"]
+        return store
@@ -1,20 +1,184 @@
+import json
+import logging
+import os
+
 import numpy as np
 import faiss
 
+# Index kinds accepted by VectorStoreMemory(index=...); anything else is passed
+# to faiss.index_factory as-is (e.g. "IVF4096,PQ32").
+INDEX_FACTORY = {
+    "flat": "Flat",
+    "ivfpq": "IVF{nlist},PQ{m}",
+    "hnsw": "HNSW{hnsw_m},Flat",
+}
+
+
 class VectorStoreMemory:
-    def __init__(self, dim=128):
-        self.index = faiss.IndexFlatL2(dim)
-        self.metadata = []
+    """
+    Vector memory with id-mapped metadata. Trainable indexes (IVF-PQ) buffer
+    vectors until train_threshold are available, then train once and flush.
+    """
+
+    def __init__(self, dim=128, index="flat", nlist=1024, m=16, hnsw_m=32, train_threshold=None, nprobe=16):
         self.vector_dim = dim
+        self.index_kind = index
+        self.logger = logging.getLogger("VectorStoreMemory")
+        spec = INDEX_FACTORY.get(index, index).format(nlist=nlist, m=m, hnsw_m=hnsw_m)
+        self.index = faiss.IndexIDMap2(faiss.index_factory(dim, spec))
+        self.nprobe = nprobe
+        self.train_threshold = 0 if self.index.is_trained else (train_threshold or 39 * nlist)
+        self.metadata = {}
+        self.next_id = 0
+        self._pending = []  # (ids, vectors) waiting for training
+        self._mmap_path = None
 
     def ingest(self, config):
         vectors = config.get("embedding") or config.get("vectors")
+        embeddings = []
+        metas = []
         if isinstance(vectors, list) and vectors and isinstance(vectors[0], dict) and "vector" in vectors[0]:
             for vobj in vectors:
-                embedding = np.array(vobj["vector"], dtype=np.float32).reshape(1, -1)
-                if embedding.shape[1] == self.vector_dim:
-                    self.index.add(embedding)
-        elif isinstance(vectors, list) and all(isinstance(x, (float, int)) for x in vectors):
-            embedding = np.array(vectors, dtype=np.float32).reshape(1, -1)
-            if embedding.shape[1] == self.vector_dim:
-                self.index.add(embedding)
+                if isinstance(vobj, dict) and len(vobj.get("vector") or []) == self.vector_dim:
+                    embeddings.append(vobj["vector"])
+                    metas.append(vobj.get("metadata") or {k: v for k, v in vobj.items() if k != "vector"})
+        elif isinstance(vectors, list) and vectors and all(isinstance(x, (float, int)) for x in vectors):
+            if len(vectors) == self.vector_dim:
+                embeddings.append(vectors)
+                metas.append(config.get("metadata") or {})
+        if embeddings:
+            self.add(np.array(embeddings, dtype=np.float32), metas)
+
+    def add(self, vectors, metadata=None):
+        """Add an (n, dim) array in one call; returns the assigned ids."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        ids = np.arange(self.next_id, self.next_id + len(vectors), dtype=np.int64)
+        self.next_id += len(vectors)
+        for i, meta in zip(ids, metadata or [{}] * len(vectors)):
+            self.metadata[int(i)] = meta
+        if self._mmap_path is not None:
+            # Memory-mapped indexes are read-only; pull it into RAM on first write
+            self.index = faiss.read_index(self._mmap_path)
+            self._mmap_path = None
+        if self.index.is_trained:
+            self.index.add_with_ids(vectors, ids)
+        else:
+            self._pending.append((ids, vectors))
+            if sum(len(v) for _, v in self._pending) >= self.train_threshold:
+                self.train()
+        return ids
+
+    def train(self):
+        """Train on the buffered vectors and flush them into the index."""
+        if self.index.is_trained or not self._pending:
+            return
+        ids = np.concatenate([i for i, _ in self._pending])
+        vectors = np.concatenate([v for _, v in self._pending])
+        self.logger.info(f"Training {self.index_kind} index on {len(vectors)} vectors")
+        self.index.train(vectors)
+        self.index.add_with_ids(vectors, ids)
+        self._pending = []
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal + sum(len(v) for _, v in self._pending)
+
+    def search(self, vector, k=5, filter=None):
+        """
+        k nearest neighbours of `vector` as [(id, distance, metadata)].
+        `filter` is a metadata dict to match exactly, or a callable(metadata) -> bool;
+        filtered searches over-fetch and widen until k hits or the index is exhausted.
+        """
+        query = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, self.vector_dim)
+        if self.index.ntotal == 0:
+            return self._search_pending(query, k, filter)
+        self._set_nprobe()
+        if filter is not None and not callable(filter):
+            wanted = filter
+            filter = lambda meta: all(meta.get(key) == val for key, val in wanted.items())
+        fetch = k if filter is None else k * 4
+        while True:
+            fetch = min(fetch, self.index.ntotal)
+            distances, ids = self.index.search(query, fetch)
+            results = []
+            for dist, idx in zip(distances[0], ids[0]):
+                if idx < 0:
+                    continue
+                meta = self.metadata.get(int(idx), {})
+                if filter is None or filter(meta):
+                    results.append((int(idx), float(dist), meta))
+                    if len(results) == k:
+                        return results
+            if fetch >= self.index.ntotal:
+                return results
+            fetch *= 4
+
+    def _search_pending(self, query, k, filter):
+        # Untrained index: exact scan over the buffered vectors
+        if not self._pending:
+            return []
+        ids = np.concatenate([i for i, _ in self._pending])
+        vectors = np.concatenate([v for _, v in self._pending])
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        results = []
+        for pos in np.argsort(distances):
+            meta = self.metadata.get(int(ids[pos]), {})
+            if filter is None or (filter(meta) if callable(filter) else all(meta.get(a) == b for a, b in filter.items())):
+                results.append((int(ids[pos]), float(distances[pos]), meta))
+                if len(results) == k:
+                    break
+        return results
+
+    def _set_nprobe(self):
+        ivf = faiss.try_extract_index_ivf(self.index.index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+
+    def save(self, path):
+        """Write the faiss index to `path` and metadata to `path + '.meta.json'`."""
+        faiss.write_index(self.index, path)
+        with open(path + ".meta.json", "w") as f:
+            json.dump({
+                "dim": self.vector_dim,
+                "index": self.index_kind,
+                "next_id": self.next_id,
+                "train_threshold": self.train_threshold,
+                "nprobe": self.nprobe,
+                "metadata": self.metadata,
+                "pending": [[i.tolist(), v.tolist()] for i, v in self._pending],
+            }, f, default=str)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a saved store; mmap=True memory-maps the index instead of reading it into RAM."""
+        with open(path + ".meta.json") as f:
+            meta = json.load(f)
+        store = cls.__new__(cls)
+        store.vector_dim = meta["dim"]
+        store.index_kind = meta["index"]
+        store.logger = logging.getLogger("VectorStoreMemory")
+        store.nprobe = meta.get("nprobe", 16)
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        store._mmap_path = path if mmap else None
+        try:
+            store.index = faiss.read_index(path, flags)
+        except RuntimeError:
+            # Not every index type supports mmap; fall back to a regular read
+            store.index = faiss.read_index(path)
+            store._mmap_path = None
+        store.metadata = {int(k): v for k, v in meta["metadata"].items()}
+        store.next_id = meta["next_id"]
+        store._pending = [
+            (np.array(i, dtype=np.int64), np.array(v, dtype=np.float32)) for i, v in meta.get("pending", [])
+        ]
+        store.train_threshold = 0 if store.index.is_trained else meta.get("train_threshold") or store._default_threshold()
+        return store
+
+    def _default_threshold(self):
+        # Stores saved before train_threshold was recorded: the constructor default
+        ivf = faiss.try_extract_index_ivf(self.index.index)
+        return 39 * ivf.nlist if ivf is not None else max(len(self._pending), 1)
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(path) and os.path.exists(path + ".meta.json")
@@ -1,8 +1,90 @@
 # memory/working_mem.py
+import threading
+import time
+from collections import ChainMap, OrderedDict
+from collections.abc import Mapping
+
+_MISSING = object()
+
+
+class ServerState(Mapping):
+    """
+    Compact, read-only state record for one server: known Redfish fields live
+    in slots, anything else the LLM supplies goes to `extra`. Records are never
+    mutated after they are published, so readers can hold them without copying.
+    """
+
+    FIELDS = (
+        "server_id", "type", "timestamp", "severity", "message",
+        "component", "value", "temperature", "fan_rpm", "status",
+    )
+    __slots__ = FIELDS + ("extra", "updated")
+
+    def __init__(self, values):
+        extra = {}
+        for field in self.FIELDS:
+            object.__setattr__(self, field, _MISSING)
+        for k, v in values.items():
+            if k in self.FIELDS:
+                object.__setattr__(self, k, v)
+            else:
+                extra[k] = v
+        object.__setattr__(self, "extra", extra)
+        object.__setattr__(self, "updated", time.monotonic())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ServerState is read-only")
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            val = getattr(self, key)
+            if val is _MISSING:
+                raise KeyError(key)
+            return val
+        return self.extra[key]
+
+    def __contains__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key) is not _MISSING
+        return key in self.extra
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        yield from self.extra
+
+    def __len__(self):
+        return sum(1 for field in self.FIELDS if getattr(self, field) is not _MISSING) + len(self.extra)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+EMPTY_STATE = ServerState({})
+
 
 class WorkingMemory:
-    def __init__(self):
-        self.state = {}
+    """
+    Working state sharded by server_id. Each server holds one ServerState;
+    the least recently used servers are evicted past `max_servers`, and
+    servers idle for more than `idle_ttl` seconds are dropped.
+    """
+
+    def __init__(self, max_servers=10000, idle_ttl=3600.0):
+        self.max_servers = max_servers
+        self.idle_ttl = idle_ttl
+        self.shards = OrderedDict()  # server_id -> ServerState
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @property
+    def state(self):
+        # Most recently updated server's state (single-server callers)
+        with self._lock:
+            if not self.shards:
+                return {}
+            return dict(next(reversed(self.shards.values())))
 
     def ingest(self, config, event=None):
         """
@@ -30,14 +112,55 @@ class WorkingMemory:
             for k, v in event.items():
                 if k not in state:
                     state[k] = v
-        self.state = state
+        server_id = (event or {}).get("server_id", state.get("server_id"))
+        record = ServerState(state)
+        with self._lock:
+            self.shards[server_id] = record
+            self.shards.move_to_end(server_id)
+            self._evict(record.updated)
+
+    def _evict(self, now):
+        while len(self.shards) > self.max_servers:
+            self.shards.popitem(last=False)
+            self.evictions += 1
+        if self.idle_ttl is not None:
+            while self.shards:
+                oldest = next(iter(self.shards.values()))
+                if now - oldest.updated <= self.idle_ttl:
+                    break
+                self.shards.popitem(last=False)
+                self.evictions += 1
+
+    def get_record(self, server_id):
+        with self._lock:
+            record = self.shards.get(server_id)
+            if record is not None:
+                self.shards.move_to_end(server_id)
+            return record or EMPTY_STATE
 
     def get_state(self, event=None):
-        # Return latest state, merge with event if present
+        """
+        Read view of the event layered over its server's state (the current
+        reading wins, state fills gaps). Nothing is copied: writes to the view
+        land in its own top-level dict and never touch the shared record.
+        """
+        record = self.get_record((event or {}).get("server_id"))
         if not event:
-            return dict(self.state)
-        merged = dict(self.state)
-        for k, v in event.items():
-            if k not in merged:
-                merged[k] = v
-        return merged
+            return ChainMap({}, record)
+        return ChainMap({}, event, record)
+
+    def export_states(self):
+        """[(server_id, state dict)], least recently updated first (for checkpoints)."""
+        with self._lock:
+            return [(server_id, dict(record)) for server_id, record in self.shards.items()]
+
+    def import_states(self, states):
+        """Load export_states() output; restored servers count as just updated."""
+        with self._lock:
+            for server_id, values in states:
+                self.shards[server_id] = ServerState(values)
+                self.shards.move_to_end(server_id)
+            self._evict(time.monotonic())
+
+    def __len__(self):
+        return len(self.shards)
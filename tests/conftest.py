@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# Tests run from a plain checkout: make the top-level packages importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    """AgentCore factory with an in-memory audit trail and no checkpointing from the environment."""
+    monkeypatch.delenv("CHECKPOINT_DIR", raising=False)
+    monkeypatch.delenv("LLM_SERVER_URLS", raising=False)
+    from agent.core import AgentCore
+    from memory.audit import AuditMemory
+    agents = []
+
+    def make(**kwargs):
+        kwargs.setdefault("api_key", "test")
+        kwargs.setdefault("audit", AuditMemory(db_path=":memory:"))
+        agent = AgentCore(**kwargs)
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        if agent.checkpoints is not None:
+            agent.checkpoints.stop(final=False)
@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+PAYLOAD = {
+    "Id": "s1",
+    "Events": [
+        {"EventType": "Alert", "Message": f"PSU{i} failure", "MessageArgs": [f"PSU{i}", i]}
+        for i in range(6)
+    ],
+}
+
+
+class _AsyncClient:
+    """Fake async chat client that tracks how many requests are in flight at once."""
+
+    def __init__(self, answer):
+        self.chat = self
+        self.completions = self
+        self.answer = answer
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        message = type("Message", (), {"content": json.dumps(self.answer(request))})
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+
+def test_payload_events_are_dispatched_concurrently_within_the_limit(make_agent):
+    agent = make_agent(llm_concurrency=2)
+    agent._async_openai_client = client = _AsyncClient(lambda request: {})
+    results = asyncio.run(agent.process_event_async("redfish", PAYLOAD))
+    assert len(results) == 6
+    assert client.calls == 6
+    assert client.max_in_flight == 2
+
+
+def test_batched_dispatch_packs_events_into_one_prompt(make_agent):
+    agent = make_agent()
+    rules = {"rules": [{"condition": "value >= 0", "action": "raise_critical"}]}
+    agent._async_openai_client = client = _AsyncClient(
+        lambda request: {str(i): {"classic_rules": rules} for i in range(3)}
+    )
+    results = asyncio.run(agent.process_event_async("redfish", PAYLOAD, batch_size=3))
+    assert client.calls == 2
+    assert [action for action, _ in results] == ["raise_critical"] * 6
@@ -0,0 +1,122 @@
+import gc
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+from memory.audit import AuditMemory
+
+pytest.importorskip("pandas")
+
+
+def _audit(path, rows=25):
+    audit = AuditMemory(db_path=path)
+    for i in range(rows):
+        audit.log_decision("monitor", "test", {"server_id": f"s{i % 3}", "component": "CPU1"})
+    return audit
+
+
+class _Connection(sqlite3.Connection):
+    closed = False
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+def _tracking_connect():
+    opened = []
+    real = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        conn = real(*args, factory=_Connection, **kwargs)
+        opened.append(conn)
+        return conn
+    return opened, connect
+
+
+@pytest.mark.parametrize("abandon", [False, True])
+def test_chunked_dataframe_closes_its_connection(tmp_path, abandon):
+    audit = _audit(str(tmp_path / "audit.db"))
+    opened, connect = _tracking_connect()
+    with mock.patch("memory.audit.sqlite3.connect", connect):
+        chunks = audit.to_dataframe(chunksize=10)
+        if abandon:
+            next(chunks)
+            del chunks
+            gc.collect()
+        else:
+            assert [len(c) for c in chunks] == [10, 10, 5]
+    assert len(opened) == 1 and opened[0].closed
+    audit.close()
+
+
+def test_in_memory_chunks_read_the_shared_connection():
+    audit = _audit(":memory:")
+    assert sum(len(c) for c in audit.to_dataframe(chunksize=10, server_id="s0")) == 9
+    assert len(audit.to_dataframe()) == 25
+
+
+def test_logging_while_iterating_in_memory_chunks_does_not_deadlock():
+    audit = _audit(":memory:")
+    seen = []
+
+    def consume():
+        for chunk in audit.to_dataframe(chunksize=10):
+            seen.append(len(chunk))
+            audit.log_decision("monitor", "during export", {"server_id": "s9"})
+
+    worker = threading.Thread(target=consume, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert sum(seen) >= 25
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_legacy_rows_are_backfilled_in_their_own_timezone(tmp_path, new_york):
+    path = str(tmp_path / "legacy.db")
+    local = datetime(2024, 3, 1, 12, 0, 0)
+    aware = datetime(2024, 3, 1, 12, 0, 0, tzinfo=timezone(timedelta(hours=2)))
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE audit (decision TEXT, reason TEXT, event TEXT, timestamp TEXT)")
+    conn.executemany("INSERT INTO audit VALUES ('monitor', 'legacy', '', ?)",
+                     [(local.isoformat(),), (aware.isoformat(),), ("not a time",)])
+    conn.commit()
+    conn.close()
+    audit = AuditMemory(db_path=path)
+    rows, _ = audit.query(limit=10)
+    by_stamp = {r["timestamp"]: r["ts"] for r in rows}
+    assert by_stamp[local.isoformat()] == local.timestamp()
+    assert by_stamp[aware.isoformat()] == aware.timestamp()
+    assert by_stamp["not a time"] is None
+    audit.close()
+
+
+def test_write_behind_batches_rows_and_flushes_on_close(tmp_path):
+    path = str(tmp_path / "audit.db")
+    audit = AuditMemory(db_path=path, write_behind=True, batch_size=50, flush_interval=0.05)
+    for i in range(120):
+        audit.log_decision("monitor", "queued", {"server_id": f"s{i % 4}"})
+    assert audit.flush(timeout=5)
+    assert audit.metrics()["rows_written"] == 120
+    assert audit.metrics()["batches_written"] < 120
+    audit.log_decision("alert", "last one", {"server_id": "s0"})
+    audit.close()
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT COUNT(*) FROM audit").fetchone()[0] == 121
+    conn.close()
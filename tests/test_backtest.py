@@ -0,0 +1,60 @@
+import io
+import json
+
+import pytest
+
+from agent.backtest import Backtester
+from memory.audit import AuditMemory
+
+pytest.importorskip("numpy")
+
+SNAPSHOT = {"classic_rules": {"rules": [{"condition": "temperature > 85", "action": "raise_critical"}]}}
+
+
+def _event(i, temperature):
+    return {"server_id": f"s{i % 3}", "type": "temperature", "component": "CPU1", "temperature": temperature}
+
+
+def _lines():
+    lines = []
+    for i in range(30):
+        temperature = 90 if i % 5 == 0 else 60
+        # Audit-row shape with the event as JSON text, and bare events with their own decision
+        if i % 2:
+            lines.append({"decision": "monitor", "event": json.dumps(_event(i, temperature))})
+        else:
+            lines.append(dict(_event(i, temperature), decision="monitor"))
+    return "".join(json.dumps(line) + "\n" for line in lines) + "not json\n"
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_jsonl_replay_reports_decisions_and_changes(workers):
+    report = Backtester(SNAPSHOT, batch_size=7, workers=workers).run_jsonl(io.StringIO(_lines()))
+    assert report["events"] == 30
+    assert report["decisions"] == {"monitor": 24, "raise_critical": 6}
+    assert report["sources"] == {"default": 24, "classic": 6}
+    assert report["recorded"] == 30 and report["changed"] == 6
+    assert report["changes"] == [{"recorded": "monitor", "replayed": "raise_critical", "count": 6}]
+
+
+def test_audit_replay_uses_only_rule_decisions(tmp_path):
+    path = str(tmp_path / "audit.db")
+    audit = AuditMemory(db_path=path)
+    for i in range(10):
+        audit.log_decision("raise_critical", "rule", _event(i, 95 if i < 4 else 50), source="classic")
+    audit.log_decision("step_ok", "workflow", _event(0, 99), source="workflow")
+    audit.close()
+    report = Backtester(SNAPSHOT).run_audit(path)
+    assert report["events"] == 10
+    assert report["decisions"] == {"monitor": 6, "raise_critical": 4}
+    assert report["change_rate"] == pytest.approx(0.6)
+    assert Backtester(SNAPSHOT).run_audit(path, server_id="s1")["events"] == 3
+
+
+def test_snapshot_from_agent_replays_its_loaded_rules(make_agent):
+    agent = make_agent()
+    agent.classic_rules.ingest(SNAPSHOT["classic_rules"])
+    backtester = Backtester.from_agent(agent, rule_engines=["classic"])
+    actions, sources = backtester.decide_batch([_event(0, 90), _event(1, 20)])
+    assert actions.tolist() == ["raise_critical", "monitor"]
+    assert sources.tolist() == ["classic", "default"]
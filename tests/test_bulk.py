@@ -0,0 +1,47 @@
+import io
+import json
+
+import pytest
+
+from events.bulk import iter_events, iter_ndjson
+from events.redfish import RedfishEventProcessor
+
+
+def _payload(server, count):
+    return {
+        "Id": server,
+        "Events": [{"EventType": "Alert", "Message": "PSU failure", "MessageArgs": ["PSU1", i]} for i in range(count)],
+    }
+
+
+def _ndjson(payloads):
+    return "\n".join(json.dumps(p) for p in payloads) + "\n"
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_ndjson_keeps_order_and_skips_malformed_lines(tmp_path, workers):
+    path = tmp_path / "events.ndjson"
+    path.write_text('{"n": 0}\nnot json\n\n' + "".join(f'{{"n": {i}}}\n' for i in range(1, 20)))
+    assert [p["n"] for p in iter_ndjson(str(path), workers=workers, chunk_lines=3)] == list(range(20))
+
+
+def test_iter_parse_is_lazy():
+    events = RedfishEventProcessor().iter_parse(_payload("s1", 3))
+    first = next(events)
+    assert (first["server_id"], first["component"], first["value"]) == ("s1", "PSU1", 0.0)
+    assert len(list(events)) == 2
+
+
+def test_events_stream_from_every_payload_in_a_file_object():
+    source = io.StringIO(_ndjson([_payload("s1", 2), _payload("s2", 3)]))
+    servers = [e["server_id"] for e in iter_events(source, RedfishEventProcessor())]
+    assert servers == ["s1", "s1", "s2", "s2", "s2"]
+
+
+def test_ingest_stream_summarizes_actions(make_agent, tmp_path):
+    path = tmp_path / "payloads.jsonl"
+    path.write_text(_ndjson([_payload("s1", 2), _payload("s2", 1)]))
+    agent = make_agent()
+    agent.query_llm = lambda event: {}
+    assert agent.ingest_stream(str(path)) == {"monitor": 3}
+    assert agent.metrics.counter("events_total") == 3
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from agent.pool import _worker_kwargs
+
+
+def test_second_manager_on_same_dir_is_refused(make_agent, tmp_path):
+    first = make_agent(checkpoint_dir=str(tmp_path), checkpoint_interval=0)
+    with pytest.raises(RuntimeError, match="in use"):
+        make_agent(checkpoint_dir=str(tmp_path), checkpoint_interval=0)
+    first.checkpoints.stop()
+    first.checkpoints = None
+    second = make_agent(checkpoint_dir=str(tmp_path), checkpoint_interval=0)
+    assert second.checkpoints is not None
+
+
+def test_pool_workers_get_own_checkpoint_dirs(monkeypatch, tmp_path):
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    assert _worker_kwargs(0, None)["checkpoint_dir"] == os.path.join(str(tmp_path), "worker-0")
+    kwargs = {"checkpoint_dir": "/data/ckpt", "api_key": "x"}
+    assert _worker_kwargs(3, kwargs) == {"checkpoint_dir": os.path.join("/data/ckpt", "worker-3"), "api_key": "x"}
+    assert kwargs["checkpoint_dir"] == "/data/ckpt"
+    monkeypatch.delenv("CHECKPOINT_DIR")
+    assert "checkpoint_dir" not in _worker_kwargs(1, {})
+
+
+RULES = {"rules": [{"condition": "temperature > 85", "action": "raise_critical"}]}
+READING = {"server_id": "s1", "type": "temperature", "component": "CPU1", "temperature": 91}
+
+
+def _restarted(make_agent, path):
+    first = make_agent(checkpoint_dir=path, checkpoint_interval=0)
+    first.classic_rules.ingest(RULES)
+    first.working_mem.ingest({"rack": "r1"}, READING)
+    first.raw_text.log("first note")
+    first.timeseries.record(READING)
+    first.audit.log_decision("raise_critical", "rule", READING, source="classic")
+    first._llm_seen_types.add("temperature")
+    assert "classic_rules" in first.checkpoints.checkpoint()
+    first.raw_text.log("second note")
+    first.checkpoints.stop()
+    first.checkpoints = None
+    return make_agent(checkpoint_dir=path, checkpoint_interval=0)
+
+
+def test_restarted_agent_warm_starts_from_the_checkpoint(make_agent, tmp_path):
+    agent = _restarted(make_agent, str(tmp_path))
+    assert "temperature" in agent._llm_seen_types
+    # Modules are restored lazily, on first access
+    assert not agent.modules.is_loaded("classic_rules")
+    assert agent.classic_rules.table == RULES["rules"]
+    assert agent.hybrid_decide_action(READING)[0] == "raise_critical"
+    assert agent.working_mem.get_state(READING)["rack"] == "r1"
+    assert agent.raw_text.logs == ["first note", "second note"]
+    assert agent.timeseries.history("s1", "CPU1", "temperature")[1].tolist() == [91.0]
+    rows, _ = agent.audit.query(server_id="s1")
+    assert [row["decision"] for row in rows] == ["raise_critical"]
+
+
+def test_unchanged_components_are_not_rewritten_and_old_generations_are_pruned(make_agent, tmp_path):
+    agent = make_agent(checkpoint_dir=str(tmp_path), checkpoint_interval=0)
+    agent.classic_rules.ingest(RULES)
+    assert "classic_rules" in agent.checkpoints.checkpoint()
+    # Nothing changed: no component file and no new generation
+    assert agent.checkpoints.checkpoint() == []
+    agent.classic_rules.ingest({"rules": RULES["rules"] * 2})
+    assert agent.checkpoints.checkpoint() == ["classic_rules"]
+    files = sorted(name for name in os.listdir(str(tmp_path)) if name.startswith("classic_rules."))
+    assert files == ["classic_rules.2.pkl"]
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from events.coalesce import EventCoalescer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _alert(value=1.0):
+    return {"server_id": "s1", "type": "alert", "component": "PSU1", "message": "PSU failure", "value": value}
+
+
+def test_last_storm_window_is_emitted_without_further_events():
+    clock = Clock()
+    coalescer = EventCoalescer(window=10.0, clock=clock)
+    assert [e["repeat_count"] for e in coalescer.push(_alert())] == [1]
+    for v in (2.0, 3.0):
+        assert coalescer.push(_alert(v)) == []
+    assert coalescer.expire() == []
+    clock.now = 20.0
+    (aggregate,) = coalescer.expire()
+    assert aggregate["repeat_count"] == 3 and aggregate["max_value"] == 3.0
+    assert coalescer.expire() == []
+
+
+def test_seen_times_come_from_event_timestamps_not_the_expiry_clock():
+    clock = Clock()
+    coalescer = EventCoalescer(window=10.0, clock=clock)
+    for ts in ("2026-01-01T10:00:00", "2026-01-01T10:00:05"):
+        coalescer.push(dict(_alert(), timestamp=ts))
+    clock.now = 20.0
+    (aggregate,) = coalescer.expire()
+    assert aggregate["first_seen"] == "2026-01-01T10:00:00"
+    assert aggregate["last_seen"] == "2026-01-01T10:00:05"
+
+
+def test_seen_times_fall_back_to_wall_clock():
+    coalescer = EventCoalescer(window=10.0, clock=Clock())
+    coalescer.push(_alert())
+    coalescer.push(_alert())
+    (aggregate,) = coalescer.flush()
+    assert aggregate["first_seen"].startswith(datetime.now().strftime("%Y-%m-%d"))
+
+
+def test_numeric_telemetry_is_not_coalesced():
+    coalescer = EventCoalescer(window=10.0, clock=Clock())
+    readings = [{"server_id": "s1", "type": "temperature", "component": "CPU1", "temperature": t} for t in (60, 75, 99)]
+    out = [e for reading in readings for e in coalescer.push(reading)]
+    assert [e["temperature"] for e in out] == [60, 75, 99]
+    assert coalescer.stats()["exempted"] == 3 and coalescer.suppressed == 0
+
+
+def test_agent_decides_closed_window_at_end_of_call(make_agent):
+    agent = make_agent(coalesce_window=10.0)
+    clock = Clock()
+    agent.coalescer.clock = clock
+    handled = []
+    agent.handle_event = lambda event: handled.append(event) or ("monitor", "")
+    payload = {"Id": "s1", "Events": [
+        {"EventType": "Alert", "Message": "PSU failure", "MessageArgs": ["PSU1", "1"]}
+    ] * 3}
+    agent.process_event("redfish", payload)
+    assert [e["repeat_count"] for e in handled] == [1]
+    clock.now = 20.0
+    agent.process_event("redfish", {"Id": "s1", "Events": []})
+    assert [e["repeat_count"] for e in handled] == [1, 3]
+    assert agent.flush_expired() == []
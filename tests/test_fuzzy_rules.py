@@ -0,0 +1,28 @@
+from memory.fuzzy_rules import FuzzyRuleMemory
+
+
+def _decide(rules, temperature):
+    memory = FuzzyRuleMemory()
+    memory.ingest({"rules": rules})
+    action, _ = memory.decide_action({"temperature": temperature})
+    batch, _ = memory.decide_action_batch([{"temperature": temperature}])
+    assert batch[0] == action
+    return action
+
+
+def test_not_equal_is_negated():
+    for cond in ("temperature != high", "temperature is not high"):
+        rules = [{"condition": cond, "action": "ok"}]
+        assert _decide(rules, 30) == "ok"
+        assert _decide(rules, 110) is None
+
+
+def test_string_threshold_is_coerced():
+    rules = [{"condition": "temperature is high", "action": "cool", "threshold": "0.7"}]
+    assert _decide(rules, 100) == "cool"
+    assert _decide(rules, 70) is None
+
+
+def test_invalid_threshold_falls_back_to_default():
+    rules = [{"condition": "temperature is high", "action": "cool", "threshold": "hot"}]
+    assert _decide(rules, 100) == "cool"
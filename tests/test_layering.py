@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_memory_modules_import_only_the_lazy_helpers_from_agent():
+    code = (
+        "import sys\n"
+        "import memory.rule_expr, memory.classic_rules, memory.fuzzy_rules, memory.ml_rules, memory.procedural\n"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] == 'agent'))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "['agent', 'agent.lazy']"
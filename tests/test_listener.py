@@ -0,0 +1,100 @@
+import asyncio
+import json
+import threading
+
+from events.listener import RedfishListener, TokenBucket
+
+PAYLOAD = {"Id": "s1", "Events": [{"EventType": "Alert", "Message": "PSU failure", "MessageArgs": ["PSU1", 1]}]}
+
+
+async def _request(port, method="POST", path="/redfish/events", body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode()
+        + data
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(payload) if payload else None
+
+
+def test_posts_are_acknowledged_then_handled_in_micro_batches():
+    batches = []
+
+    def handler(payloads):
+        batches.append(payloads)
+
+    async def main():
+        listener = await RedfishListener(handler=handler, host="127.0.0.1", port=0, linger=0.2).start()
+        statuses = await asyncio.gather(*(_request(listener.port, body=dict(PAYLOAD, n=i)) for i in range(5)))
+        assert [status for status, _, _ in statuses] == [202] * 5
+        status, _, health = await _request(listener.port, "GET", "/health")
+        await listener.stop()
+        return status, health
+
+    status, health = asyncio.run(main())
+    assert status == 200 and health["accepted"] == 5
+    assert sorted(p["n"] for batch in batches for p in batch) == list(range(5))
+    assert len(batches) < 5
+
+
+def test_full_queue_answers_503_with_retry_after():
+    release = threading.Event()
+
+    async def main():
+        listener = await RedfishListener(
+            handler=lambda payloads: release.wait(2), host="127.0.0.1", port=0, queue_size=1, batch_size=1, linger=0
+        ).start()
+        # The first payload is taken by the (blocked) consumer, the second fills the queue
+        statuses = [(await _request(listener.port, body=PAYLOAD))[0] for _ in range(2)]
+        await asyncio.sleep(0.05)
+        status, headers, _ = await _request(listener.port, body=PAYLOAD)
+        release.set()
+        await listener.stop()
+        return statuses + [status], headers
+
+    statuses, headers = asyncio.run(main())
+    assert statuses == [202, 202, 503] and headers["Retry-After"] == "1"
+
+
+def test_rate_limited_source_gets_429():
+    async def main():
+        listener = await RedfishListener(handler=lambda payloads: None, host="127.0.0.1", port=0, rate=1, burst=2).start()
+        statuses = [(await _request(listener.port, body=PAYLOAD))[0] for _ in range(3)]
+        statuses.append((await _request(listener.port, body=[PAYLOAD]))[0])
+        await listener.stop()
+        return statuses, listener.stats()
+
+    statuses, stats = asyncio.run(main())
+    # A body that is not a JSON object is refused before it costs a token
+    assert statuses == [202, 202, 429, 400]
+    assert (stats["accepted"], stats["rejected"]) == (2, 1)
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2.0, burst=2.0, now=0.0)
+    assert [bucket.take(0.0) for _ in range(3)] == [True, True, False]
+    assert bucket.take(0.5) and not bucket.take(0.5)
+
+
+def test_agent_listener_decides_pushed_events(make_agent):
+    agent = make_agent()
+
+    async def query_llm_async(event, semaphore=None):
+        return {"classic_rules": {"rules": [{"condition": "value >= 1", "action": "raise_critical"}]}}
+
+    agent.query_llm_async = query_llm_async
+
+    async def main():
+        listener = await RedfishListener(agent=agent, host="127.0.0.1", port=0, linger=0).start()
+        assert (await _request(listener.port, body=PAYLOAD))[0] == 202
+        await listener.stop()
+
+    asyncio.run(main())
+    rows, _ = agent.audit.query(server_id="s1")
+    assert [row["decision"] for row in rows] == ["raise_critical"]
@@ -0,0 +1,101 @@
+import time
+
+from agent.llm_cache import LLMResponseCache, event_signature
+
+
+def test_signature_buckets_readings_and_templates_messages():
+    a = {"server_id": "s1", "type": "temperature", "temperature": 88, "message": "CPU1 at 88", "timestamp": "t1"}
+    b = dict(a, temperature=89, message="CPU1 at 89", timestamp="t2")
+    assert event_signature(a) == event_signature(b)
+    assert event_signature(a) != event_signature(dict(a, temperature=91))
+
+
+def test_ttl_expiry_and_lru_eviction():
+    cache = LLMResponseCache(max_entries=2, ttl=None)
+    events = [{"server_id": f"s{i}", "type": "alert"} for i in range(3)]
+    for i, event in enumerate(events):
+        cache.put(event, {"n": i})
+    assert cache.get(events[0]) is None
+    assert cache.get(events[2]) == {"n": 2}
+    assert cache.stats()["evictions"] == 1
+
+    expiring = LLMResponseCache(ttl=0.01)
+    expiring.put(events[0], {"n": 0})
+    time.sleep(0.02)
+    assert expiring.get(events[0]) is None
+
+
+def test_sqlite_backing_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.db")
+    event = {"server_id": "s1", "type": "alert"}
+    LLMResponseCache(db_path=path).put(event, {"classic_rules": []})
+    assert LLMResponseCache(db_path=path).get(event) == {"classic_rules": []}
+
+
+class _AsyncClient:
+    def __init__(self, content):
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+        self.content = content
+
+    async def create(self, **request):
+        self.calls += 1
+        message = type("Message", (), {"content": self.content})
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+
+def test_batch_counts_each_cache_lookup_once(make_agent):
+    import asyncio
+    agent = make_agent()
+    agent._async_openai_client = client = _AsyncClient('{"working_mem": {"rack": "r1"}}')
+    hit, miss = {"server_id": "s1", "type": "alert"}, {"server_id": "s2", "type": "alert"}
+    agent.llm_cache.put(hit, {"working_mem": {}}, agent.persona.to_dict(), agent.prompts.components_for(hit))
+    results = asyncio.run(agent.query_llm_batch_async([hit, miss]))
+    assert results == [{"working_mem": {}}, {"working_mem": {"rack": "r1"}}]
+    assert client.calls == 1
+    assert (agent.llm_cache.hits, agent.llm_cache.misses) == (1, 1)
+    assert agent.metrics.counter("llm_cache_hits_total") == 1
+    assert agent.metrics.counter("llm_requests_total") == 1
+
+
+def test_llm_stage_excludes_client_construction(make_agent, monkeypatch):
+    import asyncio
+    from agent.core import AgentCore
+    client = _AsyncClient("{}")
+
+    def slow_client(self):
+        time.sleep(0.2)
+        return client
+
+    monkeypatch.setattr(AgentCore, "async_openai_client", property(slow_client))
+    agent = make_agent()
+    asyncio.run(agent.query_llm_async({"server_id": "s1", "type": "alert"}))
+    assert client.calls == 1
+    assert agent.metrics.histograms["llm"].max < 0.1e9
+
+
+def test_answer_is_cached_per_requested_component_set(make_agent):
+    agent = make_agent()
+    event = {"server_id": "s1", "type": "temperature", "temperature": 70}
+    calls = []
+
+    class Client:
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+
+        def create(self, **request):
+            calls.append(request["messages"][0]["content"])
+            message = type("Message", (), {"content": '{"working_mem": {"rack": "r1"}}'})
+            return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+    agent._openai_client = Client()
+    agent.prompts.mark_received("temperature", ["classic_rules", "fuzzy_rules", "ml_rules"])
+    agent.query_llm(event)
+    agent.query_llm(event)
+    assert len(calls) == 1
+    # Rules went stale: the working_mem-only answer must not be served for a prompt asking for rules
+    agent.prompts.received.clear()
+    agent.query_llm(event)
+    assert len(calls) == 2 and "classic_rules" in calls[-1]
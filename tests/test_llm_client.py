@@ -0,0 +1,64 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from agent.llm_client import LLMClientPool
+
+
+def _client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)), close=lambda: None)
+
+
+def _half_open(endpoint):
+    endpoint.breaker.state = "open"
+    endpoint.breaker.opened_at = endpoint.breaker.clock() - endpoint.breaker.reset_timeout
+
+
+def test_cancelled_half_open_probe_is_released():
+    pool = LLMClientPool(["http://a"], api_key="test")
+    endpoint = pool.endpoints[0]
+
+    async def hang(**request):
+        await asyncio.sleep(60)
+
+    endpoint._async_client = _client(hang)
+    _half_open(endpoint)
+
+    async def run():
+        task = asyncio.ensure_future(pool.acreate(model="m", messages=[]))
+        await asyncio.sleep(0.01)
+        assert endpoint.breaker.probing
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert endpoint.breaker.state == "half_open" and not endpoint.breaker.probing
+    assert endpoint.outstanding == 0 and endpoint.failures == 0
+    assert endpoint.breaker.allow()
+    pool.close()
+
+
+def test_queued_losing_hedge_is_cancelled_and_releases_its_probe():
+    pool = LLMClientPool(["http://a", "http://b"], api_key="test", initial_hedge_delay=0.05, max_workers=1)
+    fast, probe = pool.endpoints
+    calls = []
+
+    def slow(**request):
+        calls.append("a")
+        time.sleep(0.2)
+        return "answer"
+
+    def never(**request):
+        calls.append("b")
+        return "late"
+
+    fast._client, probe._client = _client(slow), _client(never)
+    _half_open(probe)
+    fast.outstanding = -1  # picked first; the half-open endpoint only as the hedge
+
+    assert pool.create(model="m", messages=[]) == "answer"
+    assert pool.hedges == 1
+    pool.close()
+    time.sleep(0.05)
+    assert calls == ["a"]
+    assert probe.breaker.state == "half_open" and not probe.breaker.probing
@@ -0,0 +1,42 @@
+import os
+
+from memory.ml_rules import LogisticModel, MLRuleMemory
+
+
+def _config(path):
+    return {"models": [{"name": "disk", "path": path, "features": ["temperature"], "event_types": ["disk"]}]}
+
+
+def test_model_loaded_from_model_dir(tmp_path):
+    LogisticModel([1.0], -50.0).save(str(tmp_path / "disk.json"))
+    memory = MLRuleMemory(model_dir=str(tmp_path))
+    memory.ingest(_config("disk.json"))
+    assert memory.registry.get("disk") is not None
+    assert memory.registry.for_event_type("disk").name == "disk"
+
+
+def test_model_paths_outside_model_dir_are_refused(tmp_path, monkeypatch):
+    models, outside = tmp_path / "models", tmp_path / "outside"
+    models.mkdir()
+    outside.mkdir()
+    LogisticModel([1.0], -50.0).save(str(outside / "evil.json"))
+    os.symlink(str(outside / "evil.json"), str(models / "link.json"))
+    memory = MLRuleMemory(model_dir=str(models))
+    for path in (str(outside / "evil.json"), "../outside/evil.json", "link.json"):
+        memory.ingest(_config(path))
+        assert memory.registry.get("disk") is None
+    monkeypatch.delenv("ML_MODEL_DIR", raising=False)
+    unconfigured = MLRuleMemory()
+    unconfigured.ingest(_config(str(outside / "evil.json")))
+    assert unconfigured.registry.get("disk") is None
+
+
+def test_string_critical_is_coerced(tmp_path):
+    LogisticModel([1.0], -50.0).save(str(tmp_path / "disk.json"))
+    for critical, expected in (("0.9", 0.9), ("high", 0.8), (None, 0.8)):
+        memory = MLRuleMemory(model_dir=str(tmp_path))
+        memory.ingest({"models": [dict(_config("disk.json")["models"][0], critical=critical)]})
+        assert memory.registry.get("disk").critical == expected
+        state = {"type": "disk", "temperature": 100}
+        assert memory.decide_action(state)[0] == "raise_critical"
+        assert memory.decide_action_batch([state])[0].tolist() == ["raise_critical"]
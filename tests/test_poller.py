@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+from events.poller import RedfishPoller
+
+
+def _reading(host):
+    return {"server_id": host.name, "type": "temperature", "component": "CPU1", "temperature": 60}
+
+
+def test_sweep_does_not_wait_for_delivery():
+    delivered = []
+
+    async def slow_handler(events):
+        await asyncio.sleep(0.05)
+        delivered.append(len(events))
+
+    poller = RedfishPoller([f"http://bmc-{i}" for i in range(20)], handler=slow_handler, spread=0.0, batch_size=8)
+
+    async def poll(host):
+        return "ok", [_reading(host)]
+
+    poller.poll = poll
+
+    async def run():
+        start = time.monotonic()
+        counts = await poller.sweep()
+        swept = time.monotonic() - start
+        await poller.close()
+        return counts, swept
+
+    counts, swept = asyncio.run(run())
+    assert counts["events"] == 20
+    assert swept < 0.05
+    assert sum(delivered) == 20 and max(delivered) <= 8
+
+
+def test_llm_concurrency_is_agent_wide(make_agent):
+    agent = make_agent(llm_concurrency=2)
+    in_flight = []
+    peak = []
+
+    class Client:
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+
+        async def create(self, **request):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            message = type("Message", (), {"content": "{}"})
+            return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+    agent._async_openai_client = Client()
+    batches = [[{"server_id": f"s{b}-{i}", "type": "alert", "message": "x"} for i in range(5)] for b in range(4)]
+
+    async def run():
+        await asyncio.gather(*(agent.process_events_async(batch) for batch in batches))
+
+    asyncio.run(run())
+    assert len(peak) == 20 and max(peak) == 2
+
+
+class _BMC:
+    """Redfish service root, Chassis collection and an ETag-versioned Thermal resource."""
+
+    def __init__(self, select=True):
+        self.select = select
+        self.requests = []
+        self.version = 1
+        self.down = False
+
+    def __call__(self, request):
+        import httpx
+        self.requests.append((request.url.path, request.url.query.decode(), request.headers.get("If-None-Match")))
+        if self.down:
+            return httpx.Response(503)
+        path = request.url.path
+        if path == "/redfish/v1/":
+            return httpx.Response(200, json={"ProtocolFeaturesSupported": {"SelectQuery": self.select}})
+        if path == "/redfish/v1/Chassis":
+            return httpx.Response(200, json={"Members": [{"@odata.id": "/redfish/v1/Chassis/1"}]})
+        if path == "/redfish/v1/Chassis/1/Thermal":
+            etag = f'"v{self.version}"'
+            if request.headers.get("If-None-Match") == etag:
+                return httpx.Response(304)
+            return httpx.Response(200, headers={"ETag": etag}, json={
+                "Temperatures": [{"Name": "CPU1", "ReadingCelsius": 60 + self.version, "Status": {"Health": "OK"}}],
+                "Fans": [{"Name": "FAN1", "Reading": 900, "ReadingUnits": "RPM"}],
+            })
+        return httpx.Response(404)
+
+
+def _mocked(poller, bmc):
+    import httpx
+    for host in poller.hosts:
+        host.client = httpx.AsyncClient(transport=httpx.MockTransport(bmc))
+
+
+def test_poll_discovers_once_and_skips_unchanged_readings():
+    bmc = _BMC()
+    poller = RedfishPoller({"s1": "http://bmc-1"}, handler=lambda events: None, spread=0.0)
+    _mocked(poller, bmc)
+    (host,) = poller.hosts
+
+    async def run():
+        poller._slots = asyncio.Semaphore(1)
+        first = await poller.poll(host)
+        second = await poller.poll(host)
+        bmc.version = 2
+        third = await poller.poll(host)
+        await poller.close()
+        return first, second, third
+
+    (outcome, events), second, third = asyncio.run(run())
+    assert outcome == "ok"
+    assert [(e["type"], e["component"]) for e in events] == [("temperature", "CPU1"), ("fan", "FAN1")]
+    assert events[0]["server_id"] == "s1" and events[1]["fan_rpm"] == 900
+    assert second == ("not_modified", None)
+    assert third[0] == "ok" and third[1][0]["temperature"] == 62
+    paths = [path for path, _, _ in bmc.requests]
+    assert paths.count("/redfish/v1/") == 1 and paths.count("/redfish/v1/Chassis") == 1
+    assert bmc.requests[2] == ("/redfish/v1/Chassis/1/Thermal", "$select=Temperatures,Fans", None)
+    assert bmc.requests[3][2] == '"v1"'
+
+
+def test_failing_host_backs_off_instead_of_being_retried_every_sweep():
+    bmc = _BMC()
+    bmc.down = True
+    poller = RedfishPoller(["http://bmc-1"], handler=lambda events: None, spread=0.0, min_backoff=60.0)
+    _mocked(poller, bmc)
+
+    async def run():
+        counts = [await poller.sweep() for _ in range(2)]
+        await poller.close()
+        return counts
+
+    first, second = asyncio.run(run())
+    assert first["failed"] == 1 and second["backoff"] == 1
+    assert len(bmc.requests) == 1
+    assert poller.metrics.counter("poller_polls_total", (("outcome", "backoff"),)) == 1
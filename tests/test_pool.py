@@ -0,0 +1,51 @@
+import queue
+
+import pytest
+
+from memory.audit import RemoteAuditMemory
+
+
+@pytest.mark.parametrize("method", [
+    "get_audit_log", "query", "decisions_per_server_per_hour", "top_noisy_components", "to_dataframe",
+])
+def test_remote_audit_analytics_raise_a_clear_error(method):
+    audit = RemoteAuditMemory(queue.Queue())
+    with pytest.raises(RuntimeError, match="owns the database"):
+        getattr(audit, method)()
+
+
+def test_remote_audit_ships_rows():
+    rows = queue.Queue()
+    RemoteAuditMemory(rows).submit_row(("row",))
+    assert rows.get_nowait() == ("row",)
+
+
+def _pool(monkeypatch, **kwargs):
+    from agent.pool import AgentPool
+    from memory.audit import AuditMemory
+    monkeypatch.delenv("CHECKPOINT_DIR", raising=False)
+    return AgentPool(workers=1, audit=AuditMemory(db_path=":memory:"), agent_kwargs={"api_key": "test"}, **kwargs)
+
+
+def test_submit_restarts_a_dead_worker(monkeypatch):
+    pool = _pool(monkeypatch)
+    try:
+        dead = pool.processes[0]
+        dead.kill()
+        dead.join()
+        pool.submit({"server_id": "s1", "type": "noop"}, timeout=5)
+        assert pool.processes[0] is not dead and pool.processes[0].is_alive()
+        assert pool.metrics()["restarts"] == [1]
+    finally:
+        pool.close(timeout=5)
+
+
+def test_submit_raises_once_restarts_are_exhausted(monkeypatch):
+    pool = _pool(monkeypatch, max_restarts=0)
+    try:
+        pool.processes[0].kill()
+        pool.processes[0].join()
+        with pytest.raises(RuntimeError, match="died"):
+            pool.submit({"server_id": "s1"}, timeout=1)
+    finally:
+        pool.close(timeout=1)
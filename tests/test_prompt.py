@@ -0,0 +1,53 @@
+from agent.persona import Persona
+from agent.prompt import PromptBuilder
+
+
+def test_persona_update_ignores_version_and_refreshes_the_prefix():
+    persona = Persona()
+    prompts = PromptBuilder(persona)
+    assert "friendly" in prompts.prefix
+    persona.update({"version": 7, "style": "terse", "update": "x"})
+    assert persona.style == "terse" and persona.version == 1
+    assert "terse" in prompts.prefix and "friendly" not in prompts.prefix
+    assert "version" not in persona.to_dict()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fresh_components_are_not_requested_until_their_ttl_passes():
+    clock = Clock()
+    prompts = PromptBuilder(Persona(), component_ttl=60.0, clock=clock)
+    event = {"server_id": "s1", "type": "fan", "fan_rpm": 500}
+    assert prompts.components_for(event) == ["classic_rules", "fuzzy_rules", "working_mem", "procedural", "policy"]
+    prompts.mark_received("fan", ["classic_rules", "fuzzy_rules", "working_mem"])
+    assert prompts.components_for(event) == ["working_mem", "procedural", "policy"]
+    clock.now = 61.0
+    assert "classic_rules" in prompts.components_for(event)
+    assert prompts.components_for({"type": "unknown"})[0] == "classic_rules"
+
+
+def test_prompt_stays_within_the_token_budget():
+    prompts = PromptBuilder(Persona(), max_prompt_tokens=400)
+    event = {"server_id": "s1", "type": "alert", "message": "PSU failure " * 400, "debug_dump": list(range(500))}
+    prompt = prompts.build(event)
+    assert prompt.tokens <= 400
+    assert "debug_dump" not in prompt.text and "s1" in prompt.text
+    assert prompts.trims == 1
+    assert prompt.max_tokens == prompts.completion_budget(prompt.components)
+
+
+def test_prefix_is_built_once_per_persona_version():
+    persona = Persona()
+    prompts = PromptBuilder(persona)
+    prefix = prompts.prefix
+    for server in ("s1", "s2"):
+        assert prompts.build({"server_id": server, "type": "fan"}).text.startswith(prefix)
+    assert prompts.prefix is prefix
+    persona.update({"style": "terse"})
+    assert prompts.prefix is not prefix
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from agent.backtest import Backtester
+from memory.classic_rules import ClassicRuleMemory
+from memory.rule_expr import RuleExpressionError, compile_expression, to_columns
+
+STATES = [
+    {"temperature": 95},
+    {"fan_rpm": 500},
+    {"temperature": 50, "fan_rpm": 500},
+    {"temperature": 50, "fan_rpm": None},
+    {"cpu_temp": 99},
+    {"temperature": None, "cpu_temp": 99},
+    {"status": "Critical"},
+    {},
+]
+
+EXPRESSIONS = [
+    "temperature > 90 or fan_rpm < 1000",
+    "temperature > 90 and fan_rpm < 1000",
+    "not temperature > 90",
+    "temperature != 50 or status == 'Critical'",
+    "temperature * 2 > 150 or status in ['Critical', 'Warning']",
+    "fan_rpm or temperature > 90",
+]
+
+
+@pytest.mark.parametrize("source", EXPRESSIONS)
+def test_scalar_and_batch_agree_on_missing_attributes(source):
+    compiled = compile_expression(source)
+    columns, n = to_columns(STATES)
+    batch = compiled.evaluate_columns(columns, n)
+    assert batch.tolist() == [compiled.evaluate(state) for state in STATES]
+
+
+def test_missing_attribute_does_not_fail_the_other_disjunct():
+    compiled = compile_expression("temperature > 90 or fan_rpm < 1000")
+    assert compiled.evaluate({"fan_rpm": 500})
+    columns, n = to_columns([{"fan_rpm": 500}])
+    assert compiled.evaluate_columns(columns, n).tolist() == [True]
+
+
+def test_classic_memory_and_backtester_match_scalar_decisions():
+    rules = [{"condition": "temperature > 90 or fan_rpm < 1000", "action": "raise_critical"}]
+    memory = ClassicRuleMemory()
+    memory.ingest({"rules": rules})
+    scalar = [memory.decide_action(state)[0] for state in STATES]
+    batch, _ = memory.decide_action_batch(STATES)
+    assert batch.tolist() == scalar
+    actions, _ = Backtester({"classic_rules": {"rules": rules}}, rule_engines=["classic"]).decide_batch(STATES)
+    assert actions.tolist() == scalar
+    assert np.count_nonzero(actions == "raise_critical") == 5
+
+
+@pytest.mark.parametrize("source", ["'a' * 99999999999 == ''", "99999999999 * [0] == []", "'%999999999d' % 1 == ''"])
+def test_literal_repetition_is_rejected(source):
+    with pytest.raises(RuleExpressionError):
+        compile_expression(source)
+
+
+def test_repeating_a_state_string_does_not_evaluate():
+    compiled = compile_expression("message * 99999999999 == ''")
+    with pytest.raises(TypeError):
+        compiled.evaluate({"message": "PSU failure"})
+    columns, n = to_columns([{"message": "PSU failure"}])
+    assert compiled.evaluate_columns(columns, n).tolist() == [False]
+    assert compile_expression("temperature * 2 > 150").evaluate({"temperature": 80})
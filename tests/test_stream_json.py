@@ -0,0 +1,81 @@
+import json
+
+from agent.stream_json import IncrementalObjectParser
+
+DOCUMENT = {
+    "working_mem": {"rack": "r1", "note": 'says "hi" {not a brace}, [ok]'},
+    "classic_rules": {"rules": [{"condition": "temperature > 85", "action": "raise_critical"}]},
+    "threshold": 85.5,
+    "enabled": True,
+    "tags": ["a", "b\\"],
+}
+
+
+def _feed(parser, text, size):
+    out = []
+    for i in range(0, len(text), size):
+        out.extend(parser.feed(text[i:i + size]))
+    return out
+
+
+def test_members_are_emitted_as_soon_as_they_close_for_any_chunking():
+    text = "Here you go:\n```json\n" + json.dumps(DOCUMENT, indent=2) + "\n```\nDone."
+    for size in (1, 3, 7, len(text)):
+        parser = IncrementalObjectParser()
+        assert _feed(parser, text, size) == list(DOCUMENT.items())
+        assert parser.done and parser.errors == []
+
+
+def test_a_member_is_available_before_the_object_closes():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"working_mem": {"rack": "r1"}, "classic_rules": {"ru') == [("working_mem", {"rack": "r1"})]
+    assert not parser.done
+
+
+def test_invalid_member_value_is_skipped():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"bad": nope, "good": 1}') == [("good", 1)]
+    assert len(parser.errors) == 1
+
+
+class _Stream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for text in self.chunks:
+            self.sent += 1
+            delta = type("Delta", (), {"content": text})
+            yield type("Chunk", (), {"choices": [type("Choice", (), {"delta": delta})]})
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_routes_components_and_stops_once_decision_components_arrive(make_agent):
+    agent = make_agent(llm_stream=True, rule_engines=("classic",))
+    text = json.dumps({
+        "working_mem": {"rack": "r1"},
+        "classic_rules": {"rules": [{"condition": "temperature > 85", "action": "raise_critical"}]},
+        "raw_text": "a long explanation the decision does not need",
+    })
+    stream = _Stream([text[i:i + 16] for i in range(0, len(text), 16)])
+
+    class Client:
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+
+        def create(self, **request):
+            assert request["stream"]
+            return stream
+
+    agent._openai_client = Client()
+    event = {"server_id": "s1", "type": "temperature", "component": "CPU1", "temperature": 90}
+    action, _ = agent.handle_event(event)
+    assert action == "raise_critical"
+    assert stream.closed and stream.sent < len(stream.chunks)
+    assert agent.metrics.counter("llm_stream_early_stops_total") == 1
+    assert agent.working_mem.get_state(event)["rack"] == "r1"
@@ -0,0 +1,74 @@
+RULES = {"rules": [{"condition": "temperature > 85", "action": "raise_critical"}]}
+
+
+def _reading(temperature):
+    return {"server_id": "s1", "type": "temperature", "component": "CPU1", "temperature": temperature}
+
+
+def test_fast_path_decides_from_the_current_reading(make_agent):
+    agent = make_agent(tiered=True, rule_engines=("classic",))
+    calls = []
+
+    def query_llm(event):
+        calls.append(event["temperature"])
+        # The first answer loads the rules and stores the server's state (with this reading)
+        return {"classic_rules": RULES, "working_mem": {"rack": "r1"}} if len(calls) == 1 else {}
+
+    agent.query_llm = query_llm
+    actions = [agent.handle_event(_reading(t))[0] for t in (91, 60, 40, 95)]
+    assert actions == ["raise_critical", "monitor", "monitor", "raise_critical"]
+    # Low readings go back to the LLM; the last high one is decided locally
+    assert calls == [91, 60, 40]
+
+
+def test_state_fills_fields_the_event_lacks(make_agent):
+    agent = make_agent()
+    agent.working_mem.ingest({"rack": "r1", "temperature": 70}, _reading(70))
+    state = agent.working_mem.get_state({"server_id": "s1", "temperature": 90})
+    assert state["temperature"] == 90
+    assert state["rack"] == "r1"
+
+
+def _primed(make_agent):
+    agent = make_agent(tiered=True, rule_engines=("classic",))
+    agent.query_llm = lambda event: {"classic_rules": RULES}
+    agent.handle_event(_reading(91))
+    return agent
+
+
+def test_async_results_follow_input_order_with_fast_path(make_agent):
+    import asyncio
+    agent = _primed(make_agent)
+    sent = []
+
+    async def query_llm_async(event, semaphore=None):
+        sent.append(event["temperature"])
+        return {}
+
+    agent.query_llm_async = query_llm_async
+    results = asyncio.run(agent.process_events_async([_reading(t) for t in (95, 50, 99)]))
+    assert [action for action, _ in results] == ["raise_critical", "monitor", "raise_critical"]
+    assert sent == [50]
+
+
+def test_fall_through_event_counts_rule_evaluation_once(make_agent):
+    agent = _primed(make_agent)
+    agent.query_llm = lambda event: {}
+    labels = (("engine", "classic"),)
+    before = agent.metrics.counter("rule_engine_evaluations_total", labels)
+    assert agent.handle_event(_reading(50))[0] == "monitor"
+    assert agent.metrics.counter("rule_engine_evaluations_total", labels) == before + 1
+
+
+def test_async_path_is_measured_like_handle_event(make_agent):
+    import asyncio
+    agent = _primed(make_agent)
+    before = agent.metrics.counter("events_total"), agent.metrics.histograms["handle_event"].count
+
+    async def query_llm_async(event, semaphore=None):
+        return {}
+
+    agent.query_llm_async = query_llm_async
+    asyncio.run(agent.process_events_async([_reading(t) for t in (95, 50, 99)]))
+    assert agent.metrics.counter("events_total") == before[0] + 3
+    assert agent.metrics.histograms["handle_event"].count == before[1] + 3
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from memory.timeseries import TimeSeriesMemory
+
+
+def _fill(store, samples, server_id="s1", component="CPU1", metric="temperature"):
+    for ts, value in samples:
+        store.append(server_id, component, metric, ts, value)
+
+
+def test_window_features_match_a_direct_computation():
+    store = TimeSeriesMemory(capacity=16, windows={"1m": 60})
+    samples = [(1000.0 + 10 * i, 50.0 + 2 * i) for i in range(12)]
+    _fill(store, samples)
+    features = store.features({"server_id": "s1", "component": "CPU1"})
+    # The 60 s window holds the samples from t=1050 to t=1110
+    window = [(t, v) for t, v in samples if t >= 1050.0]
+    values = [v for _, v in window]
+    assert features["temperature_count_1m"] == len(window)
+    assert features["temperature_mean_1m"] == pytest.approx(np.mean(values))
+    assert features["temperature_max_1m"] == max(values)
+    assert features["temperature_slope_1m"] == pytest.approx(0.2)
+    assert features["temperature_rate_1m"] == pytest.approx(0.2)
+    # The cpu_temp alias gets the same features
+    assert features["cpu_temp_mean_1m"] == features["temperature_mean_1m"]
+
+
+def test_window_max_drops_expired_peaks():
+    store = TimeSeriesMemory(capacity=8, windows={"1m": 60})
+    _fill(store, [(0.0, 99.0), (30.0, 40.0), (90.0, 45.0), (100.0, 42.0)])
+    features = store.features({"server_id": "s1", "component": "CPU1"})
+    assert features["temperature_max_1m"] == 45.0
+    assert features["temperature_count_1m"] == 2
+
+
+def test_ring_buffer_keeps_the_latest_samples_and_grows_rows():
+    store = TimeSeriesMemory(capacity=4, initial_series=1)
+    _fill(store, [(float(i), float(i)) for i in range(10)])
+    _fill(store, [(0.0, 1.0)], server_id="s2")
+    times, values = store.history("s1", "CPU1", "temperature")
+    assert values.tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert times.tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert store.rows == 2 and len(store.t0) >= 2
+
+
+def test_record_reads_numeric_fields_from_events():
+    store = TimeSeriesMemory()
+    store.record({"server_id": "s1", "component": "FAN1", "fan_rpm": 900, "timestamp": "2026-01-01T00:00:00Z"})
+    store.record({"server_id": "s1", "component": "FAN1", "fan_rpm": True, "status": "OK"})
+    assert store.samples == 1
+    assert store.history("s1", "FAN1", "fan_rpm")[1].tolist() == [900.0]
+
+
+def test_save_and_memory_mapped_load_round_trip(tmp_path):
+    store = TimeSeriesMemory(capacity=8, windows={"1m": 60})
+    _fill(store, [(float(10 * i), float(i)) for i in range(5)])
+    store.save(str(tmp_path / "ts"))
+    loaded = TimeSeriesMemory.load(str(tmp_path / "ts"))
+    event = {"server_id": "s1", "component": "CPU1"}
+    assert loaded.features(event) == store.features(event)
+    _fill(loaded, [(50.0, 9.0)])
+    assert loaded.history("s1", "CPU1", "temperature")[1][-1] == 9.0
+    assert TimeSeriesMemory.load(str(tmp_path / "ts")).samples == 5
@@ -0,0 +1,20 @@
+import numpy as np
+
+from memory.vector_store import VectorStoreMemory
+
+
+def test_untrained_ivfpq_keeps_buffering_after_save_load(tmp_path):
+    rng = np.random.default_rng(0)
+    store = VectorStoreMemory(dim=16, index="ivfpq", nlist=4, m=4, train_threshold=400, nprobe=3)
+    store.add(rng.random((10, 16), dtype=np.float32))
+    path = str(tmp_path / "vectors.faiss")
+    store.save(path)
+
+    loaded = VectorStoreMemory.load(path)
+    assert (loaded.train_threshold, loaded.nprobe) == (400, 3)
+    loaded.add(rng.random((1, 16), dtype=np.float32))
+    assert not loaded.index.is_trained and loaded.ntotal == 11
+
+    loaded.add(rng.random((400, 16), dtype=np.float32))
+    assert loaded.index.is_trained and loaded.index.ntotal == 411
+    assert len(loaded.search(rng.random(16, dtype=np.float32), k=5)) == 5
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import pytest
+
+from agent.metrics import Metrics
+from agent.workflow import WorkflowEngine
+from memory.audit import AuditMemory
+from memory.procedural import ProceduralMemory
+
+pytest.importorskip("networkx")
+
+
+def _engine(**kwargs):
+    return WorkflowEngine(ProceduralMemory(), audit=AuditMemory(db_path=":memory:"), metrics=Metrics(), **kwargs)
+
+
+def test_independent_steps_run_concurrently():
+    engine = _engine()
+    barrier = threading.Barrier(2, timeout=2)
+
+    def branch(context):
+        barrier.wait()
+        return context["server_id"]
+
+    engine.procedural.add_workflow(
+        "triage", ["start", "left", "right", "done"],
+        edges=[("start", "left"), ("start", "right"), ("left", "done"), ("right", "done")],
+        code={"left": branch, "right": branch, "done": "result = context['server_id'].upper()"},
+    )
+    summary = engine.run("triage", {"server_id": "s1"})
+    assert summary["status"] == "ok"
+    assert summary["steps"]["start"]["status"] == "noop"
+    assert summary["steps"]["left"]["output"] == "s1"
+    assert summary["steps"]["done"]["output"] == "S1"
+    engine.close()
+
+
+def test_failed_or_timed_out_step_skips_only_its_descendants():
+    engine = _engine(step_timeout=0.1)
+
+    async def slow(context):
+        await asyncio.sleep(1)
+
+    engine.procedural.add_workflow(
+        "remediate", ["boom", "after_boom", "slow", "after_slow", "other"],
+        edges=[("boom", "after_boom"), ("slow", "after_slow")],
+        code={"boom": "raise RuntimeError('no BMC')", "slow": slow, "other": "result = 1"},
+    )
+    steps = engine.run("remediate", {"server_id": "s1"})["steps"]
+    assert steps["boom"]["status"] == "failed" and "no BMC" in steps["boom"]["error"]
+    assert steps["after_boom"]["status"] == "skipped"
+    assert steps["slow"]["status"] == "timeout"
+    assert steps["after_slow"]["status"] == "skipped"
+    assert steps["other"] == dict(steps["other"], status="ok", output=1)
+    rows, _ = engine.audit.query(source="workflow", decision="workflow_failed")
+    assert len(rows) == 1
+    assert engine.metrics.counter("workflow_steps_total", (("status", "skipped"),)) == 2
+    engine.close()
+
+
+def test_workflow_is_compiled_once_per_procedural_version():
+    engine = _engine()
+    first = engine.compile("restart_server")
+    assert engine.compile("restart_server") is first
+    assert [len(g) for g in first.generations] == [1, 1, 1, 1]
+    engine.procedural.set_step_code("Restart", "result = 'restarted'")
+    assert engine.compile("restart_server") is not first
+
+
+def test_cycle_is_rejected():
+    engine = _engine()
+    engine.procedural.add_workflow("loop", ["a", "b"], edges=[("a", "b"), ("b", "a")])
+    with pytest.raises(ValueError):
+        engine.compile("loop")
+
+
+def test_fan_out_bounds_concurrent_runs_and_keeps_order():
+    engine = _engine()
+    running = []
+    peak = []
+
+    async def step(context):
+        running.append(context["server_id"])
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(context["server_id"])
+        return context["server_id"]
+
+    engine.procedural.add_workflow("check", ["probe"], code={"probe": step})
+    summaries = engine.fan_out("check", [{"server_id": f"s{i}"} for i in range(12)], concurrency=4)
+    assert [s["steps"]["probe"]["output"] for s in summaries] == [f"s{i}" for i in range(12)]
+    assert max(peak) == 4
+    engine.close()